@@ -0,0 +1,412 @@
+"""
+scripts/benchmark_pipeline.py
+
+Benchmark the full raw -> prepared -> data warehouse -> OLAP pipeline on
+synthetic data, so performance regressions show up before they hit production.
+
+Tasks:
+- Generate synthetic raw customers, products, and sales CSVs that match the
+  schemas in data/raw, at a configurable scale (1e4 to 1e8 sales rows)
+- Time the DataScrubber methods
+- Time the prepare_*_data.py pipelines (in memory or streaming)
+- Time load_data_to_db
+- Time the OLAP queries
+- Write the results as JSON, with wall time, CPU time, and peak memory per stage
+
+Example:
+    py scripts/benchmark_pipeline.py --rows 1e6
+    py scripts/benchmark_pipeline.py --rows 1e8 --chunk-size 1000000
+    py scripts/benchmark_pipeline.py --rows 1e6 --engine duckdb
+
+"""
+
+#####################################
+# Import Modules at the Top
+#####################################
+
+# Import from Python Standard Library
+import argparse
+import contextlib
+import importlib.util
+import json
+import pathlib
+import platform
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+# Import from external packages (requires a virtual environment)
+import numpy as np
+import pandas as pd
+
+# Ensure project root is in sys.path for local imports
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+# Import local modules (e.g. utils/logger.py)
+from utils.logger import logger, peak_rss_mb, profile_stage
+from utils.olap_cube import query_cube
+from utils.query_cache import QueryCache
+from utils.warehouse import ENGINE_SUFFIXES, ConnectionPool, connect, read_sql
+
+# Constants
+SCRIPTS_DIR: pathlib.Path = pathlib.Path(__file__).resolve().parent  # Directory of the current script
+PROJECT_ROOT: pathlib.Path = SCRIPTS_DIR.parent
+LOGS_DIR: pathlib.Path = PROJECT_ROOT / "logs"
+REPORT_THREADS: int = 4  # Concurrent report jobs in the pooled OLAP benchmark
+GENERATOR_CHUNK_ROWS: int = 1_000_000  # Rows generated and written at a time
+DUPLICATE_FRACTION: float = 0.01  # Share of sales rows that repeat an earlier row exactly
+
+# Value domains taken from data/raw, including the messy values real extracts contain
+REGIONS = ["West", "East", "Central", "North", "South", "EAST", "south-west", "east"]
+CONTACT_METHODS = ["SMS", "Phone", "Email", "App Notification"]
+CATEGORIES = ["Electronics", "Clothing", "Home", "Office"]
+SUPPLIERS = ["PrimeParts", "QuickSource", "DistribuCo", "SupplyHub", "GlobalTech"]
+PAYMENT_TYPES = ["Mobile Payment", "Gift Card", "Credit Card", "Cash"]
+STORE_IDS = [401, 402, 403, 404]
+CAMPAIGN_IDS = [0.0, 1.0, 2.0, 3.0, np.nan]
+
+#####################################
+# Define Functions - Reusable blocks of code / instructions
+#####################################
+
+def random_dates(rng: np.random.Generator, n: int, start: str, end: str) -> np.ndarray:
+    """Return n random dates between start and end, formatted M/D/YYYY like data/raw."""
+    days = pd.date_range(start, end, freq="D")
+    picked = days[rng.integers(0, len(days), n)]
+    return (picked.month.astype(str) + "/" + picked.day.astype(str) + "/" + picked.year.astype(str)).to_numpy()
+
+
+def generate_raw_data(raw_dir: pathlib.Path, sales_rows: int, seed: int = 42) -> Dict[str, int]:
+    """
+    Write synthetic customers_data.csv, products_data.csv, and sales_data.csv.
+
+    Customers and products scale with the number of sales (1 customer per 100 sales,
+    1 product per 1,000 sales, with a floor). Sales are generated and appended in
+    chunks, so even 1e8 rows never need to fit in memory. About 1% of sales rows
+    are exact duplicates, as in the raw extracts.
+
+    Args:
+        raw_dir (pathlib.Path): Directory to write the raw CSV files to.
+        sales_rows (int): Number of sales rows to generate.
+        seed (int): Random seed, so runs are reproducible.
+
+    Returns:
+        Dict[str, int]: Rows written per table.
+    """
+    logger.info(f"FUNCTION START: generate_raw_data with sales_rows={sales_rows}")
+    rng = np.random.default_rng(seed)
+    customer_rows = max(200, sales_rows // 100)
+    product_rows = max(100, sales_rows // 1000)
+    customer_ids = np.arange(1000, 1000 + customer_rows)
+    product_ids = np.arange(2000, 2000 + product_rows)
+
+    pd.DataFrame({
+        "CustomerID": customer_ids,
+        "Name": [f"Customer {i}" for i in customer_ids],
+        "Region": rng.choice(REGIONS, customer_rows),
+        "JoinDate": random_dates(rng, customer_rows, "2020-01-01", "2024-12-31"),
+        "LoyaltyPoints": rng.integers(0, 5000, customer_rows),
+        "PreferredContactMethod": rng.choice(CONTACT_METHODS, customer_rows),
+    }).to_csv(raw_dir / "customers_data.csv", index=False)
+
+    pd.DataFrame({
+        "ProductID": product_ids,
+        "ProductName": [f"{category}-{i}" for category, i in zip(rng.choice(CATEGORIES, product_rows), product_ids)],
+        "Category": rng.choice(CATEGORIES, product_rows),
+        "UnitPrice": rng.uniform(10, 1000, product_rows).round(2),
+        "StockQuantity": rng.integers(0, 1000, product_rows),
+        "Supplier": rng.choice(SUPPLIERS, product_rows),
+    }).to_csv(raw_dir / "products_data.csv", index=False)
+
+    sales_path = raw_dir / "sales_data.csv"
+    next_transaction_id = 1
+    for start in range(0, sales_rows, GENERATOR_CHUNK_ROWS):
+        n = min(GENERATOR_CHUNK_ROWS, sales_rows - start)
+        # Unique rows first, then copies of some of them, so the chunk still has n rows
+        duplicate_rows = int(n * DUPLICATE_FRACTION)
+        n -= duplicate_rows
+        sales = pd.DataFrame({
+            "TransactionID": np.arange(next_transaction_id, next_transaction_id + n),
+            "SaleDate": random_dates(rng, n, "2024-01-01", "2025-12-31"),
+            "CustomerID": rng.choice(customer_ids, n),
+            "ProductID": rng.choice(product_ids, n),
+            "StoreID": rng.choice(STORE_IDS, n),
+            "CampaignID": rng.choice(CAMPAIGN_IDS, n),
+            "SaleAmount": rng.gamma(1.0, 1000.0, n).round(2),
+            "DiscountPercent": rng.uniform(0, 50, n).round(2),
+            "PaymentType": rng.choice(PAYMENT_TYPES, n),
+        })
+        next_transaction_id += n
+        duplicates = sales.sample(n=duplicate_rows, random_state=int(rng.integers(0, 2**31)))
+        sales = pd.concat([sales, duplicates])
+        sales.to_csv(sales_path, index=False, mode="w" if start == 0 else "a", header=(start == 0))
+
+    return {"customers": customer_rows, "products": product_rows, "sales": sales_rows}
+
+
+def write_etl_input(raw_dir: pathlib.Path, prepared_dir: pathlib.Path) -> None:
+    """Write the *_data_prepared.csv files load_data_to_db reads, from the raw files."""
+    customers = pd.read_csv(raw_dir / "customers_data.csv").rename(columns={
+        "CustomerID": "customer_id",
+        "Name": "name",
+        "Region": "region",
+        "JoinDate": "join_date",
+        "PreferredContactMethod": "preferred_contact_method",
+    })
+    customers.to_csv(prepared_dir / "customers_data_prepared.csv", index=False)
+
+    products = pd.read_csv(raw_dir / "products_data.csv").rename(columns={
+        "ProductID": "product_id",
+        "ProductName": "product_name",
+        "Category": "category",
+        "UnitPrice": "unit_price",
+        "StockQuantity": "stock_quantity",
+    })
+    products.to_csv(prepared_dir / "products_data_prepared.csv", index=False)
+
+    shutil.copyfile(raw_dir / "sales_data.csv", prepared_dir / "sales_data_prepared.csv")
+
+
+def load_script(path: pathlib.Path):
+    """Load a script from the scripts folder as a module."""
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextlib.contextmanager
+def measure(results: List[Dict[str, Any]], stage: str, rows: int) -> Iterator[None]:
+    """Time one benchmark stage with profile_stage and append its measurements to results.
+    Memory is the process's peak RSS: tracemalloc would slow down the code being timed."""
+    with profile_stage(f"benchmark.{stage}", rows_in=rows) as record:
+        yield
+    result = {
+        "stage": stage,
+        "rows": rows,
+        "wall_seconds": round(record["wall_seconds"], 4),
+        "cpu_seconds": round(record["cpu_seconds"], 4),
+        "rows_per_second": round(rows / record["wall_seconds"]) if record["wall_seconds"] > 0 else None,
+        "peak_rss_mb": record["peak_rss_mb"],
+    }
+    results.append(result)
+
+
+def benchmark_scrubber(raw_dir: pathlib.Path, max_rows: int, results: List[Dict[str, Any]]) -> None:
+    """Time each DataScrubber method on (up to max_rows of) the sales data."""
+    scrubber_module = load_script(SCRIPTS_DIR / "data_scrubber.py")
+    DataScrubber = scrubber_module.DataScrubber
+    df = pd.read_csv(raw_dir / "sales_data.csv", nrows=max_rows)
+    rows = len(df)
+
+    steps = {
+        "remove_duplicate_records": lambda s: s.remove_duplicate_records(),
+        "handle_missing_data": lambda s: s.handle_missing_data(fill_value=0),
+        "filter_column_outliers": lambda s: s.filter_column_outliers("DiscountPercent", 0, 40),
+        "rename_columns": lambda s: s.rename_columns({"SaleAmount": "sale_amount"}),
+        "reorder_columns": lambda s: s.reorder_columns(list(reversed(df.columns))),
+        "drop_columns": lambda s: s.drop_columns(["CampaignID"]),
+        "format_column_strings_to_lower_and_trim": lambda s: s.format_column_strings_to_lower_and_trim("PaymentType"),
+        "format_column_strings_to_upper_and_trim": lambda s: s.format_column_strings_to_upper_and_trim("PaymentType"),
+        "normalize_string_columns": lambda s: s.normalize_string_columns(["PaymentType", "SaleDate"], case="lower",
+                                                                         collapse_whitespace=True),
+        "parse_dates_to_add_standard_datetime": lambda s: s.parse_dates_to_add_standard_datetime("SaleDate"),
+        "check_data_consistency_before_cleaning": lambda s: s.check_data_consistency_before_cleaning(),
+    }
+    for name, step in steps.items():
+        scrubber = DataScrubber(df.copy())
+        with measure(results, f"scrubber.{name}", rows):
+            step(scrubber)
+
+    # The same chained scrub, eager and lazy
+    def chained(scrubber):
+        scrubber.drop_columns(["CampaignID"])
+        scrubber.filter_column_outliers("DiscountPercent", 0, 40)
+        scrubber.handle_missing_data(drop=True)
+        scrubber.remove_duplicate_records()
+        return scrubber.rename_columns({"SaleAmount": "sale_amount"})
+
+    with measure(results, "scrubber.chained_eager", rows):
+        chained(DataScrubber(df.copy()))
+    with measure(results, "scrubber.chained_lazy", rows):
+        chained(DataScrubber(df.copy(), lazy=True)).collect()
+
+    # Several filters that each remove rows: eager copies the frame per filter, lazy once
+    def filtered(scrubber):
+        scrubber.filter_column_outliers("DiscountPercent", 0, 40)
+        scrubber.filter_column_outliers("SaleAmount", 10, 5000)
+        scrubber.handle_missing_data(drop=True)
+        scrubber.remove_duplicate_records()
+        return scrubber.drop_columns(["StoreID"])
+
+    with measure(results, "scrubber.filtered_eager", rows):
+        filtered(DataScrubber(df.copy()))
+    with measure(results, "scrubber.filtered_lazy", rows):
+        filtered(DataScrubber(df.copy(), lazy=True)).collect()
+
+
+def benchmark_prepare(raw_dir: pathlib.Path, prepared_dir: pathlib.Path, chunk_size: Optional[int],
+                      row_counts: Dict[str, int], results: List[Dict[str, Any]],
+                      max_workers: Optional[int] = None) -> None:
+    """Time the prepare_*_data.py pipelines against the synthetic raw files.
+    max_workers parses the sales file on several cores (prepare_sales_data only)."""
+    for name in ["customers", "products", "sales"]:
+        module = load_script(SCRIPTS_DIR / "data_prep" / f"prepare_{name}_data.py")
+        module.RAW_DATA_DIR = raw_dir
+        module.PREPARED_DATA_DIR = prepared_dir
+        with measure(results, f"prepare.{name}", row_counts[name]):
+            parallel = {"max_workers": max_workers} if name == "sales" and max_workers else {}
+            module.main(chunk_size, use_cache=False, **parallel)  # time the cleaning, not a cache hit
+
+
+def benchmark_etl(raw_dir: pathlib.Path, work_dir: pathlib.Path, row_counts: Dict[str, int],
+                  results: List[Dict[str, Any]], engine: str = "sqlite") -> pathlib.Path:
+    """Time load_data_to_db into a warehouse of the given engine and return its path."""
+    prepared_dir = work_dir / "etl_input"
+    prepared_dir.mkdir(exist_ok=True)
+    write_etl_input(raw_dir, prepared_dir)
+
+    etl = load_script(SCRIPTS_DIR / "etl_to_dw.py")
+    etl.PREPARED_DATA_DIR = prepared_dir
+    etl.DW_DIR = work_dir / "dw"
+    etl.DB_PATH = etl.DW_DIR / ("smart_sales" + ENGINE_SUFFIXES[engine])
+    with measure(results, "etl.load_data_to_db", sum(row_counts.values())):
+        etl.load_data_to_db()
+
+    # load_data_to_db reports errors instead of raising, so check the result
+    with contextlib.closing(connect(etl.DB_PATH)) as conn:
+        loaded = conn.execute("SELECT COUNT(*) FROM sale").fetchone()[0]
+    if loaded == 0:
+        raise RuntimeError("load_data_to_db loaded no sales; see the output above.")
+    return etl.DB_PATH
+
+
+def benchmark_olap(db_path: pathlib.Path, sales_rows: int, results: List[Dict[str, Any]]) -> None:
+    """Time the OLAP queries used by olap_analysis.py and payment_analysis.py."""
+    conn = connect(db_path)
+    try:
+        with measure(results, "olap.category_month_scan", sales_rows):
+            df = read_sql(conn, """
+                SELECT s.sale_date, s.sale_amount, p.category
+                FROM sale s JOIN product p ON s.product_id = p.product_id
+            """)
+            df["month"] = df["sale_date"].str.slice(0, 7)
+            df.groupby(["category", "month"])["sale_amount"].agg(["sum", "mean", "count"])
+
+        with measure(results, "olap.category_month_cube", sales_rows):
+            query_cube(conn, group_by=["category", "month"])
+
+        with measure(results, "olap.payment_type_may", sales_rows):
+            read_sql(
+                conn, "SELECT sale_date, payment_type FROM sale WHERE sale_date >= ? AND sale_date < ?",
+                params=("2025-05-01", "2025-06-01"),
+            )["payment_type"].value_counts()
+
+        # A dashboard refresh: the same query again, answered by the query cache
+        queries = QueryCache(conn)
+        scan_sql = "SELECT s.sale_date, s.sale_amount, p.category FROM sale s JOIN product p ON s.product_id = p.product_id"
+        queries.read_sql(scan_sql)
+        with measure(results, "olap.cached_refresh", sales_rows):
+            queries.read_sql(scan_sql)
+    finally:
+        conn.close()
+
+    # Concurrent report jobs sharing a pool of read-only connections
+    def payment_report(month: str) -> int:
+        with pool.connection() as pooled:
+            return len(read_sql(pooled, "SELECT payment_type FROM sale WHERE substr(sale_date, 1, 7) = ?",
+                                params=(month,)))
+
+    months = [f"2025-{month:02d}" for month in range(1, 13)]
+    with ConnectionPool(db_path, max_connections=REPORT_THREADS) as pool:
+        with measure(results, "olap.pooled_reports", sales_rows):
+            with ThreadPoolExecutor(max_workers=REPORT_THREADS) as executor:
+                list(executor.map(payment_report, months))
+
+
+#####################################
+# Define Main Function - The main entry point of the script
+#####################################
+
+def main(sales_rows: int, chunk_size: Optional[int] = None, scrubber_rows: int = 1_000_000,
+         output_file: Optional[pathlib.Path] = None, work_dir: Optional[pathlib.Path] = None,
+         max_workers: Optional[int] = None, engine: str = "sqlite") -> Dict[str, Any]:
+    """
+    Run every benchmark stage and write the results as JSON.
+
+    Args:
+        sales_rows (int): Number of synthetic sales rows.
+        chunk_size (int, optional): Run the prepare pipelines in streaming mode with this chunk size.
+        scrubber_rows (int): Maximum rows used for the DataScrubber benchmarks.
+        output_file (pathlib.Path, optional): Where to write the JSON results.
+        work_dir (pathlib.Path, optional): Directory for generated files; a temporary one by default.
+        max_workers (int, optional): Parse the raw sales file on this many cores.
+        engine (str): Warehouse engine, "sqlite" or "duckdb" (see utils/warehouse.py).
+
+    Returns:
+        Dict[str, Any]: The benchmark report.
+    """
+    logger.info("==================================")
+    logger.info("STARTING benchmark_pipeline.py")
+    logger.info("==================================")
+
+    temporary = work_dir is None
+    work_dir = pathlib.Path(tempfile.mkdtemp(prefix="smart_store_bench_")) if temporary else work_dir
+    raw_dir = work_dir / "raw"
+    prepared_dir = work_dir / "prepared"
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    prepared_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_file or LOGS_DIR / f"benchmark_{sales_rows}.json"
+
+    results: List[Dict[str, Any]] = []
+    try:
+        with measure(results, "generate_raw_data", sales_rows):
+            row_counts = generate_raw_data(raw_dir, sales_rows)
+        benchmark_scrubber(raw_dir, scrubber_rows, results)
+        benchmark_prepare(raw_dir, prepared_dir, chunk_size, row_counts, results, max_workers)
+        db_path = benchmark_etl(raw_dir, work_dir, row_counts, results, engine)
+        benchmark_olap(db_path, sales_rows, results)
+    finally:
+        if temporary:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "sales_rows": sales_rows,
+        "row_counts": row_counts,
+        "chunk_size": chunk_size,
+        "max_workers": max_workers,
+        "engine": engine,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": results,
+    }
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(json.dumps(report, indent=2))
+
+    logger.info(f"Benchmark results written to {output_file}")
+    logger.info("==================================")
+    logger.info("FINISHED benchmark_pipeline.py")
+    logger.info("==================================")
+    return report
+
+#####################################
+# Conditional Execution Block
+# Ensures the script runs only when executed directly
+# This is a common Python convention.
+#####################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the raw -> prepared -> DW -> OLAP pipeline.")
+    parser.add_argument("--rows", type=float, default=1e4, help="Synthetic sales rows, e.g. 1e4 to 1e8.")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Run the prepare pipelines in streaming mode.")
+    parser.add_argument("--scrubber-rows", type=int, default=1_000_000, help="Maximum rows for the DataScrubber benchmarks.")
+    parser.add_argument("--output", type=pathlib.Path, default=None, help="JSON results file.")
+    parser.add_argument("--work-dir", type=pathlib.Path, default=None, help="Keep generated files in this directory.")
+    parser.add_argument("--workers", type=int, default=None, help="Parse the raw sales file on this many cores.")
+    parser.add_argument("--engine", choices=sorted(ENGINE_SUFFIXES), default="sqlite", help="Warehouse engine to load and query.")
+    args = parser.parse_args()
+    main(int(args.rows), args.chunk_size, args.scrubber_rows, args.output, args.work_dir, args.workers, args.engine)
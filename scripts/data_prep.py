@@ -8,11 +8,13 @@ File: scripts/data_prep.py
 #####################################
 
 # Import from Python Standard Library
+import importlib.util
+import os
 import pathlib
 import sys
-
-# Import from external packages
-import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
 
 # Ensure project root is in sys.path for local imports
 sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
@@ -25,6 +27,14 @@ SCRIPTS_DIR: pathlib.Path = pathlib.Path(__file__).resolve().parent  # Directory
 PROJECT_ROOT: pathlib.Path = SCRIPTS_DIR.parent  # Navigate to the project's root directory
 DATA_DIR: pathlib.Path = PROJECT_ROOT/ "data" # Directory for ALL data files
 RAW_DATA_DIR: pathlib.Path = DATA_DIR / "raw"  # Directory for raw data files
+DATA_PREP_DIR: pathlib.Path = SCRIPTS_DIR / "data_prep"  # Directory of the prepare_*_data.py scripts
+
+# The independent preparation pipelines, by name
+PREPARE_SCRIPTS: Dict[str, pathlib.Path] = {
+    "customers": DATA_PREP_DIR / "prepare_customers_data.py",
+    "products": DATA_PREP_DIR / "prepare_products_data.py",
+    "sales": DATA_PREP_DIR / "prepare_sales_data.py",
+}
 
 # Ensure the data directories exist or create them
 DATA_DIR.mkdir(exist_ok=True)
@@ -34,37 +44,65 @@ RAW_DATA_DIR.mkdir(exist_ok=True)
 # Define Functions - Reusable blocks of code / instructions
 #####################################
 
-def read_raw_data(file_name: str) -> pd.DataFrame:
-    """Define a function to read raw data from CSV,
-    given the name of the file as a string. 
-    We will look for it in the data/raw directory."""
-    file_path: pathlib.Path = RAW_DATA_DIR.joinpath(file_name)
+def run_prepare_script(name: str, chunk_size: Optional[int] = None, file_format: str = "csv", use_cache: bool = True) -> Dict[str, Any]:
+    """Run one preparation pipeline (prepare_<name>_data.py) and time it.
+    This runs inside a worker process, so it loads the script by path."""
+    script_path = PREPARE_SCRIPTS[name]
+    spec = importlib.util.spec_from_file_location(script_path.stem, script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    original_shape, cleaned_shape = module.main(chunk_size, file_format, use_cache)
+    return {
+        "pipeline": name,
+        "original_shape": original_shape,
+        "cleaned_shape": cleaned_shape,
+        "wall_seconds": time.perf_counter() - start_wall,
+        "cpu_seconds": time.process_time() - start_cpu,
+    }
+
+def run_prepare_pipelines(max_workers: Optional[int] = None, chunk_size: Optional[int] = None, file_format: str = "csv",
+                          use_cache: bool = True) -> List[Dict[str, Any]]:
+    """Run the customer, product, and sales preparation pipelines at the same time
+    in a process pool and return each pipeline's shapes and timings.
+    chunk_size turns on streaming mode; file_format selects the prepared file format;
+    use_cache=False recomputes every stage instead of reusing data/.cache.
+
+    Fails fast: on the first failing pipeline, pipelines that have not started are
+    cancelled and a RuntimeError is raised without waiting for the others."""
+    if max_workers is None:
+        max_workers = min(len(PREPARE_SCRIPTS), os.cpu_count() or 1)
+    logger.info(f"Running {len(PREPARE_SCRIPTS)} preparation pipelines with {max_workers} worker(s).")
+
+    results = []
+    executor = ProcessPoolExecutor(max_workers=max_workers)
     try:
-        logger.info(f"READING: {file_path}.")
-        return pd.read_csv(file_path)
-    except FileNotFoundError:
-        logger.error(f"File not found: {file_path}")
-        return pd.DataFrame()  # Return an empty DataFrame if the file is not found
-    except Exception as e:
-        logger.error(f"Error reading {file_path}: {e}")
-        return pd.DataFrame()  # Return an empty DataFrame if any other error occurs
-
-def process_data(file_name: str) -> None:
-    """Define a function to process raw data by reading it into a pandas DataFrame object."""
-    df = read_raw_data(file_name)
-    if df.empty:
-        logger.warning(f"No data to process for {file_name}.")
-        return
-    logger.info(f"Processing data for {file_name}.")
-    logger.info(f"Data shape (ct of rows, ct of columns): {df.shape}.")
-    logger.info(f"Data columns: {df.columns.tolist()}.")
+        futures = {executor.submit(run_prepare_script, name, chunk_size, file_format, use_cache): name for name in PREPARE_SCRIPTS}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Preparation pipeline {name} failed: {e}")
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise RuntimeError(f"Preparation pipeline '{name}' failed.") from e
+            logger.info(
+                f"Pipeline {name}: {result['original_shape']} -> {result['cleaned_shape']} "
+                f"in {result['wall_seconds']:.2f}s wall, {result['cpu_seconds']:.2f}s CPU."
+            )
+            results.append(result)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
 
 
 #####################################
 # Define Main Function - The main entry point of the script
 #####################################
 
-def main() -> None:
+def main(max_workers: Optional[int] = None) -> None:
     """Main function for processing raw customer, product, and sales data."""
     logger.info("Starting data preparation...")
 
@@ -75,11 +113,9 @@ def main() -> None:
         logger.error("The data/raw folder is empty. Please add raw data files to the data/raw directory.")
         return
     
-    # Process each data file one at a time
+    # Run the customer, product, and sales pipelines in parallel
     # Note: The file names must match the actual files in your RAW_DATA_DIR
-    process_data("customers_data.csv")
-    process_data("products_data.csv")
-    process_data("sales_data.csv")
+    run_prepare_pipelines(max_workers)
 
     logger.info("Data preparation complete.")
 
@@ -17,8 +17,10 @@ Tasks:
 #####################################
 
 # Import from Python Standard Library
+import functools
 import pathlib
 import sys
+from typing import Dict, Optional, Tuple
 
 # Import from external packages (requires a virtual environment)
 import pandas as pd
@@ -27,10 +29,39 @@ import pandas as pd
 sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent.parent))
 
 # Import local modules (e.g. utils/logger.py)
-from utils.logger import logger  
+from utils.logger import logger, profiled
 
 # Optional: Use a data_scrubber module for common data cleaning tasks
-from utils.data_scrubber import DataScrubber  
+# (utils/data_scrubber.py in the template layout; this project keeps it in scripts/)
+try:
+    from utils.data_scrubber import DataScrubber
+except ModuleNotFoundError as e:
+    if e.name != "utils.data_scrubber":
+        raise
+    sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+    from data_scrubber import DataScrubber
+
+# Chunked (streaming) helpers for inputs too large to load at once
+from utils.streaming import DEFAULT_CHUNK_SIZE, ChunkDeduplicator
+from utils.streaming import process_in_chunks as stream_in_chunks
+
+# Compact column types (category, small integers)
+from utils.dtypes import apply_dtypes, plan_dtypes
+
+# Cached, format-detecting date parsing
+from utils.dates import DateParser
+
+# Prepared layer in CSV or a columnar format (parquet / feather)
+from utils.prepared_io import DEFAULT_PREPARED_FORMAT, prepared_path, write_prepared
+
+# Content-addressed cache of stage outputs, so an unchanged raw file is not cleaned again
+from utils.stage_cache import StageCache, run_cached_pipeline
+
+# Single-pass column profiles, saved next to the prepared files
+from utils.column_profile import DataFrameProfiler, log_profile, profile_dataframe, save_profile
+
+# Memory-mapped CSV reading
+from utils.mmap_csv import MappedCSV
 
 
 # Constants
@@ -40,6 +71,10 @@ PROJECT_ROOT: pathlib.Path = SCRIPTS_DIR.parent
 DATA_DIR: pathlib.Path = PROJECT_ROOT/ "data" 
 RAW_DATA_DIR: pathlib.Path = DATA_DIR / "raw"  
 PREPARED_DATA_DIR: pathlib.Path = DATA_DIR / "prepared"  # place to store prepared data
+CACHE_DIR: pathlib.Path = DATA_DIR / ".cache"  # stage outputs of earlier runs (see utils/stage_cache.py)
+DATA_SCRUBBER_SOURCE: pathlib.Path = pathlib.Path(sys.modules[DataScrubber.__module__].__file__)  # part of the cache keys
+PREPARED_FILE_NAME: str = "customers_prepared.csv"  # output of main(); its column profile is saved next to it
+DATE_COLUMNS = ["JoinDate"]  # written to the prepared data as ISO YYYY-MM-DD
 
 
 # Ensure the directories exist or create them
@@ -51,34 +86,87 @@ PREPARED_DATA_DIR.mkdir(exist_ok=True)
 # Define Functions - Reusable blocks of code / instructions
 #####################################
 
+def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Strip whitespace from column names and log any names that changed.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+    
+    Returns:
+        pd.DataFrame: DataFrame with cleaned column names.
+    """
+    original_columns = df.columns.tolist()
+    df.columns = df.columns.str.strip()
+    
+    # Log if any column names changed
+    changed_columns = [f"{old} -> {new}" for old, new in zip(original_columns, df.columns) if old != new]
+    if changed_columns:
+        logger.info(f"Cleaned column names: {', '.join(changed_columns)}")
+    return df
+
+
+@profiled()
 def read_raw_data(file_name: str) -> pd.DataFrame:
     """Read raw data from CSV."""
     file_path: pathlib.Path = RAW_DATA_DIR.joinpath(file_name)
-    try:
-        logger.info(f"READING: {file_path}.")
-        return pd.read_csv(file_path)
-    except FileNotFoundError:
-        logger.error(f"File not found: {file_path}")
-        return pd.DataFrame()  # Return an empty DataFrame if the file is not found
-    except Exception as e:
-        logger.error(f"Error reading {file_path}: {e}")
-        return pd.DataFrame()  # Return an empty DataFrame if any other error occurs
+    # Errors propagate: an empty DataFrame in place of a failed read would be cached as the file's contents
+    logger.info(f"READING: {file_path}.")
+    with MappedCSV(file_path) as raw_csv:  # memory-mapped: shares the page cache with other jobs reading the file
+        df = raw_csv.read()
+    # Compact column types: category for low-cardinality text, smallest integer types
+    df = apply_dtypes(df, plan_dtypes(df))
+
+    # Column profile (types, nulls, distinct counts, min/max, mean/variance, top values)
+    # in one pass, saved next to the prepared files (see utils/column_profile.py)
+    profile = profile_dataframe(df)
+    log_profile(profile)
+    save_profile(profile, PREPARED_DATA_DIR.joinpath(PREPARED_FILE_NAME))
+    return df
 
 
-def save_prepared_data(df: pd.DataFrame, file_name: str) -> None:
+@profiled()
+def save_prepared_data(df: pd.DataFrame, file_name: str, file_format: str = DEFAULT_PREPARED_FORMAT) -> None:
     """
-    Save cleaned data to CSV.
+    Save cleaned data to CSV, or to a columnar format (parquet / feather).
 
     Args:
         df (pd.DataFrame): Cleaned DataFrame.
         file_name (str): Name of the output file.
+        file_format (str): "csv", "parquet" or "feather". Default is "csv".
     """
     logger.info(f"FUNCTION START: save_prepared_data with file_name={file_name}, dataframe shape={df.shape}")
-    file_path = PREPARED_DATA_DIR.joinpath(file_name)
-    df.to_csv(file_path, index=False)
+    file_path = prepared_path(PREPARED_DATA_DIR.joinpath(file_name), file_format)
+    write_prepared(df, file_path)
     logger.info(f"Data saved to {file_path}")
 
 
+@profiled()
+def normalize_dates(df: pd.DataFrame, parsers: Optional[Dict[str, DateParser]] = None) -> pd.DataFrame:
+    """
+    Write the date columns as ISO YYYY-MM-DD, so downstream readers never parse them again.
+    The format is detected once per column and only distinct dates are parsed.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+        parsers (dict, optional): Column -> DateParser, kept across chunks in
+            streaming mode so each chunk only parses dates not seen before.
+    
+    Returns:
+        pd.DataFrame: DataFrame with ISO dates. Values that are not dates become missing.
+    """
+    logger.info(f"FUNCTION START: normalize_dates with dataframe shape={df.shape}")
+    parsers = {} if parsers is None else parsers
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            parser = parsers.setdefault(column, DateParser())
+            invalid_before = df[column].isna().sum()
+            df[column] = parser.to_iso(df[column])
+            logger.info(f"{column}: format {parser.date_format}, {df[column].isna().sum() - invalid_before} values were not dates")
+    return df
+
+
+@profiled()
 def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     """
     Remove duplicate rows from the DataFrame.
@@ -108,6 +196,7 @@ def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
 
 
 
+@profiled()
 def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     """
     Handle missing values by filling or dropping.
@@ -136,6 +225,7 @@ def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     logger.info(f"{len(df)} records remaining after handling missing values.")
     return df
 
+@profiled()
 def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
     """
     Remove outliers based on thresholds.
@@ -160,13 +250,54 @@ def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def process_in_chunks(input_file: str, output_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE, file_format: str = DEFAULT_PREPARED_FORMAT) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """
+    Streaming mode: run the cleaning stages chunk by chunk (see utils.streaming.process_in_chunks).
+
+    Duplicates are detected across chunks, so the output matches the
+    in-memory path (read_raw_data + remove_duplicates).
+
+    Args:
+        input_file (str): Name of the raw CSV file.
+        output_file (str): Name of the prepared file.
+        chunk_size (int): Maximum number of rows per chunk.
+        file_format (str): "csv", "parquet" or "feather". Default is "csv".
+    
+    Returns:
+        Tuple[Tuple[int, int], Tuple[int, int]]: (original shape, cleaned shape).
+    """
+    logger.info(f"FUNCTION START: process_in_chunks with input_file={input_file}, chunk_size={chunk_size}")
+    profiler = DataFrameProfiler()  # profile of the raw chunks, built in the same scan
+    stages = [
+        clean_column_names,
+        functools.partial(normalize_dates, parsers={}),  # parsers shared by all chunks
+        ChunkDeduplicator().drop_seen,
+        handle_missing_values,
+        remove_outliers,
+    ]
+    shapes = stream_in_chunks(RAW_DATA_DIR.joinpath(input_file),
+                              prepared_path(PREPARED_DATA_DIR.joinpath(output_file), file_format),
+                              stages, chunk_size, profiler)
+    save_profile(profiler.to_dict(), PREPARED_DATA_DIR.joinpath(output_file))
+    return shapes
+
+
 #####################################
 # Define Main Function - The main entry point of the script
 #####################################
 
-def main() -> None:
+def main(chunk_size: Optional[int] = None, file_format: str = DEFAULT_PREPARED_FORMAT, use_cache: bool = True) -> Tuple[Tuple[int, int], Tuple[int, int]]:
     """
     Main function for processing customer data.
+
+    Args:
+        chunk_size (int, optional): If given, run in streaming mode with
+            at most this many rows in memory at a time.
+        file_format (str): Prepared file format: "csv", "parquet" or "feather".
+        use_cache (bool): Reuse the stage outputs cached by earlier runs (in-memory mode only).
+
+    Returns:
+        Tuple[Tuple[int, int], Tuple[int, int]]: (original shape, cleaned shape).
     """
     logger.info("==================================")
     logger.info("STARTING prepare_customers_data.py")
@@ -178,38 +309,44 @@ def main() -> None:
     logger.info(f"scripts      : {SCRIPTS_DIR}")
 
     input_file = "customers_data.csv"
-    output_file = "customers_prepared.csv"
+    output_file = PREPARED_FILE_NAME
+
+    # Streaming mode for inputs too large to load at once
+    if chunk_size is not None:
+        original_shape, cleaned_shape = process_in_chunks(input_file, output_file, chunk_size, file_format)
+        logger.info("==================================")
+        logger.info(f"Original shape: {original_shape}")
+        logger.info(f"Cleaned shape:  {cleaned_shape}")
+        logger.info("==================================")
+        logger.info("FINISHED prepare_customers_data.py")
+        logger.info("==================================")
+        return original_shape, cleaned_shape
     
-    # Read raw data
-    df = read_raw_data(input_file)
-
-    # Record original shape
-    original_shape = df.shape
+    # Read and clean the raw data. Every stage output is cached in data/.cache,
+    # so an unchanged raw file is a cache hit and a crashed run resumes after
+    # its last completed stage.
+    load = ("read_raw_data", read_raw_data, {"file_name": input_file})
+    stages = [
+        ("clean_column_names", clean_column_names, {}),
+        ("normalize_dates", normalize_dates, {}),
+        ("remove_duplicates", remove_duplicates, {}),
+        ("handle_missing_values", handle_missing_values, {}),
+        ("remove_outliers", remove_outliers, {}),
+    ]
+    if use_cache:
+        df, original_shape = run_cached_pipeline(RAW_DATA_DIR / input_file, load, stages, StageCache(CACHE_DIR),
+                                                 sources=[pathlib.Path(__file__), DATA_SCRUBBER_SOURCE])
+    else:
+        df = read_raw_data(input_file)
+        original_shape = df.shape
+        for _, stage, params in stages:
+            df = stage(df, **params)
 
     # Log initial dataframe information
-    logger.info(f"Initial dataframe columns: {', '.join(df.columns.tolist())}")
-    logger.info(f"Initial dataframe shape: {df.shape}")
-    
-    # Clean column names
-    original_columns = df.columns.tolist()
-    df.columns = df.columns.str.strip()
-    
-    # Log if any column names changed
-    changed_columns = [f"{old} -> {new}" for old, new in zip(original_columns, df.columns) if old != new]
-    if changed_columns:
-        logger.info(f"Cleaned column names: {', '.join(changed_columns)}")
-
-    # Remove duplicates
-    df = remove_duplicates(df)
-
-    # Handle missing values
-    df = handle_missing_values(df)
-
-    # Remove outliers
-    df = remove_outliers(df)
+    logger.info(f"Initial dataframe shape: {original_shape}")
 
     # Save prepared data
-    save_prepared_data(df, output_file)
+    save_prepared_data(df, output_file, file_format)
 
     logger.info("==================================")
     logger.info(f"Original shape: {df.shape}")
@@ -217,6 +354,7 @@ def main() -> None:
     logger.info("==================================")
     logger.info("FINISHED prepare_customers_data.py")
     logger.info("==================================")
+    return original_shape, df.shape
 
 #####################################
 # Conditional Execution Block 
@@ -17,8 +17,10 @@ Tasks:
 #####################################
 
 # Import from Python Standard Library
+import functools
 import pathlib
 import sys
+from typing import Optional, Tuple
 
 # Import from external packages (requires a virtual environment)
 import pandas as pd
@@ -27,10 +29,39 @@ import pandas as pd
 sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent.parent))
 
 # Import local modules (e.g. utils/logger.py)
-from utils.logger import logger  
+from utils.logger import logger, profiled
 
 # Optional: Use a data_scrubber module for common data cleaning tasks
-from utils.data_scrubber import DataScrubber  
+# (utils/data_scrubber.py in the template layout; this project keeps it in scripts/)
+try:
+    from utils.data_scrubber import DataScrubber
+except ModuleNotFoundError as e:
+    if e.name != "utils.data_scrubber":
+        raise
+    sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+    from data_scrubber import DataScrubber
+
+# Chunked (streaming) helpers for inputs too large to load at once
+from utils.streaming import DEFAULT_CHUNK_SIZE, ChunkDeduplicator
+from utils.streaming import process_in_chunks as stream_in_chunks
+
+# Compact column types (category, small integers)
+from utils.dtypes import apply_dtypes, plan_dtypes
+
+# Prepared layer in CSV or a columnar format (parquet / feather)
+from utils.prepared_io import DEFAULT_PREPARED_FORMAT, prepared_path, write_prepared
+
+# Content-addressed cache of stage outputs, so an unchanged raw file is not cleaned again
+from utils.stage_cache import StageCache, run_cached_pipeline
+
+# Single-pass column profiles, saved next to the prepared files
+from utils.column_profile import DataFrameProfiler, log_profile, profile_dataframe, save_profile
+
+# Memory-mapped CSV reading
+from utils.mmap_csv import MappedCSV
+
+# Declarative validation rules, evaluated in one pass
+from utils.validation import RuleSet, ValidationReport
 
 
 # Constants
@@ -40,6 +71,22 @@ PROJECT_ROOT: pathlib.Path = SCRIPTS_DIR.parent
 DATA_DIR: pathlib.Path = PROJECT_ROOT/ "data" 
 RAW_DATA_DIR: pathlib.Path = DATA_DIR / "raw"  
 PREPARED_DATA_DIR: pathlib.Path = DATA_DIR / "prepared"  # place to store prepared data
+CACHE_DIR: pathlib.Path = DATA_DIR / ".cache"  # stage outputs of earlier runs (see utils/stage_cache.py)
+DATA_SCRUBBER_SOURCE: pathlib.Path = pathlib.Path(sys.modules[DataScrubber.__module__].__file__)  # part of the cache keys
+PREPARED_FILE_NAME: str = "products_prepared.csv"  # output of main(); its column profile is saved next to it
+
+# Business rules for products (cleaned column names); see utils/validation.py for the checks.
+# Adding a rule adds a check to the same pass, not another scan of the data.
+PRODUCT_RULES = [
+    {"name": "product_id_present", "column": "productid", "check": "not_null"},
+    {"name": "product_name_format", "column": "productname", "check": "pattern", "pattern": r"^[A-Za-z]+-\S+$"},
+    {"name": "known_category", "column": "category", "check": "allowed",
+     "values": ["Electronics", "Clothing", "Home", "Office"]},
+    {"name": "unit_price_range", "column": "unitprice", "check": "range", "min": 0, "max": 100_000},
+    {"name": "stock_quantity_range", "column": "stockquantity", "check": "range", "min": 0},
+    {"name": "supplier_present", "column": "supplier", "check": "not_null"},
+]
+PRODUCT_RULE_SET = RuleSet(PRODUCT_RULES)
 
 
 # Ensure the directories exist or create them
@@ -51,6 +98,26 @@ PREPARED_DATA_DIR.mkdir(exist_ok=True)
 # Define Functions - Reusable blocks of code / instructions
 #####################################
 
+def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Strip, lowercase, and snake_case column names and log any names that changed.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+    
+    Returns:
+        pd.DataFrame: DataFrame with cleaned column names.
+    """
+    original_columns = df.columns.tolist()
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+    
+    # Log if any column names changed
+    changed_columns = [f"{old} -> {new}" for old, new in zip(original_columns, df.columns) if old != new]
+    if changed_columns:
+        logger.info(f"Cleaned column names: {', '.join(changed_columns)}")
+    return df
+
+@profiled()
 def read_raw_data(file_name: str) -> pd.DataFrame:
     """
     Read raw data from CSV.
@@ -64,30 +131,38 @@ def read_raw_data(file_name: str) -> pd.DataFrame:
     logger.info(f"FUNCTION START: read_raw_data with file_name={file_name}")
     file_path = RAW_DATA_DIR.joinpath(file_name)
     logger.info(f"Reading data from {file_path}")
-    df = pd.read_csv(file_path)
+    with MappedCSV(file_path) as raw_csv:  # memory-mapped: shares the page cache with other jobs reading the file
+        df = raw_csv.read()
     logger.info(f"Loaded dataframe with {len(df)} rows and {len(df.columns)} columns")
-    
-    # TODO: OPTIONAL Add data profiling here to understand the dataset
-    # Suggestion: Log the datatypes of each column and the number of unique values
-    # Example:
-    # logger.info(f"Column datatypes: \n{df.dtypes}")
-    # logger.info(f"Number of unique values: \n{df.nunique()}")
-    
+
+    # Compact column types: category for low-cardinality text, smallest integer types
+    memory_before = df.memory_usage(deep=True).sum()
+    df = apply_dtypes(df, plan_dtypes(df))
+    logger.info(f"Optimized column types: {memory_before / 1e6:.2f} MB -> {df.memory_usage(deep=True).sum() / 1e6:.2f} MB")
+
+    # Column profile (types, nulls, distinct counts, min/max, mean/variance, top values)
+    # in one pass, saved next to the prepared files (see utils/column_profile.py)
+    profile = profile_dataframe(df)
+    log_profile(profile)
+    save_profile(profile, PREPARED_DATA_DIR.joinpath(PREPARED_FILE_NAME))
     return df
 
-def save_prepared_data(df: pd.DataFrame, file_name: str) -> None:
+@profiled()
+def save_prepared_data(df: pd.DataFrame, file_name: str, file_format: str = DEFAULT_PREPARED_FORMAT) -> None:
     """
-    Save cleaned data to CSV.
+    Save cleaned data to CSV, or to a columnar format (parquet / feather).
 
     Args:
         df (pd.DataFrame): Cleaned DataFrame.
         file_name (str): Name of the output file.
+        file_format (str): "csv", "parquet" or "feather". Default is "csv".
     """
     logger.info(f"FUNCTION START: save_prepared_data with file_name={file_name}, dataframe shape={df.shape}")
-    file_path = PREPARED_DATA_DIR.joinpath(file_name)
-    df.to_csv(file_path, index=False)
+    file_path = prepared_path(PREPARED_DATA_DIR.joinpath(file_name), file_format)
+    write_prepared(df, file_path)
     logger.info(f"Data saved to {file_path}")
 
+@profiled()
 def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     """
     Remove duplicate rows from the DataFrame.
@@ -112,6 +187,7 @@ def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     logger.info(f"{len(df)} records remaining after removing duplicates.")
     return df
 
+@profiled()
 def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     """
     Handle missing values by filling or dropping.
@@ -146,6 +222,7 @@ def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     logger.info(f"{len(df)} records remaining after handling missing values.")
     return df
 
+@profiled()
 def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
     """
     Remove outliers based on thresholds.
@@ -164,22 +241,19 @@ def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
     # Recommended - just use ranges based on reasonable data
     # People should not be 22 feet tall, etc. 
     # OPTIONAL ADVANCED: Use IQR method to identify outliers in numeric columns
+    # utils/outliers.py computes the quartiles of all columns in one pass and
+    # filters with a single mask; bounds_file reuses the bounds of earlier runs.
     # Example:
-    # for col in ['price', 'weight', 'length', 'width', 'height']:
-    #     if col in df.columns and df[col].dtype in ['int64', 'float64']:
-    #         Q1 = df[col].quantile(0.25)
-    #         Q3 = df[col].quantile(0.75)
-    #         IQR = Q3 - Q1
-    #         lower_bound = Q1 - 1.5 * IQR
-    #         upper_bound = Q3 + 1.5 * IQR
-    #         df = df[(df[col] >= lower_bound) & (df[col] <= upper_bound)]
-    #         logger.info(f"Applied outlier removal to {col}: bounds [{lower_bound}, {upper_bound}]")
+    # columns = [col for col in ['unitprice', 'stockquantity'] if col in df.columns]
+    # df = DataScrubber(df).filter_iqr_outliers(columns, bounds_file=PREPARED_DATA_DIR / "products_outlier_bounds.json")
+    # In streaming mode, estimate the bounds in a first pass with utils.outliers.StreamingQuantiles.
     
     removed_count = initial_count - len(df)
     logger.info(f"Removed {removed_count} outlier rows")
     logger.info(f"{len(df)} records remaining after removing outliers.")
     return df
 
+@profiled()
 def standardize_formats(df: pd.DataFrame) -> pd.DataFrame:
     """
     Standardize the formatting of various columns.
@@ -203,31 +277,81 @@ def standardize_formats(df: pd.DataFrame) -> pd.DataFrame:
     logger.info("Completed standardizing formats")
     return df
 
-def validate_data(df: pd.DataFrame) -> pd.DataFrame:
+@profiled()
+def validate_data(df: pd.DataFrame, report: Optional[ValidationReport] = None) -> pd.DataFrame:
     """
-    Validate data against business rules.
+    Validate data against business rules (PRODUCT_RULES) and drop the rows that break any of them.
 
     Args:
-        df (pd.DataFrame): Input DataFrame.
+        df (pd.DataFrame): Input DataFrame (or one chunk of the file).
+        report (ValidationReport, optional): Adds up the violation counts over chunks;
+            without one, the counts of this frame are logged.
     
     Returns:
         pd.DataFrame: Validated DataFrame.
     """
     logger.info(f"FUNCTION START: validate_data with dataframe shape={df.shape}")
     
-    # TODO: Implement data validation rules specific to products
-    # Suggestion: Check for valid values in critical fields
-    # Example:
-    # invalid_prices = df[df['price'] < 0].shape[0]
-    # logger.info(f"Found {invalid_prices} products with negative prices")
-    # df = df[df['price'] >= 0]
+    # All rules in one pass: a violation bitmask per row and a count per rule
+    result = PRODUCT_RULE_SET.validate(df)
+    if report is None:
+        report = ValidationReport(PRODUCT_RULE_SET)
+        report.update(result)
+        report.log()
+    else:
+        report.update(result)
+    if result.invalid_rows:
+        df = df[result.valid]
     
     logger.info("Data validation complete")
     return df
 
-def main() -> None:
+def process_in_chunks(input_file: str, output_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE, file_format: str = DEFAULT_PREPARED_FORMAT) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """
+    Streaming mode: run the cleaning stages chunk by chunk (see utils.streaming.process_in_chunks).
+
+    Duplicates are detected across chunks, so the output matches the
+    in-memory path (read_raw_data + remove_duplicates).
+
+    Args:
+        input_file (str): Name of the raw CSV file.
+        output_file (str): Name of the prepared file.
+        chunk_size (int): Maximum number of rows per chunk.
+        file_format (str): "csv", "parquet" or "feather". Default is "csv".
+    
+    Returns:
+        Tuple[Tuple[int, int], Tuple[int, int]]: (original shape, cleaned shape).
+    """
+    logger.info(f"FUNCTION START: process_in_chunks with input_file={input_file}, chunk_size={chunk_size}")
+    profiler = DataFrameProfiler()  # profile of the raw chunks, built in the same scan
+    validation = ValidationReport(PRODUCT_RULE_SET)  # rule violations of the whole file
+    stages = [
+        clean_column_names,
+        ChunkDeduplicator().drop_seen,
+        handle_missing_values,
+        remove_outliers,
+        functools.partial(validate_data, report=validation),
+        standardize_formats,
+    ]
+    shapes = stream_in_chunks(RAW_DATA_DIR.joinpath(input_file),
+                              prepared_path(PREPARED_DATA_DIR.joinpath(output_file), file_format),
+                              stages, chunk_size, profiler)
+    validation.log()
+    save_profile(profiler.to_dict(), PREPARED_DATA_DIR.joinpath(output_file))
+    return shapes
+
+def main(chunk_size: Optional[int] = None, file_format: str = DEFAULT_PREPARED_FORMAT, use_cache: bool = True) -> Tuple[Tuple[int, int], Tuple[int, int]]:
     """
     Main function for processing product data.
+
+    Args:
+        chunk_size (int, optional): If given, run in streaming mode with
+            at most this many rows in memory at a time.
+        file_format (str): Prepared file format: "csv", "parquet" or "feather".
+        use_cache (bool): Reuse the stage outputs cached by earlier runs (in-memory mode only).
+
+    Returns:
+        Tuple[Tuple[int, int], Tuple[int, int]]: (original shape, cleaned shape).
     """
     logger.info("==================================")
     logger.info("STARTING prepare_products_data.py")
@@ -239,47 +363,45 @@ def main() -> None:
     logger.info(f"scripts      : {SCRIPTS_DIR}")
 
     input_file = "products_data.csv"
-    output_file = "products_prepared.csv"
+    output_file = PREPARED_FILE_NAME
+
+    # Streaming mode for inputs too large to load at once
+    if chunk_size is not None:
+        original_shape, cleaned_shape = process_in_chunks(input_file, output_file, chunk_size, file_format)
+        logger.info("==================================")
+        logger.info(f"Original shape: {original_shape}")
+        logger.info(f"Cleaned shape:  {cleaned_shape}")
+        logger.info("==================================")
+        logger.info("FINISHED prepare_products_data.py")
+        logger.info("==================================")
+        return original_shape, cleaned_shape
     
-    # Read raw data
-    df = read_raw_data(input_file)
-
-        # Read raw data
-    df = read_raw_data(input_file)
-
-    # Record original shape
-    original_shape = df.shape
+    # Read and clean the raw data. Every stage output is cached in data/.cache,
+    # so an unchanged raw file is a cache hit and a crashed run resumes after
+    # its last completed stage.
+    load = ("read_raw_data", read_raw_data, {"file_name": input_file})
+    stages = [
+        ("clean_column_names", clean_column_names, {}),
+        ("remove_duplicates", remove_duplicates, {}),
+        ("handle_missing_values", handle_missing_values, {}),
+        ("remove_outliers", remove_outliers, {}),
+        ("validate_data", validate_data, {}),
+        ("standardize_formats", standardize_formats, {}),
+    ]
+    if use_cache:
+        df, original_shape = run_cached_pipeline(RAW_DATA_DIR / input_file, load, stages, StageCache(CACHE_DIR),
+                                                 sources=[pathlib.Path(__file__), DATA_SCRUBBER_SOURCE])
+    else:
+        df = read_raw_data(input_file)
+        original_shape = df.shape
+        for _, stage, params in stages:
+            df = stage(df, **params)
 
     # Log initial dataframe information
-    logger.info(f"Initial dataframe columns: {', '.join(df.columns.tolist())}")
-    logger.info(f"Initial dataframe shape: {df.shape}")
-    
-    # Clean column names
-    original_columns = df.columns.tolist()
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    
-    # Log if any column names changed
-    changed_columns = [f"{old} -> {new}" for old, new in zip(original_columns, df.columns) if old != new]
-    if changed_columns:
-        logger.info(f"Cleaned column names: {', '.join(changed_columns)}")
-
-    # Remove duplicates
-    df = remove_duplicates(df)
-
-    # Handle missing values
-    df = handle_missing_values(df)
-
-    # TODO:Remove outliers
-    df = remove_outliers(df)
-
-    # TODO: Validate data
-    df = validate_data(df)
-
-    # TODO: Standardize formats
-    df = standardize_formats(df)
+    logger.info(f"Initial dataframe shape: {original_shape}")
 
     # Save prepared data
-    save_prepared_data(df, output_file)
+    save_prepared_data(df, output_file, file_format)
 
     logger.info("==================================")
     logger.info(f"Original shape: {df.shape}")
@@ -287,6 +409,7 @@ def main() -> None:
     logger.info("==================================")
     logger.info("FINISHED prepare_products_data.py")
     logger.info("==================================")
+    return original_shape, df.shape
 
 # -------------------
 # Conditional Execution Block
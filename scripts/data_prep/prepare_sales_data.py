@@ -17,8 +17,10 @@ Tasks:
 #####################################
 
 # Import from Python Standard Library
+import functools
 import pathlib
 import sys
+from typing import Dict, Optional, Tuple
 
 # Import from external packages (requires a virtual environment)
 import pandas as pd
@@ -27,10 +29,40 @@ import pandas as pd
 sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent.parent))
 
 # Import local modules (e.g. utils/logger.py)
-from utils.logger import logger  
+from utils.logger import logger, profiled
 
 # Optional: Use a data_scrubber module for common data cleaning tasks
-from utils.data_scrubber import DataScrubber  
+# (utils/data_scrubber.py in the template layout; this project keeps it in scripts/)
+try:
+    from utils.data_scrubber import DataScrubber
+except ModuleNotFoundError as e:
+    if e.name != "utils.data_scrubber":
+        raise
+    sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+    from data_scrubber import DataScrubber
+
+# Chunked (streaming) helpers for inputs too large to load at once
+from utils.streaming import DEFAULT_CHUNK_SIZE, ChunkDeduplicator
+from utils.streaming import process_in_chunks as stream_in_chunks
+
+# Compact column types (category, small integers)
+from utils.dtypes import apply_dtypes, plan_dtypes
+
+# Cached, format-detecting date parsing
+from utils.dates import DateParser, detect_date_format
+
+# Prepared layer in CSV or a columnar format (parquet / feather)
+from utils.prepared_io import DEFAULT_PREPARED_FORMAT, prepared_path, write_prepared
+
+# Content-addressed cache of stage outputs, so an unchanged raw file is not cleaned again
+from utils.stage_cache import StageCache, run_cached_pipeline
+
+# Single-pass column profiles, saved next to the prepared files
+from utils.column_profile import DataFrameProfiler, log_profile, profile_dataframe, save_profile
+
+# Memory-mapped CSV reading, and parsing on several cores
+from utils.mmap_csv import MappedCSV
+from utils.parallel_csv import read_csv_parallel
 
 
 # Constants
@@ -40,6 +72,14 @@ PROJECT_ROOT: pathlib.Path = SCRIPTS_DIR.parent
 DATA_DIR: pathlib.Path = PROJECT_ROOT/ "data" 
 RAW_DATA_DIR: pathlib.Path = DATA_DIR / "raw"  
 PREPARED_DATA_DIR: pathlib.Path = DATA_DIR / "prepared"  # place to store prepared data
+CACHE_DIR: pathlib.Path = DATA_DIR / ".cache"  # stage outputs of earlier runs (see utils/stage_cache.py)
+DATA_SCRUBBER_SOURCE: pathlib.Path = pathlib.Path(sys.modules[DataScrubber.__module__].__file__)  # part of the cache keys
+PREPARED_FILE_NAME: str = "sales_prepared.csv"  # output of main(); its column profile is saved next to it
+DATE_COLUMNS = ["SaleDate"]  # written to the prepared data as ISO YYYY-MM-DD
+DATE_SAMPLE_ROWS: int = 100_000  # first raw rows the date formats are detected from
+REQUIRED_COLUMNS = ["TransactionID", "CustomerID", "ProductID", "SaleAmount"]  # a sale is dropped without these
+NUMERIC_COLUMNS = ["SaleAmount", "DiscountPercent"]  # placeholders such as "?" become missing
+VALID_RANGES = {"SaleAmount": (0, float("inf")), "DiscountPercent": (0, 100)}  # inclusive bounds
 
 
 # Ensure the directories exist or create them
@@ -51,8 +91,27 @@ PREPARED_DATA_DIR.mkdir(exist_ok=True)
 # Define Functions - Reusable blocks of code / instructions
 #####################################
 
-# TODO: Complete this by implementing functions based on the logic in the other scripts
+def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Strip whitespace from column names and log any names that changed.
 
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+    
+    Returns:
+        pd.DataFrame: DataFrame with cleaned column names.
+    """
+    original_columns = df.columns.tolist()
+    df.columns = df.columns.str.strip()
+    
+    # Log if any column names changed
+    changed_columns = [f"{old} -> {new}" for old, new in zip(original_columns, df.columns) if old != new]
+    if changed_columns:
+        logger.info(f"Cleaned column names: {', '.join(changed_columns)}")
+    return df
+
+
+@profiled()
 def read_raw_data(file_name: str) -> pd.DataFrame:
     """
     Read raw data from CSV.
@@ -66,25 +125,256 @@ def read_raw_data(file_name: str) -> pd.DataFrame:
     logger.info(f"FUNCTION START: read_raw_data with file_name={file_name}")
     file_path = RAW_DATA_DIR.joinpath(file_name)
     logger.info(f"Reading data from {file_path}")
-    df = pd.read_csv(file_path)
+    with MappedCSV(file_path) as raw_csv:  # memory-mapped: shares the page cache with other jobs reading the file
+        df = raw_csv.read()
     logger.info(f"Loaded dataframe with {len(df)} rows and {len(df.columns)} columns")
+
+    # Compact column types: category for low-cardinality text, smallest integer types
+    memory_before = df.memory_usage(deep=True).sum()
+    df = apply_dtypes(df, plan_dtypes(df))
+    logger.info(f"Optimized column types: {memory_before / 1e6:.2f} MB -> {df.memory_usage(deep=True).sum() / 1e6:.2f} MB")
+
+    # Column profile (types, nulls, distinct counts, min/max, mean/variance, top values)
+    # in one pass, saved next to the prepared files (see utils/column_profile.py)
+    profile = profile_dataframe(df)
+    log_profile(profile)
+    save_profile(profile, PREPARED_DATA_DIR.joinpath(PREPARED_FILE_NAME))
+    return df
+
+
+@profiled()
+def read_raw_data_parallel(file_name: str, max_workers: Optional[int] = None,
+                           date_formats: Optional[Dict[str, Optional[str]]] = None) -> pd.DataFrame:
+    """
+    Read raw data from CSV on several cores (see utils/parallel_csv.py).
+    Column names and dates are cleaned in the worker processes, range by range.
+
+    Args:
+        file_name (str): Name of the CSV file to read.
+        max_workers (int, optional): Worker processes; the number of CPUs by default.
+        date_formats (dict, optional): Column -> date format (see detect_date_formats);
+            detected here if not given, so every range parses dates the same way.
+
+    Returns:
+        pd.DataFrame: Loaded DataFrame, after clean_column_names and normalize_dates.
+    """
+    logger.info(f"FUNCTION START: read_raw_data_parallel with file_name={file_name}, max_workers={max_workers}")
+    file_path = RAW_DATA_DIR.joinpath(file_name)
+    date_formats = detect_date_formats(file_name) if date_formats is None else date_formats
+    df = read_csv_parallel(file_path, stages=[clean_column_names, functools.partial(normalize_dates, date_formats=date_formats)],
+                           max_workers=max_workers)
+    logger.info(f"Loaded dataframe with {len(df)} rows and {len(df.columns)} columns")
+
+    # Compact column types: category for low-cardinality text, smallest integer types
+    memory_before = df.memory_usage(deep=True).sum()
+    df = apply_dtypes(df, plan_dtypes(df))
+    logger.info(f"Optimized column types: {memory_before / 1e6:.2f} MB -> {df.memory_usage(deep=True).sum() / 1e6:.2f} MB")
+
+    # Column profile, as in read_raw_data (column names and dates are already cleaned here)
+    profile = profile_dataframe(df)
+    log_profile(profile)
+    save_profile(profile, PREPARED_DATA_DIR.joinpath(PREPARED_FILE_NAME))
+    return df
+
+
+@profiled()
+def save_prepared_data(df: pd.DataFrame, file_name: str, file_format: str = DEFAULT_PREPARED_FORMAT) -> None:
+    """
+    Save cleaned data to CSV, or to a columnar format (parquet / feather).
+
+    Args:
+        df (pd.DataFrame): Cleaned DataFrame.
+        file_name (str): Name of the output file.
+        file_format (str): "csv", "parquet" or "feather". Default is "csv".
+    """
+    logger.info(f"FUNCTION START: save_prepared_data with file_name={file_name}, dataframe shape={df.shape}")
+    file_path = prepared_path(PREPARED_DATA_DIR.joinpath(file_name), file_format)
+    write_prepared(df, file_path)
+    logger.info(f"Data saved to {file_path}")
+
+
+def detect_date_formats(file_name: str) -> Dict[str, Optional[str]]:
+    """
+    Detect the format of each date column once, from the first rows of a raw file.
+
+    Every reading mode (in memory, streaming, parallel) parses dates with these
+    formats, so they all read an ambiguous date such as 05/04/2025 the same way.
+
+    Args:
+        file_name (str): Name of the raw CSV file.
+
+    Returns:
+        Dict[str, Optional[str]]: Date column -> strptime format (None if no format parses it).
+    """
+    sample = pd.read_csv(RAW_DATA_DIR.joinpath(file_name), nrows=DATE_SAMPLE_ROWS, dtype=str,
+                         usecols=lambda column: column.strip() in DATE_COLUMNS)
+    sample = clean_column_names(sample)
+    date_formats = {column: detect_date_format(sample[column]) for column in sample.columns}
+    logger.info(f"Detected date formats: {date_formats}")
+    return date_formats
+
+
+@profiled()
+def normalize_dates(df: pd.DataFrame, parsers: Optional[Dict[str, DateParser]] = None,
+                    date_formats: Optional[Dict[str, Optional[str]]] = None) -> pd.DataFrame:
+    """
+    Write the date columns as ISO YYYY-MM-DD, so downstream readers never parse them again.
+    The format is detected once per column and only distinct dates are parsed.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+        parsers (dict, optional): Column -> DateParser, kept across chunks in
+            streaming mode so each chunk only parses dates not seen before.
+        date_formats (dict, optional): Column -> date format (see detect_date_formats);
+            detected from the column itself when missing.
+    
+    Returns:
+        pd.DataFrame: DataFrame with ISO dates. Values that are not dates become missing.
+    """
+    logger.info(f"FUNCTION START: normalize_dates with dataframe shape={df.shape}")
+    parsers = {} if parsers is None else parsers
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            parser = parsers.setdefault(column, DateParser((date_formats or {}).get(column)))
+            invalid_before = df[column].isna().sum()
+            df[column] = parser.to_iso(df[column])
+            logger.info(f"{column}: format {parser.date_format}, {df[column].isna().sum() - invalid_before} values were not dates")
+    return df
+
+
+@profiled()
+def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Remove duplicate rows from the DataFrame.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
     
-    # TODO: OPTIONAL Add data profiling here to understand the dataset
-    # Suggestion: Log the datatypes of each column and the number of unique values
-    # Example:
-    # logger.info(f"Column datatypes: \n{df.dtypes}")
-    # logger.info(f"Number of unique values: \n{df.nunique()}")
+    Returns:
+        pd.DataFrame: DataFrame with duplicates removed.
+    """
+    logger.info(f"FUNCTION START: remove_duplicates with dataframe shape={df.shape}")
+    initial_count = len(df)
+
+    df = DataScrubber(df).remove_duplicate_records()
+
+    removed_count = initial_count - len(df)
+    logger.info(f"Removed {removed_count} duplicate rows")
+    logger.info(f"{len(df)} records remaining after removing duplicates.")
+    return df
+
+
+@profiled()
+def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Handle missing values by filling or dropping.
+    This logic is specific to the actual data and business rules.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+    
+    Returns:
+        pd.DataFrame: DataFrame with missing values handled.
+    """
+    logger.info(f"FUNCTION START: handle_missing_values with dataframe shape={df.shape}")
     
+    # Placeholders in numeric columns (e.g. "?" for an unknown amount) are missing values
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns and not pd.api.types.is_numeric_dtype(df[column]):
+            numbers = pd.to_numeric(df[column].astype(object), errors="coerce")
+            logger.info(f"{column}: {numbers.isna().sum() - df[column].isna().sum()} non-numeric values set to missing")
+            df[column] = numbers
+
+    # Log missing values count before handling
+    missing_before = df.isna().sum().sum()
+    logger.info(f"Total missing values before handling: {missing_before}")
+    
+    # A sale needs its keys and its amount; a missing CampaignID means no campaign and is kept
+    df = df.dropna(subset=[column for column in REQUIRED_COLUMNS if column in df.columns])
+    
+    # Log missing values count after handling
+    missing_after = df.isna().sum().sum()
+    logger.info(f"Total missing values after handling: {missing_after}")
+    logger.info(f"{len(df)} records remaining after handling missing values.")
     return df
 
 
+@profiled()
+def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Remove outliers based on thresholds.
+    This logic is very specific to the actual data and business rules.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+    
+    Returns:
+        pd.DataFrame: DataFrame with outliers removed.
+    """
+    logger.info(f"FUNCTION START: remove_outliers with dataframe shape={df.shape}")
+    initial_count = len(df)
+    
+    # Range rules, in one combined mask: amounts are not negative, discounts are percentages
+    bounds = {column: bound for column, bound in VALID_RANGES.items() if column in df.columns}
+    if bounds:
+        df = DataScrubber(df).filter_outliers(bounds)
+    
+    removed_count = initial_count - len(df)
+    logger.info(f"Removed {removed_count} outlier rows")
+    logger.info(f"{len(df)} records remaining after removing outliers.")
+    return df
+
+
+def process_in_chunks(input_file: str, output_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE, file_format: str = DEFAULT_PREPARED_FORMAT) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """
+    Streaming mode: run the cleaning stages chunk by chunk (see utils.streaming.process_in_chunks).
+
+    Duplicates are detected across chunks, so the output matches the
+    in-memory path (read_raw_data + remove_duplicates).
+
+    Args:
+        input_file (str): Name of the raw CSV file.
+        output_file (str): Name of the prepared file.
+        chunk_size (int): Maximum number of rows per chunk.
+        file_format (str): "csv", "parquet" or "feather". Default is "csv".
+    
+    Returns:
+        Tuple[Tuple[int, int], Tuple[int, int]]: (original shape, cleaned shape).
+    """
+    logger.info(f"FUNCTION START: process_in_chunks with input_file={input_file}, chunk_size={chunk_size}")
+    profiler = DataFrameProfiler()  # profile of the raw chunks, built in the same scan
+    stages = [
+        clean_column_names,
+        functools.partial(normalize_dates, parsers={}, date_formats=detect_date_formats(input_file)),  # parsers shared by all chunks
+        ChunkDeduplicator().drop_seen,
+        handle_missing_values,
+        remove_outliers,
+    ]
+    shapes = stream_in_chunks(RAW_DATA_DIR.joinpath(input_file),
+                              prepared_path(PREPARED_DATA_DIR.joinpath(output_file), file_format),
+                              stages, chunk_size, profiler)
+    save_profile(profiler.to_dict(), PREPARED_DATA_DIR.joinpath(output_file))
+    return shapes
+
+
 #####################################
 # Define Main Function - The main entry point of the script
 #####################################
 
-def main() -> None:
+def main(chunk_size: Optional[int] = None, file_format: str = DEFAULT_PREPARED_FORMAT, use_cache: bool = True,
+         max_workers: Optional[int] = None) -> Tuple[Tuple[int, int], Tuple[int, int]]:
     """
     Main function for processing data.
+
+    Args:
+        chunk_size (int, optional): If given, run in streaming mode with
+            at most this many rows in memory at a time.
+        file_format (str): Prepared file format: "csv", "parquet" or "feather".
+        use_cache (bool): Reuse the stage outputs cached by earlier runs (in-memory mode only).
+        max_workers (int, optional): Parse the raw file on this many cores (in-memory mode only).
+
+    Returns:
+        Tuple[Tuple[int, int], Tuple[int, int]]: (original shape, cleaned shape).
     """
     logger.info("==================================")
     logger.info("STARTING prepare_sales_data.py")
@@ -96,35 +386,51 @@ def main() -> None:
     logger.info(f"scripts      : {SCRIPTS_DIR}")
 
     input_file = "sales_data.csv"
-    output_file = "sales_prepared.csv"
-    
-    # Read raw data
-    df = read_raw_data(input_file)
+    output_file = PREPARED_FILE_NAME
 
-    # Record original shape
-    original_shape = df.shape
-
-    # Log initial dataframe information
-    logger.info(f"Initial dataframe columns: {', '.join(df.columns.tolist())}")
-    logger.info(f"Initial dataframe shape: {df.shape}")
+    # Streaming mode for inputs too large to load at once
+    if chunk_size is not None:
+        original_shape, cleaned_shape = process_in_chunks(input_file, output_file, chunk_size, file_format)
+        logger.info("==================================")
+        logger.info(f"Original shape: {original_shape}")
+        logger.info(f"Cleaned shape:  {cleaned_shape}")
+        logger.info("==================================")
+        logger.info("FINISHED prepare_sales_data.py")
+        logger.info("==================================")
+        return original_shape, cleaned_shape
     
-    # Clean column names
-    original_columns = df.columns.tolist()
-    df.columns = df.columns.str.strip()
-    
-    # Log if any column names changed
-    changed_columns = [f"{old} -> {new}" for old, new in zip(original_columns, df.columns) if old != new]
-    if changed_columns:
-        logger.info(f"Cleaned column names: {', '.join(changed_columns)}")
-
-    # TODO: Remove duplicates
+    # Read and clean the raw data. Every stage output is cached in data/.cache,
+    # so an unchanged raw file is a cache hit and a crashed run resumes after
+    # its last completed stage.
+    date_formats = detect_date_formats(input_file)
+    load = ("read_raw_data", read_raw_data, {"file_name": input_file})
+    stages = [
+        ("clean_column_names", clean_column_names, {}),
+        ("normalize_dates", normalize_dates, {"date_formats": date_formats}),
+        ("remove_duplicates", remove_duplicates, {}),
+        ("handle_missing_values", handle_missing_values, {}),
+        ("remove_outliers", remove_outliers, {}),
+    ]
+    if max_workers is not None:
+        # Parse on several cores; the row-by-row stages (column names, dates) run in the workers
+        load = ("read_raw_data_parallel", read_raw_data_parallel,
+                {"file_name": input_file, "max_workers": max_workers, "date_formats": date_formats})
+        stages = stages[2:]
+    if use_cache:
+        df, original_shape = run_cached_pipeline(RAW_DATA_DIR / input_file, load, stages, StageCache(CACHE_DIR),
+                                                 sources=[pathlib.Path(__file__), DATA_SCRUBBER_SOURCE])
+    else:
+        _, read, params = load
+        df = read(**params)
+        original_shape = df.shape
+        for _, stage, params in stages:
+            df = stage(df, **params)
 
-    # TODO:Handle missing values
-
-    # TODO:Remove outliers
+    # Log initial dataframe information
+    logger.info(f"Initial dataframe shape: {original_shape}")
 
-    # TODO:Save prepared data
-    
+    # Save prepared data
+    save_prepared_data(df, output_file, file_format)
 
     logger.info("==================================")
     logger.info(f"Original shape: {df.shape}")
@@ -132,6 +438,7 @@ def main() -> None:
     logger.info("==================================")
     logger.info("FINISHED prepare_sales_data.py")
     logger.info("==================================")
+    return original_shape, df.shape
 
 #####################################
 # Conditional Execution Block 
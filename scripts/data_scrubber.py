@@ -10,7 +10,8 @@ This class provides methods for:
 - Handling missing values
 - Filtering outliers
 - Renaming and reordering columns
-- Formatting strings
+- Formatting strings (one column, or many at once with normalize_string_columns)
+- Compacting column types
 - Parsing date fields
 
 Use this class to perform similar cleaning operations across multiple files.  
@@ -22,21 +23,134 @@ Example:
     scrubber = DataScrubber(df)
     df = scrubber.remove_duplicate_records().handle_missing_data(fill_value="N/A")
 
+Lazy mode:
+    With lazy=True, the row and column methods (remove_duplicate_records,
+    handle_missing_data, filter_column_outliers, rename_columns,
+    reorder_columns, drop_columns) only record a step in a plan and return
+    the scrubber, so calls can be chained. collect() runs the whole plan at
+    once: consecutive filters are combined into one boolean mask, so the rows
+    are copied once instead of once per filter, and columns that are dropped
+    are never copied. A plan with a single filter costs the same as eager mode.
+
+    scrubber = DataScrubber(df, lazy=True)
+    df = (scrubber.drop_columns(["Notes"])
+                  .filter_column_outliers("SaleAmount", 0, 10000)
+                  .remove_duplicate_records()
+                  .collect())
+
 """
 
 import io
+import numpy as np
 import pandas as pd
-from typing import Dict, Tuple, Union, List
+import pathlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from utils.dedup import check_keep, duplicated_mask
+from utils.dtypes import apply_dtypes, plan_dtypes
+from utils.dates import parse_dates, to_iso_dates
+from utils.outliers import DEFAULT_IQR_MULTIPLIER, iqr_bounds, iqr_bounds_cached, outlier_mask
+from utils.strings import normalize_columns
 
 class DataScrubber:
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, lazy: bool = False):
         """
         Initialize the DataScrubber with a DataFrame.
         
         Parameters:
             df (pd.DataFrame): The DataFrame to be scrubbed.
+            lazy (bool, optional): If True, row and column operations are recorded in a plan
+                that runs on collect(), and they return the scrubber instead of a DataFrame.
+                Default is False.
         """
         self.df = df
+        self.lazy = lazy
+        self._reset_plan()
+
+    def _reset_plan(self) -> None:
+        """Start an empty plan over the current DataFrame."""
+        # Each live column is tracked as (current name, original column name),
+        # so renames, drops and reorders never touch the data.
+        self._live_columns: List[Tuple[str, str]] = [(column, column) for column in self.df.columns]
+        self._plan: List[Tuple[str, Any]] = []
+
+    def _current_columns(self) -> List[str]:
+        """Return the column names as they are at this point of the plan."""
+        if self.lazy:
+            return [name for name, _ in self._live_columns]
+        return list(self.df.columns)
+
+    def _flush_plan(self) -> None:
+        """Run any pending plan so eager-only methods see the up-to-date DataFrame."""
+        if self.lazy and (self._plan or self._live_columns != [(c, c) for c in self.df.columns]):
+            self.df = self.collect()
+
+    def collect(self) -> pd.DataFrame:
+        """
+        Run the recorded plan and return the resulting DataFrame.
+
+        Row filters and missing-value drops are fused into one boolean mask and
+        applied before duplicate removal within each step between fills.
+        This is safe because duplicate rows have equal values in every column a
+        later filter can see. Duplicate removal on a key subset does not have
+        that property, so, like a fill, it ends a step. Columns that are neither
+        kept nor read by a step are dropped before any row work, and every step
+        runs on the DataFrame itself, as the eager methods do.
+
+        Returns:
+            pd.DataFrame: DataFrame with the whole plan applied.
+        """
+        if not self.lazy:
+            return self.df
+
+        # Only the output columns and the columns the steps read
+        needed = {key for _, key in self._live_columns}
+        for operation, args in self._plan:
+            if operation == "filter":
+                needed.add(args[0])
+            elif operation == "dropna":
+                needed.update(args)
+            else:
+                needed.update(args[0])
+        df = self.df[[column for column in self.df.columns if column in needed]]
+
+        # Split the plan at fills: a fill changes values, so nothing may move across it
+        segments: List[List[Tuple[str, Any]]] = [[]]
+        for step in self._plan:
+            segments[-1].append(step)
+            if step[0] == "fill" or (step[0] == "dedup" and step[1][2]):
+                segments.append([])
+
+        for segment in segments:
+            # Fused mask for all filters and missing-value drops in this segment
+            keep = None
+            for operation, args in segment:
+                if operation == "filter":
+                    key, lower_bound, upper_bound = args
+                    mask = df[key].between(lower_bound, upper_bound).to_numpy()
+                elif operation == "dropna":
+                    mask = df[args].notna().all(axis=1).to_numpy()
+                else:
+                    continue
+                keep = mask if keep is None else keep & mask
+            if keep is not None and not keep.all():
+                df = df[keep]
+
+            # Duplicate removal only looks at the rows still kept
+            for operation, args in segment:
+                if operation == "dedup":
+                    keys, keep_policy, _ = args
+                    df = df[~duplicated_mask(df, keys, keep_policy)]
+                elif operation == "fill":
+                    keys, fill_value = args
+                    df = df.fillna({key: fill_value for key in keys})
+
+        result = df[[key for _, key in self._live_columns]]
+        result.columns = [name for name, _ in self._live_columns]
+
+        self.df = result
+        self._reset_plan()
+        return result
 
     def check_data_consistency_before_cleaning(self) -> Dict[str, Union[pd.Series, int]]:
         """
@@ -45,8 +159,9 @@ class DataScrubber:
         Returns:
             dict: Dictionary with counts of null values and duplicate rows.
         """
+        self._flush_plan()
         null_counts = self.df.isnull().sum()
-        duplicate_count = self.df.duplicated().sum()
+        duplicate_count = int(duplicated_mask(self.df).sum())
         return {'null_counts': null_counts, 'duplicate_count': duplicate_count}
 
     def check_data_consistency_after_cleaning(self) -> Dict[str, Union[pd.Series, int]]:
@@ -56,8 +171,9 @@ class DataScrubber:
         Returns:
             dict: Dictionary with counts of null values and duplicate rows, expected to be zero for each.
         """
+        self._flush_plan()
         null_counts = self.df.isnull().sum()
-        duplicate_count = self.df.duplicated().sum()
+        duplicate_count = int(duplicated_mask(self.df).sum())
         assert null_counts.sum() == 0, "Data still contains null values after cleaning."
         assert duplicate_count == 0, "Data still contains duplicate records after cleaning."
         return {'null_counts': null_counts, 'duplicate_count': duplicate_count}
@@ -76,6 +192,7 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
+        self._flush_plan()
         try:
             self.df[column] = self.df[column].astype(new_type)
             return self.df
@@ -96,8 +213,11 @@ class DataScrubber:
             ValueError: If a specified column is not found in the DataFrame.
         """
         for column in columns:
-            if column not in self.df.columns:
+            if column not in self._current_columns():
                 raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+        if self.lazy:
+            self._live_columns = [(name, key) for name, key in self._live_columns if name not in columns]
+            return self
         self.df = self.df.drop(columns=columns)
         return self.df
 
@@ -116,15 +236,75 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
+        if self.lazy:
+            if column not in self._current_columns():
+                raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+            self._plan.append(("filter", (dict(self._live_columns)[column], lower_bound, upper_bound)))
+            return self
         try:
             self.df = self.df[(self.df[column] >= lower_bound) & (self.df[column] <= upper_bound)]
             return self.df
         except KeyError:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
 
+    def filter_outliers(self, bounds: Dict[str, Tuple[Union[float, int], Union[float, int]]]) -> pd.DataFrame:
+        """
+        Filter outliers in several columns at once with one combined mask.
+
+        Same result as calling filter_column_outliers for each column, without
+        building a filtered copy of the DataFrame per column.
+        
+        Parameters:
+            bounds (dict): Column name -> (lower bound, upper bound).
+        
+        Returns:
+            pd.DataFrame: Updated DataFrame with outliers filtered out.
+ 
+        Raises:
+            ValueError: If a specified column is not found in the DataFrame.
+        """
+        missing = [column for column in bounds if column not in self._current_columns()]
+        if missing:
+            raise ValueError(f"Columns {missing} not found in the DataFrame.")
+        if self.lazy:
+            keys = dict(self._live_columns)
+            for column, (lower_bound, upper_bound) in bounds.items():
+                self._plan.append(("filter", (keys[column], lower_bound, upper_bound)))
+            return self
+        self.df = self.df[outlier_mask(self.df, bounds, keep_missing=False)]
+        return self.df
+
+    def filter_iqr_outliers(self, columns: Optional[List[str]] = None, k: float = DEFAULT_IQR_MULTIPLIER,
+                            bounds_file: Optional[pathlib.Path] = None) -> pd.DataFrame:
+        """
+        Filter rows outside Q1 - k*IQR .. Q3 + k*IQR in any of the given columns.
+
+        The quartiles of all columns are computed in one vectorized pass. With a
+        bounds_file, bounds saved by an earlier run are reused (see utils/outliers.py).
+        
+        Parameters:
+            columns (list, optional): Columns to check; every numeric column by default.
+            k (float, optional): IQR multiplier. Default is 1.5.
+            bounds_file (pathlib.Path, optional): JSON file to reuse or save this dataset's bounds.
+        
+        Returns:
+            pd.DataFrame: Updated DataFrame with outliers filtered out.
+ 
+        Raises:
+            ValueError: If a specified column is not found in the DataFrame or is not numeric.
+        """
+        # The quartiles depend on every earlier step
+        self._flush_plan()
+        if bounds_file is not None:
+            bounds = iqr_bounds_cached(self.df, bounds_file, columns, k)
+        else:
+            bounds = iqr_bounds(self.df, columns, k)
+        return self.filter_outliers(bounds)
+
     def format_column_strings_to_lower_and_trim(self, column: str) -> pd.DataFrame:
         """
         Format strings in a specified column by converting to lowercase and trimming whitespace.
+        (see normalize_string_columns to format several columns at once).
         
         Parameters:
             column (str): Name of the column to format.
@@ -135,15 +315,15 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
-        try:
-            self.df[column] = self.df[column].str.lower().str.strip()
-            return self.df
-        except KeyError:
+        self._flush_plan()
+        if column not in self.df.columns:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+        return self.normalize_string_columns([column], case="lower")
         
     def format_column_strings_to_upper_and_trim(self, column: str) -> pd.DataFrame:
         """
         Format strings in a specified column by converting to uppercase and trimming whitespace.
+        (see normalize_string_columns to format several columns at once).
         
         Parameters:
             column (str): Name of the column to format.
@@ -154,13 +334,10 @@ class DataScrubber:
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
-        try:
-            # TODO: Fix the following logic to call str.upper() and str.strip() on the given column 
-            # HINT: See previous function for an example
-            self.df[column] = self.df[column]
-            return self.df
-        except KeyError:
+        self._flush_plan()
+        if column not in self.df.columns:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+        return self.normalize_string_columns([column], case="upper")
 
     def handle_missing_data(self, drop: bool = False, fill_value: Union[None, float, int, str] = None) -> pd.DataFrame:
         """
@@ -173,6 +350,13 @@ class DataScrubber:
         Returns:
             pd.DataFrame: Updated DataFrame with missing data handled.
         """
+        if self.lazy:
+            keys = [key for _, key in self._live_columns]
+            if drop:
+                self._plan.append(("dropna", keys))
+            elif fill_value is not None:
+                self._plan.append(("fill", (keys, fill_value)))
+            return self
         if drop:
             self.df = self.df.dropna()
         elif fill_value is not None:
@@ -187,6 +371,7 @@ class DataScrubber:
             tuple: (info_str, describe_str), where `info_str` is a string representation of DataFrame.info()
                    and `describe_str` is a string representation of DataFrame.describe().
         """
+        self._flush_plan()
         buffer = io.StringIO()
         self.df.info(buf=buffer)
         info_str = buffer.getvalue()  # Retrieve the string content of the buffer
@@ -195,34 +380,128 @@ class DataScrubber:
         describe_str = self.df.describe().to_string()  # Convert DataFrame.describe() output to a string
         return info_str, describe_str
 
-    def parse_dates_to_add_standard_datetime(self, column: str) -> pd.DataFrame:
+    def optimize_dtypes(self, exclude: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Convert columns to compact, lossless types: category for low-cardinality
+        text columns, the smallest integer type that holds every value, and
+        float32 where it is exact (see utils/dtypes.py).
+        
+        Parameters:
+            exclude (list, optional): Columns to leave as they are.
+        
+        Returns:
+            pd.DataFrame: Updated DataFrame with compact column types.
+        """
+        self._flush_plan()
+        self.df = apply_dtypes(self.df, plan_dtypes(self.df, exclude=exclude or ()))
+        return self.df
+
+    def normalize_dates_to_iso(self, column: str, date_format: Optional[str] = None) -> pd.DataFrame:
+        """
+        Replace the values of a date column with ISO YYYY-MM-DD strings.
+
+        The format is detected once (unless given) and only distinct values are
+        parsed (see utils/dates.py). Values that are not dates become missing.
+        
+        Parameters:
+            column (str): Name of the date column.
+            date_format (str, optional): Known strptime format, e.g. '%m/%d/%Y'.
+        
+        Returns:
+            pd.DataFrame: Updated DataFrame with ISO dates in the column.
+
+        Raises:
+            ValueError: If the specified column not found in the DataFrame.
+        """
+        self._flush_plan()
+        try:
+            self.df[column] = to_iso_dates(self.df[column], date_format)
+            return self.df
+        except KeyError:
+            raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+
+    def normalize_string_columns(self, columns: List[str], case: Optional[str] = None, trim: bool = True,
+                                 collapse_whitespace: bool = False, unicode_form: Optional[str] = None) -> pd.DataFrame:
+        """
+        Normalize the text in several columns at once: Unicode form, whitespace and case.
+
+        Each step is one Arrow kernel over the whole column, and columns that
+        repeat their values (payment types, suppliers) are normalized through
+        their distinct values only (see utils/strings.py). Category columns stay category.
+        
+        Parameters:
+            columns (list): Names of the text columns to normalize.
+            case (str, optional): 'lower', 'upper' or 'title'. Default is to keep the case.
+            trim (bool, optional): Strip leading and trailing whitespace. Default is True.
+            collapse_whitespace (bool, optional): Replace runs of whitespace with one space. Default is False.
+            unicode_form (str, optional): 'NFC', 'NFD', 'NFKC' or 'NFKD' Unicode normalization.
+        
+        Returns:
+            pd.DataFrame: Updated DataFrame with the normalized columns.
+
+        Raises:
+            ValueError: If a specified column is not found in the DataFrame, or case or unicode_form is not supported.
+        """
+        self._flush_plan()
+        self.df = normalize_columns(self.df, columns, case, trim, collapse_whitespace, unicode_form)
+        return self.df
+
+    def parse_dates_to_add_standard_datetime(self, column: str, date_format: Optional[str] = None) -> pd.DataFrame:
         """
         Parse a specified column as datetime format and add it as a new column named 'StandardDateTime'.
+
+        The format is detected once (unless given) and only distinct values are
+        parsed, instead of letting pandas infer the format row by row.
         
         Parameters:
             column (str): Name of the column to parse as datetime.
+            date_format (str, optional): Known strptime format, e.g. '%m/%d/%Y'.
         
         Returns:
-            pd.DataFrame: Updated DataFrame with a new 'StandardDateTime' column containing parsed datetime values.
+            pd.DataFrame: Updated DataFrame with a new 'StandardDateTime' column containing parsed datetime values
+                (NaT where a value is not a date).
 
         Raises:
             ValueError: If the specified column not found in the DataFrame.
         """
+        self._flush_plan()
         try:
-            self.df['StandardDateTime'] = pd.to_datetime(self.df[column])
+            self.df['StandardDateTime'] = parse_dates(self.df[column], date_format)
             return self.df
         except KeyError:
             raise ValueError(f"Column name '{column}' not found in the DataFrame.")
 
-    def remove_duplicate_records(self) -> pd.DataFrame:
+    def remove_duplicate_records(self, subset: Optional[List[str]] = None, keep: Union[str, bool] = "first") -> pd.DataFrame:
         """
         Remove duplicate rows from the DataFrame.
+
+        Rows are compared by 64-bit fingerprints (see utils/dedup.py) instead of
+        hashing every value as a Python object.
         
+        Parameters:
+            subset (list, optional): Only compare these key columns (e.g. ['TransactionID']).
+                Default is every column.
+            keep (str or bool, optional): 'first' or 'last' copy to keep, or False to drop every copy.
+                Default is 'first'.
+
         Returns:
             pd.DataFrame: Updated DataFrame with duplicates removed.
 
+        Raises:
+            ValueError: If a subset column is not found in the DataFrame or keep is not valid.
         """
-        self.df = self.df.drop_duplicates()
+        check_keep(keep)
+        columns = self._current_columns()
+        if subset is not None:
+            missing = [column for column in subset if column not in columns]
+            if missing:
+                raise ValueError(f"Columns {missing} not found in the DataFrame.")
+        if self.lazy:
+            keys = dict(self._live_columns)
+            names = list(subset) if subset is not None else columns
+            self._plan.append(("dedup", ([keys[name] for name in names], keep, subset is not None)))
+            return self
+        self.df = self.df[~duplicated_mask(self.df, subset, keep)]
         return self.df
 
     def rename_columns(self, column_mapping: Dict[str, str]) -> pd.DataFrame:
@@ -240,9 +519,12 @@ class DataScrubber:
         """
 
         for old_name, new_name in column_mapping.items():
-            if old_name not in self.df.columns:
+            if old_name not in self._current_columns():
                 raise ValueError(f"Column '{old_name}' not found in the DataFrame.")
 
+        if self.lazy:
+            self._live_columns = [(column_mapping.get(name, name), key) for name, key in self._live_columns]
+            return self
         self.df = self.df.rename(columns=column_mapping)
         return self.df
 
@@ -260,7 +542,11 @@ class DataScrubber:
             ValueError: If a specified column is not found in the DataFrame.
         """
         for column in columns:
-            if column not in self.df.columns:
+            if column not in self._current_columns():
                 raise ValueError(f"Column name '{column}' not found in the DataFrame.")
+        if self.lazy:
+            live = dict(self._live_columns)
+            self._live_columns = [(column, live[column]) for column in columns]
+            return self
         self.df = self.df[columns]
         return self.df
@@ -1,88 +1,546 @@
 
 import pandas as pd
 import sqlite3
+import datetime
+import os
 import pathlib
+import re
 import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Sequence, Tuple
+
+import numpy as np
 
 # For local imports, temporarily add project root to sys.path
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
+# Prepared layer in CSV or a columnar format (parquet / feather)
+from utils.prepared_io import DEFAULT_PREPARED_FORMAT, prepared_path, read_prepared, write_prepared
+
+# Compact column types (category, small integers) and dtype-independent row hashes
+from utils.dtypes import apply_dtypes, dtype_plan_path, plan_dtypes
+from utils.dedup import row_fingerprints
+
+# Cached, format-detecting date parsing
+from utils.dates import to_iso_dates
+
+# Stage profiling (logs/profile.jsonl)
+from utils.logger import profile_stage, profiled
+
+# Materialized OLAP cube maintained by the load
+from utils.olap_cube import CUBE_TABLE, create_cube_table, refresh_sale_cube
+
+# Warehouse version stamp, which invalidates the analysis query cache (see utils/query_cache.py)
+from utils.query_cache import bump_warehouse_version, create_version_table
+
+# Warehouse path ($SMART_SALES_DB) and tuned WAL connections shared with the analysis scripts
+from utils.warehouse import DB_PATH_ENV, ENGINE_SUFFIXES, checkpoint, connect, engine_of, rollback, warehouse_engine
+
+# Vectorized key lookups for the referential integrity check
+from utils.validation import KeyIndex, RuleSet
+
 # Constants
 DW_DIR = pathlib.Path("data").joinpath("dw")
-DB_PATH = DW_DIR.joinpath("smart_sales.db")
+# smart_sales.db, or smart_sales.duckdb with SMART_SALES_ENGINE=duckdb (see utils/warehouse.py)
+DB_PATH = pathlib.Path(os.environ.get(DB_PATH_ENV) or DW_DIR.joinpath("smart_sales" + ENGINE_SUFFIXES[warehouse_engine()]))
 PREPARED_DATA_DIR = pathlib.Path("data").joinpath("prepared")
-
-def create_schema(cursor: sqlite3.Cursor) -> None:
-    """Drop and recreate tables in the data warehouse."""
+QUARANTINE_DIR = pathlib.Path("data").joinpath("quarantine")  # rows kept out of the warehouse
+SALE_QUARANTINE_FILE = "sale_orphans.csv"  # retried by every incremental load
+BATCH_SIZE = 50_000  # Rows per executemany batch during SQLite bulk loads
+
+# Fast-load PRAGMA settings (SQLite), applied only for the duration of a load.
+# The load runs in a single transaction, so a crash simply leaves the previous committed state.
+# journal_mode stays WAL (see utils/warehouse.py), so reports keep reading during the load.
+BULK_LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+}
+
+# Secondary indexes on the sale_fact table, created after the rows are loaded (SQLite only)
+SALE_INDEXES = {
+    "idx_sale_product_id": "product_id",
+    "idx_sale_customer_id": "customer_id",
+    "idx_sale_date_key": "date_key",
+    "idx_sale_payment_type_key": "payment_type_key",
+}
+
+# Referential integrity of sales, checked for the whole frame before the insert
+# (see quarantine_orphan_sales); each reference names the dimension table holding the keys
+SALE_REFERENCES = [
+    {"name": "missing_customer", "column": "customer_id", "check": "references", "reference": "customer"},
+    {"name": "missing_product", "column": "product_id", "check": "references", "reference": "product"},
+]
+
+# Numeric sale measures; values that are not numbers (e.g. "?") are loaded as NULL
+SALE_MEASURES = ["sale_amount", "discount_percent"]
+
+# Small lookup dimensions: table -> (integer surrogate key, value column).
+# The fact and dimension rows store the key instead of repeating the text.
+LOOKUP_DIMENSIONS = {
+    "payment_type": ("payment_type_key", "payment_type"),
+    "store": ("store_key", "store_id"),
+    "campaign": ("campaign_key", "campaign_id"),
+    "region": ("region_key", "region"),
+    "category": ("category_key", "category"),
+}
+
+# A FOREIGN KEY clause in CREATE TABLE, with its leading comma
+FOREIGN_KEY_CLAUSE = re.compile(r",\s*FOREIGN KEY \([^)]*\) REFERENCES \w+ \([^)]*\)")
+
+def create_table(cursor: sqlite3.Cursor, sql: str) -> None:
+    """Run a CREATE TABLE statement, without its FOREIGN KEY clauses on DuckDB.
+
+    SQLite keeps the clauses as documentation (PRAGMA foreign_keys is off).
+    DuckDB would enforce them, and refuses to update a key column of a row
+    that is still referenced (e.g. a customer's region_key in an upsert);
+    quarantine_orphan_sales checks the references instead on both engines.
+    """
+    if engine_of(cursor) == "duckdb":
+        sql = FOREIGN_KEY_CLAUSE.sub("", sql)
+    cursor.execute(sql)
+
+def create_schema(cursor: sqlite3.Cursor, drop_existing: bool = True) -> None:
+    """Create the tables in the data warehouse.
+
+    By default existing tables are dropped and recreated (full reload).
+    With drop_existing=False, existing tables and their rows are kept (incremental load).
+    """
+
+    # sale was a table before the star schema and is a view now
+    sale_type = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'sale'").fetchone()
 
     # Drop tables to force updated schema (especially during dev)
-    cursor.execute("DROP TABLE IF EXISTS sale")
-    cursor.execute("DROP TABLE IF EXISTS customer")
-    cursor.execute("DROP TABLE IF EXISTS product")
+    if drop_existing:
+        if sale_type is not None:
+            cursor.execute(f"DROP {sale_type[0].upper()} sale")
+        cursor.execute("DROP TABLE IF EXISTS sale_fact")
+        cursor.execute("DROP TABLE IF EXISTS customer")
+        cursor.execute("DROP TABLE IF EXISTS product")
+        cursor.execute("DROP TABLE IF EXISTS date")
+        for table in LOOKUP_DIMENSIONS:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute("DROP TABLE IF EXISTS etl_watermark")
+        cursor.execute("DROP TABLE IF EXISTS etl_row_hash")
+        cursor.execute(f"DROP TABLE IF EXISTS {CUBE_TABLE}")
+    elif sale_type is not None and sale_type[0] == "table":
+        raise RuntimeError("The warehouse has the pre-star-schema sale table; run a full load first.")
+
+    # Lookup dimensions: one row per distinct value, with an integer surrogate key
+    for table, (key, column) in LOOKUP_DIMENSIONS.items():
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key} INTEGER PRIMARY KEY,
+                {column} TEXT NOT NULL UNIQUE
+            )
+        """)
 
     # Now recreate all tables with updated columns
-    cursor.execute("""
-        CREATE TABLE customer (
+    # (region and category stay readable as text; aggregations join on the keys)
+    create_table(cursor, """
+        CREATE TABLE IF NOT EXISTS customer (
             customer_id INTEGER PRIMARY KEY,
             name TEXT,
             region TEXT,
             join_date TEXT,
             LoyaltyPoints INTEGER,
-            preferred_contact_method TEXT
+            preferred_contact_method TEXT,
+            region_key INTEGER,
+            FOREIGN KEY (region_key) REFERENCES region (region_key)
         )
     """)
 
-    cursor.execute("""
-        CREATE TABLE product (
+    create_table(cursor, """
+        CREATE TABLE IF NOT EXISTS product (
             product_id INTEGER PRIMARY KEY,
             product_name TEXT,
             category TEXT,
-            unit_price REAL,
+            unit_price DOUBLE,
             stock_quantity INTEGER,
-            supplier TEXT
+            supplier TEXT,
+            category_key INTEGER,
+            FOREIGN KEY (category_key) REFERENCES category (category_key)
         )
     """)
 
-    cursor.execute("""
-        CREATE TABLE sale (
+    # Fact table: integer keys and numeric measures only
+    create_table(cursor, """
+        CREATE TABLE IF NOT EXISTS sale_fact (
             sale_id INTEGER PRIMARY KEY,
             customer_id INTEGER,
             product_id INTEGER,
-            sale_amount REAL,
-            sale_date TEXT,
-            discount_percent REAL,
-            payment_type TEXT,
-            store_id TEXT,
-            campaign_id TEXT, --
+            date_key INTEGER, -- YYYYMMDD
+            store_key INTEGER,
+            campaign_key INTEGER,
+            payment_type_key INTEGER,
+            sale_amount DOUBLE,
+            discount_percent DOUBLE,
             FOREIGN KEY (customer_id) REFERENCES customer (customer_id),
-            FOREIGN KEY (product_id) REFERENCES product (product_id)
+            FOREIGN KEY (product_id) REFERENCES product (product_id),
+            FOREIGN KEY (date_key) REFERENCES date (date_key),
+            FOREIGN KEY (store_key) REFERENCES store (store_key),
+            FOREIGN KEY (campaign_key) REFERENCES campaign (campaign_key),
+            FOREIGN KEY (payment_type_key) REFERENCES payment_type (payment_type_key)
         )
     """)
 
+    # Date dimension, one row per calendar day; date_key is YYYYMMDD
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS date (
+            date_key INTEGER PRIMARY KEY,
+            full_date TEXT UNIQUE,
+            year INTEGER,
+            quarter INTEGER,
+            month INTEGER,
+            day INTEGER,
+            day_of_week INTEGER
+        )
+    """)
 
-def delete_existing_records(cursor: sqlite3.Cursor) -> None:
-    """Delete all existing records and reset primary keys."""
-    cursor.execute("DELETE FROM customer")
-    cursor.execute("DELETE FROM product")
-    cursor.execute("DELETE FROM sale")
+    # The sale columns as before the star schema, so existing queries keep working
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS sale AS
+        SELECT
+            f.sale_id,
+            f.customer_id,
+            f.product_id,
+            f.sale_amount,
+            d.full_date AS sale_date, -- ISO YYYY-MM-DD
+            f.discount_percent,
+            pt.payment_type,
+            st.store_id,
+            cp.campaign_id
+        FROM sale_fact f
+        LEFT JOIN date d ON f.date_key = d.date_key
+        LEFT JOIN payment_type pt ON f.payment_type_key = pt.payment_type_key
+        LEFT JOIN store st ON f.store_key = st.store_key
+        LEFT JOIN campaign cp ON f.campaign_key = cp.campaign_key
+    """)
 
-def insert_customers(customers_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
-    """Insert customer data into the customer table."""
-    customers_df.to_sql("customer", cursor.connection, if_exists="append", index=False)
+    # Bookkeeping for incremental loads: high-water mark per table
+    # and a content hash per dimension row
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS etl_watermark (
+            table_name TEXT PRIMARY KEY,
+            high_water_mark BIGINT,
+            loaded_at TEXT
+        )
+    """)
 
-def insert_products(products_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
-    """Insert product data into the product table."""
-    products_df.to_sql("product", cursor.connection, if_exists="append", index=False)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS etl_row_hash (
+            table_name TEXT,
+            row_key BIGINT,
+            row_hash BIGINT,
+            PRIMARY KEY (table_name, row_key)
+        )
+    """)
 
-def insert_sales(sales_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
-    """Insert sales data into the sales table."""
-    sales_df.to_sql("sale", cursor.connection, if_exists="append", index=False)
+    # Pre-aggregated category x region x store x month x payment_type cube
+    create_cube_table(cursor)
 
-import os
+    # Version stamp of the loaded data; never dropped, so a stamp is never reused
+    create_version_table(cursor)
+
+
+def create_indexes(cursor: sqlite3.Cursor) -> None:
+    """Create the secondary indexes on the sale_fact table if they do not exist.
 
-def load_data_to_db() -> None:
+    On a full load this runs after the rows are inserted, which is much faster
+    than maintaining the indexes row by row during the load. DuckDB gets none:
+    it scans columns with per-block min/max (zone maps) instead.
+    """
+    if engine_of(cursor) == "duckdb":
+        return
+    for index_name, column in SALE_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON sale_fact ({column})")
+
+def delete_existing_records(cursor: sqlite3.Cursor) -> None:
+    """Delete all existing records and reset primary keys."""
+    cursor.execute("DELETE FROM customer")
+    cursor.execute("DELETE FROM product")
+    cursor.execute("DELETE FROM sale_fact")
+
+@contextmanager
+def bulk_load_pragmas(conn: Any) -> Iterator[None]:
+    """Temporarily apply BULK_LOAD_PRAGMAS, restoring the previous values afterwards.
+
+    synchronous cannot change inside a transaction, so enter this before any writes
+    and commit before it exits. On DuckDB there are no PRAGMAs to apply.
+    """
+    pragmas = BULK_LOAD_PRAGMAS if engine_of(conn) == "sqlite" else {}
+    previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in pragmas}
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        rollback(conn)
+        for name, value in previous.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+def bulk_insert(df: pd.DataFrame, table: str, cursor: Any, batch_size: int = BATCH_SIZE, on_conflict: str = "") -> int:
+    """Insert a DataFrame into a table with prepared executemany batches.
+
+    Rows are converted to Python values one batch at a time (NaN becomes NULL),
+    so memory stays bounded by batch_size. The caller owns the transaction.
+    An optional on_conflict clause (e.g. "ON CONFLICT(sale_id) DO NOTHING") turns
+    the insert into an upsert. Returns the number of rows sent and prints the load rate.
+
+    On DuckDB the frame is registered as a view and inserted with one
+    INSERT ... SELECT, which reads its columns directly (no Python tuple per row).
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be a positive integer, got {batch_size}.")
+    columns = ", ".join(df.columns)
+
+    start = time.perf_counter()
+    if engine_of(cursor) == "duckdb":
+        view = f"{table}_rows"
+        cursor.register(view, df)
+        try:
+            cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {view} {on_conflict}")
+        finally:
+            cursor.unregister(view)
+    else:
+        placeholders = ", ".join("?" for _ in df.columns)
+        sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) {on_conflict}".rstrip()
+        for batch_start in range(0, len(df), batch_size):
+            batch = df.iloc[batch_start:batch_start + batch_size].astype(object)
+            batch = batch.where(batch.notna(), None)
+            cursor.executemany(sql, batch.itertuples(index=False, name=None))
+    elapsed = time.perf_counter() - start
+
+    rows_per_second = len(df) / elapsed if elapsed > 0 else float("inf")
+    print(f"Inserted {len(df)} rows into {table} in {elapsed:.2f}s ({rows_per_second:,.0f} rows/s)")
+    return len(df)
+
+@profiled()
+def insert_customers(customers_df: pd.DataFrame, cursor: sqlite3.Cursor, batch_size: int = BATCH_SIZE) -> int:
+    """Insert customer data into the customer table and return the row count."""
+    return bulk_insert(customers_df, "customer", cursor, batch_size)
+
+@profiled()
+def insert_products(products_df: pd.DataFrame, cursor: sqlite3.Cursor, batch_size: int = BATCH_SIZE) -> int:
+    """Insert product data into the product table and return the row count."""
+    return bulk_insert(products_df, "product", cursor, batch_size)
+
+@profiled()
+def insert_sales(facts_df: pd.DataFrame, cursor: sqlite3.Cursor, batch_size: int = BATCH_SIZE) -> int:
+    """Insert sale facts (see build_sale_facts) into the sale_fact table and return the row count."""
+    return bulk_insert(facts_df, "sale_fact", cursor, batch_size)
+
+def encode_distinct(values: pd.Series, key_of: Callable[[Any], int]) -> pd.Series:
+    """Map values to integer keys, calling key_of once per distinct value.
+
+    Missing values stay missing (NULL in the warehouse).
+    """
+    codes, distinct_values = pd.factorize(values)
+    distinct_keys = np.array([key_of(value) for value in distinct_values.tolist()] + [0], dtype="int64")
+    return pd.Series(distinct_keys[codes], index=values.index, dtype="Int64").mask(codes < 0)
+
+def lookup_keys(values: pd.Series, table: str, cursor: sqlite3.Cursor) -> pd.Series:
+    """Return the surrogate key of each value in a lookup dimension, adding new values first."""
+    key, column = LOOKUP_DIMENSIONS[table]
+
+    def key_of(value: Any) -> int:
+        # Numbers (e.g. store 401) are stored as text the same way in both statements.
+        # The key is numbered explicitly, as DuckDB has no rowid to default to
+        cursor.execute(f"""
+            INSERT INTO {table} ({key}, {column})
+            SELECT COALESCE(MAX({key}), 0) + 1, CAST(? AS TEXT) FROM {table} WHERE true
+            ON CONFLICT({column}) DO NOTHING
+        """, (value,))
+        return cursor.execute(f"SELECT {key} FROM {table} WHERE {column} = CAST(? AS TEXT)", (value,)).fetchone()[0]
+
+    return encode_distinct(values, key_of)
+
+def date_keys(iso_dates: pd.Series) -> pd.Series:
+    """Return the YYYYMMDD date_key of ISO YYYY-MM-DD dates."""
+    return encode_distinct(iso_dates, lambda iso_date: int(iso_date.replace("-", "")))
+
+@profiled()
+def build_sale_facts(sales_df: pd.DataFrame, cursor: sqlite3.Cursor) -> pd.DataFrame:
+    """Turn sales into sale_fact rows: dimension keys in place of the text columns."""
+    return pd.DataFrame({
+        "sale_id": sales_df["sale_id"],
+        "customer_id": sales_df["customer_id"],
+        "product_id": sales_df["product_id"],
+        "date_key": date_keys(sales_df["sale_date"]),
+        "store_key": lookup_keys(sales_df["store_id"], "store", cursor),
+        "campaign_key": lookup_keys(sales_df["campaign_id"], "campaign", cursor),
+        "payment_type_key": lookup_keys(sales_df["payment_type"], "payment_type", cursor),
+        "sale_amount": sales_df["sale_amount"],
+        "discount_percent": sales_df["discount_percent"],
+    })
+
+def dimension_keys(cursor: sqlite3.Cursor, table: str, key: str) -> KeyIndex:
+    """Read the primary keys of a dimension table into a KeyIndex."""
+    return KeyIndex(pd.Series([row[0] for row in cursor.execute(f"SELECT {key} FROM {table}").fetchall()], dtype="Int64"))
+
+@profiled()
+def quarantine_orphan_sales(sales_df: pd.DataFrame, cursor: sqlite3.Cursor, file_format: str = DEFAULT_PREPARED_FORMAT) -> pd.DataFrame:
+    """Move sales whose customer or product is not in the warehouse to a quarantine file.
+
+    The FOREIGN KEY clauses are not enforced (PRAGMA foreign_keys is off, and
+    DuckDB tables are created without them; see create_table), since that would
+    look up both parents for every inserted row. Instead the dimension
+    keys are read once, after the dimensions are loaded, and the whole sales frame
+    is checked with vectorized lookups (see SALE_REFERENCES and utils/validation.py).
+    Orphans go to data/quarantine/sale_orphans with a violations column naming
+    the missing references; a load without orphans removes the previous file.
+    """
+    references = {
+        "customer": dimension_keys(cursor, "customer", "customer_id"),
+        "product": dimension_keys(cursor, "product", "product_id"),
+    }
+    result = RuleSet(SALE_REFERENCES, references).validate(sales_df)
+    quarantine_path = prepared_path(QUARANTINE_DIR.joinpath(SALE_QUARANTINE_FILE), file_format)
+    if result.invalid_rows == 0:
+        quarantine_path.unlink(missing_ok=True)
+        dtype_plan_path(quarantine_path).unlink(missing_ok=True)
+        return sales_df
+
+    # Name the violated rules once per distinct mask value, not once per row
+    codes, masks = pd.factorize(result.mask[~result.valid])
+    violations = np.array([", ".join(result.violated_rules(mask)) for mask in masks])[codes]
+    QUARANTINE_DIR.mkdir(parents=True, exist_ok=True)
+    write_prepared(sales_df[~result.valid].assign(violations=violations), quarantine_path)
+    print(f"Orphan sales quarantined: {result.invalid_rows} rows {result.counts} -> {quarantine_path}")
+    return sales_df[result.valid]
+
+def read_quarantined_sales(file_format: str = DEFAULT_PREPARED_FORMAT) -> pd.DataFrame:
+    """Return the sales quarantined by the previous load, without the violations column (empty if none).
+
+    An incremental load checks them again with the new sales, since their customer
+    or product may have been loaded since; sales still orphaned stay quarantined.
+    """
+    quarantine_path = prepared_path(QUARANTINE_DIR.joinpath(SALE_QUARANTINE_FILE), file_format)
+    if not quarantine_path.exists():
+        return pd.DataFrame(columns=["sale_id"])
+    return read_prepared(quarantine_path).drop(columns=["violations"], errors="ignore")
+
+def to_iso_date(dates: pd.Series) -> pd.Series:
+    """Convert M/D/YYYY (or already ISO) date strings to ISO YYYY-MM-DD strings.
+
+    The format is detected once and only distinct dates are parsed (see
+    utils/dates.py). Prepared files are already ISO, so this is a cheap check.
+    Unparseable values become missing.
+    """
+    return to_iso_dates(dates)
+
+@profiled()
+def insert_dates(sales_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
+    """Add every sale date not yet in the date dimension."""
+    days = pd.to_datetime(pd.Series(sales_df["sale_date"].dropna().unique()), format="%Y-%m-%d")
+    dates_df = pd.DataFrame({
+        "date_key": days.dt.strftime("%Y%m%d").astype(int),
+        "full_date": days.dt.strftime("%Y-%m-%d"),
+        "year": days.dt.year,
+        "quarter": days.dt.quarter,
+        "month": days.dt.month,
+        "day": days.dt.day,
+        "day_of_week": days.dt.dayofweek,
+    })
+    bulk_insert(dates_df, "date", cursor, on_conflict="ON CONFLICT(date_key) DO NOTHING")
+
+def row_hashes(df: pd.DataFrame, key: str) -> pd.Series:
+    """Return a 64-bit content hash per row, indexed by the key column.
+
+    Hashes are stored as signed integers so they fit SQLite's INTEGER type. Numbers
+    are hashed by value, so the same row hashes the same whatever its column types.
+    """
+    hashes = row_fingerprints(df).view("int64")
+    return pd.Series(hashes, index=df[key].to_numpy())
+
+def read_high_water_mark(cursor: sqlite3.Cursor, table: str, key: str) -> int:
+    """Return the recorded high-water mark for a table, or its largest key if none is recorded."""
+    row = cursor.execute("SELECT high_water_mark FROM etl_watermark WHERE table_name = ?", (table,)).fetchone()
+    if row is not None and row[0] is not None:
+        return row[0]
+    return cursor.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}").fetchone()[0]
+
+def write_high_water_mark(cursor: sqlite3.Cursor, table: str, key: str) -> None:
+    """Record the largest key now in the table as its high-water mark."""
+    loaded_at = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")  # as SQLite's datetime('now')
+    cursor.execute(f"""
+        INSERT INTO etl_watermark (table_name, high_water_mark, loaded_at)
+        SELECT ?, MAX({key}), ? FROM {table} WHERE true
+        ON CONFLICT(table_name) DO UPDATE SET
+            high_water_mark = excluded.high_water_mark,
+            loaded_at = excluded.loaded_at
+    """, (table, loaded_at))
+
+def write_row_hashes(cursor: sqlite3.Cursor, table: str, hashes: pd.Series) -> None:
+    """Store content hashes for the given dimension rows."""
+    hashes_df = pd.DataFrame({
+        "table_name": table,
+        "row_key": hashes.index.to_numpy(dtype="int64"),
+        "row_hash": hashes.to_numpy(dtype="int64"),
+    })
+    bulk_insert(hashes_df, "etl_row_hash", cursor,
+                on_conflict="ON CONFLICT(table_name, row_key) DO UPDATE SET row_hash = excluded.row_hash")
+
+@profiled()
+def upsert_dimension(df: pd.DataFrame, table: str, key: str, cursor: sqlite3.Cursor, batch_size: int = BATCH_SIZE) -> None:
+    """Insert new and update changed dimension rows, skipping unchanged ones.
+
+    A row counts as changed when its content hash differs from the one stored
+    by the previous load, so only the delta is written.
+    """
+    hashes = row_hashes(df, key)
+    stored = pd.Series(dict(cursor.execute(
+        "SELECT row_key, row_hash FROM etl_row_hash WHERE table_name = ?", (table,)
+    ).fetchall()), dtype="int64")
+    known = hashes.index.isin(stored.index)
+    unchanged = known & (hashes.to_numpy() == stored.reindex(hashes.index, fill_value=0).to_numpy())
+    changed = ~unchanged
+    delta_df = df[changed]
+
+    update_columns = [column for column in df.columns if column != key]
+    assignments = ", ".join(f"{column} = excluded.{column}" for column in update_columns)
+    on_conflict = f"ON CONFLICT({key}) DO UPDATE SET {assignments}" if update_columns else f"ON CONFLICT({key}) DO NOTHING"
+    bulk_insert(delta_df, table, cursor, batch_size, on_conflict)
+    write_row_hashes(cursor, table, hashes[changed])
+    print(f"{table}: {len(delta_df)} new or changed rows, {len(df) - len(delta_df)} unchanged")
+
+def insert_new_sales(sales_df: pd.DataFrame, cursor: sqlite3.Cursor, batch_size: int = BATCH_SIZE,
+                     retry_ids: Sequence[int] = ()) -> Tuple[int, List[int]]:
+    """Insert sales above the sale_id high-water mark, and the retried sales in retry_ids.
+
+    The mark is the largest sale_id loaded so far, so a quarantined sale can sit
+    below it; retry_ids (the previous quarantine) lets it in once it is valid.
+    Returns the mark and the retried sale ids at or below it that were inserted.
+    """
+    high_water_mark = read_high_water_mark(cursor, "sale_fact", "sale_id")
+    retried = sales_df["sale_id"].isin(retry_ids) & (sales_df["sale_id"] <= high_water_mark)
+    new_facts_df = build_sale_facts(sales_df[(sales_df["sale_id"] > high_water_mark) | retried], cursor)
+    bulk_insert(new_facts_df, "sale_fact", cursor, batch_size, "ON CONFLICT(sale_id) DO NOTHING")
+    print(f"sale_fact: {len(new_facts_df)} rows above high-water mark {high_water_mark}, {retried.sum()} retried from quarantine")
+    return high_water_mark, sales_df.loc[retried, "sale_id"].tolist()
+
+def write_high_water_marks(cursor: sqlite3.Cursor) -> None:
+    """Record the high-water mark of every warehouse table."""
+    for table, key in (("customer", "customer_id"), ("product", "product_id"), ("sale_fact", "sale_id")):
+        write_high_water_mark(cursor, table, key)
+
+def record_load_state(customers_df: pd.DataFrame, products_df: pd.DataFrame, cursor: sqlite3.Cursor) -> None:
+    """After a full load, record row hashes and high-water marks so the next incremental load sees only the delta."""
+    write_row_hashes(cursor, "customer", row_hashes(customers_df, "customer_id"))
+    write_row_hashes(cursor, "product", row_hashes(products_df, "product_id"))
+    write_high_water_marks(cursor)
+
+@profiled()
+def load_data_to_db(batch_size: int = BATCH_SIZE, incremental: bool = False, prepared_format: str = DEFAULT_PREPARED_FORMAT) -> None:
+    """Load the prepared data into the warehouse.
+
+    A full load (default) drops and recreates every table. An incremental load keeps
+    the existing rows, inserts only sales above the sale_id high-water mark, and
+    upserts only new or changed customers and products, so its cost follows the delta.
+    Both keep the sale_cube aggregate table up to date (see utils/olap_cube.py).
+    prepared_format selects the prepared files to read: "csv", "parquet" or "feather".
+    """
     conn = None  # ensure variable exists
     try:
         print("Working directory:", os.getcwd())  # where Python is running from
@@ -90,77 +548,141 @@ def load_data_to_db() -> None:
         print("DB_PATH:", DB_PATH.resolve())
 
         # ✅ Ensure /data/dw directory exists
-        DW_DIR.mkdir(parents=True, exist_ok=True)
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-        # ✅ Create the DB file
-        conn = sqlite3.connect(DB_PATH)
+        # ✅ Create the DB file (read-write, WAL mode, tuned cache)
+        conn = connect(DB_PATH, read_only=False)
         print("Connected to database.")
 
-        cursor = conn.cursor()
-
-        # Create schema and clear existing records
-        create_schema(cursor)
-        print("Schema created.")
-
-        delete_existing_records(cursor)
-        print("Old records deleted.")
-
-        # Load prepared data using pandas
-        customers_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("customers_data_prepared.csv"))
-        customers_df = customers_df.drop(columns=["Unnamed: 0"], errors="ignore")
-        customers_df = customers_df.rename(columns={
-            "CustomerID": "customer_id",
-            "Name": "name",
-            "Region": "region",
-            "JoinDate": "join_date",
-            "LoyaltyPoints": "LoyaltyPoints",
-            "preferred_contact_method": "preferred_contact_method"
-        })
-
-# ✅ Drop duplicate primary keys based on customer_id
-        customers_df = customers_df.drop_duplicates(subset="customer_id")
-
-        print("Customers loaded:", len(customers_df), "rows")
-        print("Duplicate customer IDs:", customers_df['customer_id'].duplicated().sum())
-
-
-        products_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("products_data_prepared.csv"))
-        products_df = products_df.drop(columns=["Unnamed: 0"], errors="ignore")
-        print("Products loaded:", len(products_df), "rows")
-
-        sales_df = pd.read_csv(PREPARED_DATA_DIR.joinpath("sales_data_prepared.csv"))
-        sales_df = sales_df.drop(columns=["Unnamed: 0"], errors="ignore")
-        sales_df = sales_df.rename(columns={
-            "TransactionID": "sale_id",  
-            "CustomerID": "customer_id",
-            "ProductID": "product_id",
-            "SaleAmount": "sale_amount",
-            "SaleDate": "sale_date",
-            "StoreID": "store_id",
-            "DiscountPercent": "discount_percent",
-            "CampaignID": "campaign_id",
-            "PaymentType": "payment_type",
-        })
-
-        # Optional: drop duplicates if needed
-        sales_df = sales_df.drop_duplicates(subset="sale_id")
-
-        print("Sales loaded:", len(sales_df), "rows")
-        print("Duplicate sale IDs:", sales_df['sale_id'].duplicated().sum())
-
-
-
-
-        print("CSV files loaded.")
-
-        # Insert data into the database
-        insert_customers(customers_df, cursor)
-        insert_products(products_df, cursor)
-        insert_sales(sales_df, cursor)
-
-        print("Data inserted into DB.")
-        conn.commit()
-        print("Transaction committed.")
+        # Fast-load PRAGMAs for the whole load; everything below is one transaction
+        with bulk_load_pragmas(conn):
+            conn.execute("BEGIN")
+            # A DuckDB cursor is a separate connection, outside this transaction
+            cursor = conn.cursor() if engine_of(conn) == "sqlite" else conn
+
+            if incremental:
+                # Keep existing records; only the delta is written below
+                create_schema(cursor, drop_existing=False)
+                print("Schema verified (incremental load).")
+            else:
+                # Create schema and clear existing records
+                create_schema(cursor)
+                print("Schema created.")
+
+                delete_existing_records(cursor)
+                print("Old records deleted.")
+
+            # Load prepared data using pandas
+            customers_df = read_prepared(prepared_path(PREPARED_DATA_DIR.joinpath("customers_data_prepared.csv"), prepared_format))
+            customers_df = customers_df.drop(columns=["Unnamed: 0"], errors="ignore")
+            customers_df = customers_df.rename(columns={
+                "CustomerID": "customer_id",
+                "Name": "name",
+                "Region": "region",
+                "JoinDate": "join_date",
+                "LoyaltyPoints": "LoyaltyPoints",
+                "preferred_contact_method": "preferred_contact_method"
+            })
+
+            # ✅ Drop duplicate primary keys based on customer_id
+            customers_df = customers_df.drop_duplicates(subset="customer_id")
+
+            print("Customers loaded:", len(customers_df), "rows")
+            print("Duplicate customer IDs:", customers_df['customer_id'].duplicated().sum())
+
+
+            products_df = read_prepared(prepared_path(PREPARED_DATA_DIR.joinpath("products_data_prepared.csv"), prepared_format))
+            products_df = products_df.drop(columns=["Unnamed: 0"], errors="ignore")
+            print("Products loaded:", len(products_df), "rows")
+
+            sales_df = read_prepared(prepared_path(PREPARED_DATA_DIR.joinpath("sales_data_prepared.csv"), prepared_format))
+            sales_df = sales_df.drop(columns=["Unnamed: 0"], errors="ignore")
+            sales_df = sales_df.rename(columns={
+                "TransactionID": "sale_id",  
+                "CustomerID": "customer_id",
+                "ProductID": "product_id",
+                "SaleAmount": "sale_amount",
+                "SaleDate": "sale_date",
+                "StoreID": "store_id",
+                "DiscountPercent": "discount_percent",
+                "CampaignID": "campaign_id",
+                "PaymentType": "payment_type",
+            })
+
+            if incremental:
+                # Sales quarantined by the previous load are checked again (see read_quarantined_sales)
+                quarantined_df = read_quarantined_sales(prepared_format)
+                print("Quarantined sales retried:", len(quarantined_df), "rows")
+                sales_df = pd.concat([sales_df, quarantined_df], ignore_index=True)
+
+            # Optional: drop duplicates if needed
+            sales_df = sales_df.drop_duplicates(subset="sale_id")
+
+            # Store sale dates as ISO YYYY-MM-DD so date filters are index range scans
+            invalid_dates = sales_df["sale_date"].notna().sum()
+            sales_df["sale_date"] = to_iso_date(sales_df["sale_date"])
+            invalid_dates -= sales_df["sale_date"].notna().sum()
+            print("Invalid sale dates stored as NULL:", invalid_dates)
+
+            # Same for the measures: SQLite would store the text in a REAL column, DuckDB would fail the insert
+            for column in SALE_MEASURES:
+                numbers = pd.to_numeric(sales_df[column].astype(object), errors="coerce")
+                print(f"Invalid {column} values stored as NULL:", numbers.isna().sum() - sales_df[column].isna().sum())
+                sales_df[column] = numbers
+
+            # Compact column types for the rest of the load (see utils/dtypes.py)
+            customers_df = apply_dtypes(customers_df, plan_dtypes(customers_df))
+            products_df = apply_dtypes(products_df, plan_dtypes(products_df))
+            sales_df = apply_dtypes(sales_df, plan_dtypes(sales_df))
+
+            print("Sales loaded:", len(sales_df), "rows")
+            print("Duplicate sale IDs:", sales_df['sale_id'].duplicated().sum())
+
+
+
+
+            print("Prepared files loaded.")
+
+            # Dimension surrogate keys for region and category (see LOOKUP_DIMENSIONS)
+            customers_df["region_key"] = lookup_keys(customers_df["region"], "region", cursor)
+            products_df["category_key"] = lookup_keys(products_df["category"], "category", cursor)
+
+            # Insert data into the database
+            insert_dates(sales_df, cursor)
+            if incremental:
+                upsert_dimension(customers_df, "customer", "customer_id", cursor, batch_size)
+                upsert_dimension(products_df, "product", "product_id", cursor, batch_size)
+            else:
+                insert_customers(customers_df, cursor, batch_size)
+                insert_products(products_df, cursor, batch_size)
+
+            # Referential integrity: sales without a loaded customer or product are quarantined
+            sales_df = quarantine_orphan_sales(sales_df, cursor, prepared_format)
+
+            if incremental:
+                with profile_stage("etl_to_dw.insert_new_sales", rows_in=len(sales_df)):
+                    previous_high_water_mark, retried_ids = insert_new_sales(sales_df, cursor, batch_size,
+                                                                             quarantined_df["sale_id"])
+                with profile_stage("etl_to_dw.refresh_sale_cube"):
+                    refresh_sale_cube(cursor, after_sale_id=previous_high_water_mark, sale_ids=retried_ids)
+                write_high_water_marks(cursor)
+            else:
+                insert_sales(build_sale_facts(sales_df, cursor), cursor, batch_size)
+                with profile_stage("etl_to_dw.create_indexes"):
+                    create_indexes(cursor)
+                with profile_stage("etl_to_dw.refresh_sale_cube"):
+                    refresh_sale_cube(cursor)
+                record_load_state(customers_df, products_df, cursor)
+
+            print("Data inserted into DB.")
+
+            # New version stamp, committed with the data: cached query results are now stale
+            bump_warehouse_version(cursor)
+            conn.commit()
+            print("Transaction committed.")
+
+        # Fold the load's WAL into the database file
+        checkpoint(conn)
 
     except Exception as e:
         print("Error occurred:", e)
@@ -1,11 +1,25 @@
-import sqlite3
+import pathlib
+import sys
 import pandas as pd
 
-# Connect to your database
-conn = sqlite3.connect(r'C:\Repos\smart-store-michaelcarter\Data\dw\smart_sales.db')
+# For local imports, temporarily add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from utils.dtypes import apply_dtypes, plan_dtypes
+from utils.olap_cube import query_cube
+from utils.query_cache import QueryCache
+from utils.warehouse import connect
+
+# Read-only connection to the warehouse ($SMART_SALES_DB, or data/dw/smart_sales.db; see utils/warehouse.py)
+conn = connect()
+
+# Query results are reused until the next warehouse load (see utils/query_cache.py)
+queries = QueryCache(conn, cache_dir=PROJECT_ROOT / "data" / ".cache" / "queries")
 
 # Optional: Preview tables
-print(pd.read_sql("SELECT name FROM sqlite_master WHERE type='table';", conn))
+print(queries.read_sql("SELECT name FROM sqlite_master WHERE type='table';"))
 
 # Step 1: Write and execute SQL query to join product and sales
 query = """
@@ -19,7 +33,11 @@ WHERE p.category = 'Electronics'
 """
 
 # Step 2: Load data into DataFrame
-df = pd.read_sql(query, conn, parse_dates=['sale_date'])
+# sale_date is stored as ISO YYYY-MM-DD, so parse it with the explicit format
+df = queries.read_sql(query, parse_dates={'sale_date': {'format': '%Y-%m-%d'}})
+
+# Compact column types (category for category) make the groupbys below faster
+df = apply_dtypes(df, plan_dtypes(df))
 
 # Step 3: Filter for the month of May
 df['month'] = df['sale_date'].dt.month
@@ -35,16 +53,14 @@ print(f"Total Sales in May (Electronics): ${total_sale:.2f}")
 print(f"Average Sale Amount in May (Electronics): ${average_sale:.2f}")
 print(f"Number of Transactions: {count}")
 
-# OLAP-style cube: by category and month
-df['month'] = df['sale_date'].dt.month
-cube = df.groupby(['category', 'month']).agg(
-    total_sales=('sale_amount', 'sum'),
-    average_sale=('sale_amount', 'mean'),
-    transactions=('sale_amount', 'count')
-).reset_index()
+# OLAP-style cube: by category and month, read from the pre-aggregated sale_cube table
+cube = query_cube(conn, group_by=['category', 'month'], query_cache=queries)
 
 # View May Electronics data for comparison
-print(cube[(cube['category'] == 'Electronics') & (cube['month'] == 5)])
+print(cube[(cube['category'] == 'Electronics') & (cube['month'].str.endswith('-05'))])
+
+# All queries are done; the rest works on the DataFrames
+conn.close()
 
 import matplotlib.pyplot as plt
 
@@ -58,8 +74,7 @@ plt.ylabel('Product Category')
 plt.tight_layout()
 plt.show()
 
-# Ensure sale_date is datetime and set to month
-df['sale_date'] = pd.to_datetime(df['sale_date'])
+# sale_date is already datetime; set to month
 df['month'] = df['sale_date'].dt.to_period('M')
 
 # Group by month and sum sale_amount
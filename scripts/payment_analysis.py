@@ -1,20 +1,43 @@
-import sqlite3
+import calendar
+import pathlib
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 
-# Connect to SQLite DB
-conn = sqlite3.connect(r'C:\Repos\smart-store-michaelcarter\Data\dw\smart_sales.db')
+# For local imports, temporarily add project root to sys.path
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
 
-# Query for payment types in May
+from utils.query_cache import QueryCache
+from utils.warehouse import connect
+
+# Read-only connection to the warehouse ($SMART_SALES_DB, or data/dw/smart_sales.db; see utils/warehouse.py)
+conn = connect()
+
+# Query results are reused until the next warehouse load (see utils/query_cache.py)
+queries = QueryCache(conn, cache_dir=PROJECT_ROOT / "data" / ".cache" / "queries")
+
+# Month to analyze, in every year in the warehouse (5 = May)
+ANALYSIS_MONTH = 5
+MONTH_NAME = calendar.month_name[ANALYSIS_MONTH]
+
+# Query for payment types in the month, of any year
+# The month's days come from the date dimension; their sales are found
+# through idx_sale_date_key on sale_fact.date_key
 query = """
 SELECT 
-    sale_date,
-    payment_type
-FROM sale
-WHERE sale_date LIKE '5/%'
+    d.full_date AS sale_date,
+    pt.payment_type
+FROM sale_fact f
+JOIN date d ON f.date_key = d.date_key
+LEFT JOIN payment_type pt ON f.payment_type_key = pt.payment_type_key
+WHERE f.date_key IN (SELECT date_key FROM date WHERE month = ?)
 """
 
-df = pd.read_sql(query, conn, parse_dates=['sale_date'])
+# ISO date strings need no parsing here; the month filter already runs in SQL
+df = queries.read_sql(query, params=(ANALYSIS_MONTH,))
+conn.close()
 print(df.head())
 print(f"Number of rows returned: {len(df)}")
 
@@ -26,16 +49,16 @@ payment_counts = df['payment_type'].value_counts()
 
 # Output most common payment type
 most_common = payment_counts.idxmax()
-print(f"Most common payment type in May: {most_common}")
+print(f"Most common payment type in {MONTH_NAME}: {most_common}")
 print(payment_counts)
 
 # Optional: Save chart
 plt.figure(figsize=(8, 5))
-payment_counts.plot(kind='bar', title='Payment Type Usage in May')
+payment_counts.plot(kind='bar', title=f'Payment Type Usage in {MONTH_NAME}')
 plt.xlabel('Payment Type')
 plt.ylabel('Count')
 plt.tight_layout()
-plt.savefig('charts/payment_type_may.png')  # optional image export
+plt.savefig(f'charts/payment_type_{MONTH_NAME.lower()}.png')  # optional image export
 plt.show()
 
-df.to_csv('Data/payment_types_may.csv', index=False)
+df.to_csv(f'Data/payment_types_{MONTH_NAME.lower()}.csv', index=False)
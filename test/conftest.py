@@ -0,0 +1,84 @@
+"""
+test/conftest.py
+
+Shared pytest setup: makes the project packages (utils, scripts) importable,
+sends the log and the stage profiles to a temporary directory and gives each
+test a private copy of the raw data directories.
+
+"""
+
+# Imports from Python Standard Library
+import pathlib
+import shutil
+import sys
+
+# Imports from external packages
+import pytest
+
+# Define global constants
+PROJECT_ROOT: pathlib.Path = pathlib.Path(__file__).resolve().parent.parent
+SCRIPTS_DIR: pathlib.Path = PROJECT_ROOT / "scripts"
+DATA_PREP_DIR: pathlib.Path = SCRIPTS_DIR / "data_prep"  # prepare_*_data scripts (scripts/data_prep.py shadows the package name)
+SAMPLE_DATA_DIR: pathlib.Path = PROJECT_ROOT / "Data"  # raw and prepared sample files shipped with the repo
+
+for path in (PROJECT_ROOT, SCRIPTS_DIR, DATA_PREP_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_dir(tmp_path_factory):
+    """
+    Write the loguru log and the stage profiles under a temporary directory, not the repo's logs/.
+
+    Returns:
+        pathlib.Path: The directory holding project_log.log and profile.jsonl.
+    """
+    import utils.logger
+    log_dir = tmp_path_factory.mktemp("logs")
+    utils.logger.logger.remove()
+    utils.logger.logger.add(log_dir / utils.logger.LOG_FILE.name, level="INFO", enqueue=True)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(utils.logger, "PROFILE_FILE", log_dir / utils.logger.PROFILE_FILE.name)
+        yield log_dir
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch):
+    """
+    Point the prepare scripts at a temporary data directory holding a copy of the raw samples.
+
+    Returns:
+        function: Called with a prepare module; returns its (raw, prepared) directories.
+    """
+    def use(module):
+        raw_dir = tmp_path / "raw"
+        prepared_dir = tmp_path / "prepared"
+        if not raw_dir.exists():
+            shutil.copytree(SAMPLE_DATA_DIR / "raw", raw_dir)
+            prepared_dir.mkdir()
+        monkeypatch.setattr(module, "RAW_DATA_DIR", raw_dir)
+        monkeypatch.setattr(module, "PREPARED_DATA_DIR", prepared_dir)
+        monkeypatch.setattr(module, "CACHE_DIR", tmp_path / ".cache")
+        return raw_dir, prepared_dir
+    return use
+
+
+@pytest.fixture
+def etl(tmp_path, monkeypatch):
+    """
+    Import scripts/etl_to_dw.py with its prepared, quarantine and warehouse paths under a temporary directory.
+
+    The warehouse is SQLite; set DB_PATH to a .duckdb file for the DuckDB engine.
+
+    Returns:
+        module: The etl_to_dw module.
+    """
+    import etl_to_dw
+    prepared_dir = tmp_path / "prepared"
+    prepared_dir.mkdir()
+    monkeypatch.setattr(etl_to_dw, "PREPARED_DATA_DIR", prepared_dir)
+    monkeypatch.setattr(etl_to_dw, "QUARANTINE_DIR", tmp_path / "quarantine")
+    monkeypatch.setattr(etl_to_dw, "DW_DIR", tmp_path / "dw")
+    monkeypatch.setattr(etl_to_dw, "DB_PATH", tmp_path / "dw" / "smart_sales.db")
+    return etl_to_dw
@@ -0,0 +1,92 @@
+"""
+test/test_column_profile.py
+
+Column profiles: the HyperLogLog distinct estimate stays close to the true
+cardinality, the exact statistics match pandas however the rows are chunked,
+and the prepare scripts save the profile next to their prepared file.
+
+"""
+
+# Imports from Python Standard Library
+import importlib
+import json
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils.column_profile import DataFrameProfiler, HyperLogLog, profile_dataframe
+
+
+def hll_of(values):
+    sketch = HyperLogLog()
+    sketch.add_hashes(pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy())
+    return sketch
+
+
+@pytest.mark.parametrize("cardinality", [10, 1_000, 200_000])
+def test_distinct_estimate_is_close_to_the_cardinality(cardinality):
+    values = np.arange(cardinality).repeat(3)  # repeats do not count
+
+    estimate = hll_of(values).estimate()
+
+    assert abs(estimate - cardinality) <= max(1, 0.03 * cardinality)  # standard error is about 0.8%
+
+
+def test_merged_sketches_estimate_the_union():
+    merged = hll_of(np.arange(0, 60_000))
+    merged.merge(hll_of(np.arange(40_000, 100_000)))
+
+    assert merged.estimate() == hll_of(np.arange(100_000)).estimate()
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(5)
+    n = 5_000
+    amount = rng.normal(100, 25, n).round(2)
+    amount[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        "amount": amount,
+        "store": rng.choice(["401", "402", "403", None], n, p=[0.5, 0.3, 0.15, 0.05]),
+        "customer": rng.integers(1_000, 1_300, n),
+    })
+
+
+def test_statistics_match_pandas_in_any_chunking(sales):
+    whole = profile_dataframe(sales)
+    profiler = DataFrameProfiler()
+    for start in range(0, len(sales), 700):
+        profiler.update(sales.iloc[start:start + 700])
+    chunked = profiler.to_dict()
+
+    assert whole["rows"] == chunked["rows"] == len(sales)
+    for column in sales.columns:
+        stats, values = chunked["columns"][column], sales[column]
+        assert stats["count"] == len(values)
+        assert stats["null_count"] == values.isna().sum()
+        assert stats["min"] == values.min() and stats["max"] == values.max()
+        assert abs(stats["distinct_estimate"] - values.nunique()) <= 0.03 * values.nunique()
+        if stats["top_values_exact"]:  # at most HEAVY_HITTER_COUNTERS distinct values
+            counts = values.value_counts()
+            assert [top["count"] for top in stats["top_values"]] == counts.head(len(stats["top_values"])).tolist()
+            assert all(counts[top["value"]] == top["count"] for top in stats["top_values"])  # ties in any order
+        for key in ("count", "null_count", "min", "max", "distinct_estimate"):
+            assert stats[key] == whole["columns"][column][key]
+    amount = chunked["columns"]["amount"]
+    assert amount["mean"] == pytest.approx(sales["amount"].mean())
+    assert amount["variance"] == pytest.approx(sales["amount"].var())
+    assert chunked["columns"]["store"]["mean"] is None
+
+
+def test_prepare_script_saves_the_profile_next_to_its_prepared_file(data_dirs):
+    module = importlib.import_module("prepare_customers_data")
+    raw_dir, prepared_dir = data_dirs(module)
+
+    module.main(use_cache=False)
+
+    profile = json.loads((prepared_dir / "customers_prepared.profile.json").read_text())
+    assert profile["rows"] == len(pd.read_csv(raw_dir / "customers_data.csv"))
+    assert not list(prepared_dir.glob("customers_data*"))
@@ -0,0 +1,98 @@
+"""
+test/test_data_prep.py
+
+The preparation pipelines run in a process pool: a failing pipeline stops the run
+at once, and every worker's log lines reach the shared log file intact.
+
+"""
+
+# Imports from Python Standard Library
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Imports from external packages
+import pytest
+
+# Imports from local modules
+import data_prep
+from utils.logger import LOG_FILE, logger
+
+# A stand-in prepare script: main() takes its time, logs, leaves a marker file and returns the shapes
+PIPELINE_SCRIPT = '''
+import pathlib
+import time
+from utils.logger import logger
+
+def main(chunk_size, file_format, use_cache):
+    time.sleep({seconds})
+    for line in range({log_lines}):
+        logger.info("pipeline {name} line " + str(line) + " " + "x" * 200)
+    if {fail}:
+        raise ValueError("bad raw file")
+    pathlib.Path(r"{marker}").touch()
+    return (1, 1), (1, 1)
+'''
+
+
+@pytest.fixture
+def pipelines(tmp_path, monkeypatch):
+    """
+    Point data_prep at stand-in prepare scripts under a temporary directory.
+
+    Returns:
+        function: Called with {name: fail} (in run order), the lines each script logs and the
+            seconds each passing script takes; returns the directory the scripts leave their markers in.
+    """
+    def use(fails, log_lines=0, seconds=0):
+        scripts = {}
+        for name, fail in fails.items():
+            script = tmp_path / f"prepare_{name}_data.py"
+            script.write_text(PIPELINE_SCRIPT.format(
+                name=name, fail=fail, log_lines=log_lines, seconds=0 if fail else seconds, marker=tmp_path / f"{name}.ran"))
+            scripts[name] = script
+        monkeypatch.setattr(data_prep, "PREPARE_SCRIPTS", scripts)
+        return tmp_path
+    return use
+
+
+def test_failing_pipeline_raises_and_cancels_the_rest(pipelines, monkeypatch):
+    names = ["customers", "products", "sales", "stores", "campaigns", "suppliers"]
+    marker_dir = pipelines({name: name == "customers" for name in names}, seconds=1)
+    futures = {}
+
+    class RecordingExecutor(ProcessPoolExecutor):
+        def submit(self, fn, name, *args, **kwargs):
+            futures[name] = super().submit(fn, name, *args, **kwargs)
+            return futures[name]
+
+    monkeypatch.setattr(data_prep, "ProcessPoolExecutor", RecordingExecutor)
+
+    with pytest.raises(RuntimeError, match="'customers' failed") as excinfo:
+        data_prep.run_prepare_pipelines(max_workers=1)
+
+    assert isinstance(excinfo.value.__cause__, ValueError)
+    # The single worker is busy with products and the pool has queued at most two more;
+    # the pipelines still waiting behind them are cancelled (by the pool's manager
+    # thread, shortly after the error) and never run
+    waiting = ["campaigns", "suppliers"]
+    deadline = time.monotonic() + 30
+    while not all(futures[name].done() for name in waiting) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    for name in waiting:
+        assert futures[name].cancelled()
+        assert not (marker_dir / f"{name}.ran").exists()
+
+
+def test_worker_log_lines_reach_the_log_file_intact(pipelines, log_dir):
+    names = ["customers", "products", "sales"]
+    pipelines({name: False for name in names}, log_lines=300)
+
+    results = data_prep.run_prepare_pipelines(max_workers=3)
+    logger.complete()
+
+    assert sorted(result["pipeline"] for result in results) == sorted(names)
+    lines = (log_dir / LOG_FILE.name).read_text().splitlines()
+    for name in names:
+        logged = [line for line in lines if f"pipeline {name} line " in line]
+        assert len(logged) == 300
+        assert all(line.endswith("x" * 200) for line in logged)
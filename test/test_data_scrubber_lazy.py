@@ -0,0 +1,72 @@
+"""
+test/test_data_scrubber_lazy.py
+
+A lazy DataScrubber plan must give the same DataFrame as the eager methods.
+
+"""
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from data_scrubber import DataScrubber
+
+PLANS = {
+    "filters_then_dedup": lambda s: (s.filter_column_outliers("amount", 0, 80),
+                                     s.filter_outliers({"discount": (0, 40)}),
+                                     s.handle_missing_data(drop=True),
+                                     s.remove_duplicate_records()),
+    "drop_rename_reorder": lambda s: (s.drop_columns(["store"]),
+                                      s.filter_column_outliers("amount", 10, 90),
+                                      s.rename_columns({"amount": "sale_amount"}),
+                                      s.reorder_columns(["payment", "sale_amount", "discount", "campaign", "id"])),
+    "fill_before_filter": lambda s: (s.handle_missing_data(fill_value=0),
+                                     s.filter_column_outliers("campaign", 0, 0),
+                                     s.remove_duplicate_records(keep="last")),
+    "subset_dedup_then_filter": lambda s: (s.remove_duplicate_records(subset=["id"], keep=False),
+                                           s.filter_column_outliers("amount", 0, 50)),
+}
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(1)
+    n = 3_000
+    df = pd.DataFrame({
+        "id": rng.integers(0, 1_000, n),
+        "amount": rng.integers(0, 100, n).astype(float),
+        "discount": rng.integers(0, 50, n).astype(float),
+        "campaign": np.where(rng.random(n) < 0.2, np.nan, rng.integers(0, 3, n)),
+        "store": rng.integers(0, 5, n),
+        "payment": rng.choice(["cash", "card"], n),
+    })
+    return pd.concat([df, df.sample(300, random_state=1)], ignore_index=True)
+
+
+@pytest.mark.parametrize("plan", PLANS)
+def test_lazy_plan_matches_eager(plan, sales):
+    eager = DataScrubber(sales.copy())
+    PLANS[plan](eager)
+    lazy = DataScrubber(sales.copy(), lazy=True)
+    PLANS[plan](lazy)
+
+    pd.testing.assert_frame_equal(lazy.collect(), eager.df)
+
+
+def test_lazy_methods_are_deferred_until_collect(sales):
+    scrubber = DataScrubber(sales, lazy=True)
+
+    assert scrubber.filter_column_outliers("amount", 0, 10) is scrubber
+    assert len(scrubber.df) == len(sales)
+    assert len(scrubber.collect()) < len(sales)
+
+
+def test_eager_method_runs_pending_plan(sales):
+    scrubber = DataScrubber(sales.copy(), lazy=True)
+    scrubber.rename_columns({"amount": "sale_amount"})
+
+    scrubber.convert_column_to_new_data_type("sale_amount", int)
+
+    assert "sale_amount" in scrubber.df.columns
@@ -0,0 +1,55 @@
+"""
+test/test_dates.py
+
+Date parsing: the column's day/month order is never silently swapped by a fallback format.
+
+"""
+
+# Imports from external packages
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils.dates import DateParser, day_month_order, detect_date_format
+
+
+@pytest.mark.parametrize("date_format, order", [
+    ("%m/%d/%Y", "md"), ("%d.%m.%Y", "dm"), ("%Y-%m-%d", None), ("%Y%m%d", None), ("%m/%d/%Y %H:%M", "md"),
+])
+def test_day_month_order(date_format, order):
+    assert day_month_order(date_format) == order
+
+
+def test_month_first_is_preferred_when_both_orders_parse():
+    assert detect_date_format(["5/4/2025", "1/2/2025"]) == "%m/%d/%Y"
+
+
+def test_fallback_keeps_the_column_order():
+    parser = DateParser()
+    dates = pd.Series(["5/4/2025", "12/31/2024", "2025-05-06", "25.12.2024", "05.04.2025", "04.04.2025", None, "junk",
+                       "1/2/2025", "6/7/2025"])
+
+    iso = parser.to_iso(dates)
+
+    assert parser.date_format == "%m/%d/%Y"
+    assert iso.tolist()[:4] == ["2025-05-04", "2024-12-31", "2025-05-06", "2024-12-25"]
+    assert pd.isna(iso[4])  # April 5 or May 4: ambiguous in a month-first column
+    assert iso[5] == "2025-04-04"  # the same date in either order
+    assert iso[6:8].isna().all()
+
+
+def test_same_order_fallback_is_trusted():
+    iso = DateParser("%d/%m/%Y").to_iso(pd.Series(["5/4/2025", "05.04.2025", "04-25-2025", "04-05-2025"]))
+
+    assert iso.tolist()[:3] == ["2025-04-05", "2025-04-05", "2025-04-25"]
+    assert pd.isna(iso[3])
+
+
+def test_category_columns_and_chunks_share_the_cache():
+    parser = DateParser()
+    first = parser.to_iso(pd.Series(["5/4/2025", "1/2/2025"], dtype="category"))
+    second = parser.to_iso(pd.Series(["1/2/2025", "6/7/2025"]))
+
+    assert isinstance(first.dtype, pd.CategoricalDtype)
+    assert first.astype(str).tolist() == ["2025-05-04", "2025-01-02"]
+    assert second.tolist() == ["2025-01-02", "2025-06-07"]
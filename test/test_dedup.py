@@ -0,0 +1,87 @@
+"""
+test/test_dedup.py
+
+Fingerprint-based duplicate detection must agree with pandas for every keep
+policy, and fingerprints must compare numbers by exact value.
+
+"""
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils.dedup import drop_duplicates, duplicated_mask, row_fingerprints
+from utils.streaming import ExternalDeduplicator
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(2)
+    n = 2_000
+    return pd.DataFrame({
+        "id": rng.integers(0, 300, n),
+        "amount": rng.integers(0, 5, n) * 1.5,
+        "payment": rng.choice(["cash", "card", None], n),
+    })
+
+
+@pytest.mark.parametrize("keep", ["first", "last", False])
+@pytest.mark.parametrize("subset", [None, ["id"], ["payment", "amount"]])
+def test_duplicated_mask_matches_pandas(sales, keep, subset):
+    expected = sales.duplicated(subset=subset, keep=keep).to_numpy()
+
+    np.testing.assert_array_equal(duplicated_mask(sales, subset, keep), expected)
+    pd.testing.assert_frame_equal(drop_duplicates(sales, subset, keep), sales.drop_duplicates(subset, keep=keep))
+
+
+def test_unknown_keep_policy_is_rejected(sales):
+    with pytest.raises(ValueError):
+        duplicated_mask(sales, keep="middle")
+
+
+def test_large_integers_do_not_collide():
+    ids = pd.DataFrame({"id": np.array([2**53, 2**53 + 1, 2**62 + 1, 2**62], dtype="int64")})
+
+    assert len(set(row_fingerprints(ids))) == 4
+    assert not duplicated_mask(ids).any()
+
+
+def test_fingerprints_ignore_int_float_and_nullable_types():
+    as_int = pd.DataFrame({"id": pd.Series([7, None, 2**60], dtype="Int64"), "name": ["a", "b", "c"]})
+    as_float = pd.DataFrame({"id": [7.0, np.nan, 2.0**60], "name": ["a", "b", "c"]})
+    as_small_int = pd.DataFrame({"id": np.array([7, 0, 1], dtype="int8"), "name": ["a", "b", "c"]})
+
+    np.testing.assert_array_equal(row_fingerprints(as_int), row_fingerprints(as_float))
+    assert row_fingerprints(as_small_int)[0] == row_fingerprints(as_int)[0]
+    assert row_fingerprints(pd.DataFrame({"x": [0.5]}))[0] != row_fingerprints(pd.DataFrame({"x": [0]}))[0]
+
+
+@pytest.mark.parametrize("keep", ["first", "last", False])
+@pytest.mark.parametrize("max_keys_in_memory", [10_000, 200])
+def test_external_deduplicator_matches_pandas(sales, keep, max_keys_in_memory, tmp_path):
+    input_files = [tmp_path / "part_1.csv", tmp_path / "part_2.csv"]
+    sales.iloc[:1_200].to_csv(input_files[0], index=False)
+    sales.iloc[1_200:].to_csv(input_files[1], index=False)
+    deduplicator = ExternalDeduplicator(subset=["id", "payment"], keep=keep, max_keys_in_memory=max_keys_in_memory,
+                                        spill_dir=tmp_path)
+
+    rows_in, rows_out = deduplicator.dedup_files(input_files, tmp_path / "deduplicated.csv", chunk_size=250)
+
+    written = pd.read_csv(tmp_path / "deduplicated.csv")
+    expected = sales.drop_duplicates(["id", "payment"], keep=keep).reset_index(drop=True)
+    assert (rows_in, rows_out) == (len(sales), len(expected))
+    pd.testing.assert_frame_equal(written, expected, check_dtype=False)
+
+
+def test_external_deduplicator_uses_one_schema_for_all_files(tmp_path):
+    # "store" parses as int64 in the first file but as str in the second (stray text value)
+    input_files = [tmp_path / "part_1.csv", tmp_path / "part_2.csv"]
+    input_files[0].write_text("store,payment\n10,cash\n11,card\n")
+    input_files[1].write_text("store,payment\n10,cash\nonline,card\n11,card\n")
+
+    rows_in, rows_out = ExternalDeduplicator(spill_dir=tmp_path).dedup_files(input_files, tmp_path / "out.csv")
+
+    assert (rows_in, rows_out) == (5, 3)
+    assert pd.read_csv(tmp_path / "out.csv", dtype=str)["store"].tolist() == ["10", "11", "online"]
@@ -0,0 +1,72 @@
+"""
+test/test_dtypes.py
+
+Compact column types: repetitive text becomes category while unique text is
+left alone, integers shrink without changing a value, and the planned types
+survive a round trip through every prepared format.
+
+"""
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils.dtypes import ColumnStats, MAX_CATEGORY_RATIO, apply_dtypes, plan_dtypes, plan_from_stats
+from utils.prepared_io import prepared_path, read_prepared, write_prepared
+
+
+@pytest.fixture
+def customers():
+    rng = np.random.default_rng(8)
+    n = 2_000
+    campaign = rng.integers(0, 4, n).astype(float)
+    campaign[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        "CustomerID": np.arange(1001, 1001 + n),
+        "Name": [f"Customer {i}" for i in range(n)],
+        "Region": rng.choice(["East", "West", "North", "South"], n),
+        "LoyaltyPoints": rng.integers(0, 20_000, n),
+        "CampaignID": campaign,
+        "SaleAmount": rng.integers(100, 100_000, n) / 100,
+    })
+
+
+def test_low_cardinality_text_becomes_category_high_cardinality_stays(customers):
+    plan = plan_dtypes(customers)
+
+    assert plan["Region"] == pd.CategoricalDtype(["East", "North", "South", "West"])
+    assert "Name" not in plan  # every value distinct
+    assert plan["CustomerID"] == "int16" and plan["LoyaltyPoints"] == "int16"
+    assert plan["CampaignID"] == "Int8"  # whole numbers with missing values
+    assert plan["SaleAmount"] == "float64"  # two decimals: float32 is not exact
+
+    compact = apply_dtypes(customers, plan)
+    changed = list(plan)
+    assert compact[changed].memory_usage(deep=True).sum() < customers[changed].memory_usage(deep=True).sum() / 2
+    pd.testing.assert_frame_equal(compact.astype(customers.dtypes.to_dict()), customers)
+
+
+def test_chunked_plan_matches_the_whole_frame_plan(customers):
+    stats = {column: ColumnStats(1_000) for column in customers.columns}
+    for start in range(0, len(customers), 300):
+        for column in customers.columns:
+            stats[column].update(customers[column].iloc[start:start + 300])
+
+    assert plan_from_stats(stats, MAX_CATEGORY_RATIO, exclude=[]) == plan_dtypes(customers)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet", "feather"])
+def test_prepared_round_trip_keeps_values_and_types(customers, tmp_path, file_format):
+    if file_format != "csv":
+        pytest.importorskip("pyarrow")
+    compact = apply_dtypes(customers, plan_dtypes(customers))
+    file_path = prepared_path(tmp_path / "customers_prepared.csv", file_format)
+
+    write_prepared(compact, file_path)
+    loaded = read_prepared(file_path)
+
+    pd.testing.assert_frame_equal(loaded, compact, check_dtype=False)
+    for column in ["Region", "CustomerID", "LoyaltyPoints", "CampaignID", "SaleAmount"]:
+        assert loaded[column].dtype == compact[column].dtype
@@ -0,0 +1,95 @@
+"""
+test/test_etl_incremental.py
+
+Incremental warehouse loads: only the delta is written, the sale high-water mark
+follows the loaded rows, and quarantined sales are loaded once they become valid.
+
+"""
+
+# Imports from external packages
+import pandas as pd
+
+# Imports from local modules
+from utils.warehouse import connect
+
+CUSTOMERS = pd.DataFrame({
+    "customer_id": [1000, 1001, 1002],
+    "name": ["Ann", "Bob", "Cy"],
+    "region": ["East", "West", "East"],
+    "join_date": ["2024-01-05", "2023-03-01", "2022-07-19"],
+    "preferred_contact_method": ["Email", "SMS", "Phone"],
+})
+PRODUCTS = pd.DataFrame({
+    "product_id": [2000, 2001],
+    "product_name": ["Laptop", "Shirt"],
+    "category": ["Electronics", "Clothing"],
+    "unit_price": [999.0, 20.0],
+    "stock_quantity": [5, 50],
+})
+SALES = pd.DataFrame({
+    "TransactionID": [1, 2, 3, 4],
+    "SaleDate": ["2025-05-04", "2025-05-04", "2025-05-05", "2025-06-01"],
+    "CustomerID": [1000, 1001, 1009, 1002],  # 1009 is not a customer yet
+    "ProductID": [2000, 2001, 2000, 2001],
+    "StoreID": [401, 402, 401, 403],
+    "CampaignID": [0, 1, 0, 2],
+    "SaleAmount": [999.0, 40.0, 999.0, 20.0],
+    "DiscountPercent": [0.0, 5.0, 10.0, 0.0],
+    "PaymentType": ["Card", "Cash", "Card", "Cash"],
+})
+
+
+def write_prepared_files(etl, customers, products, sales):
+    customers.to_csv(etl.PREPARED_DATA_DIR / "customers_data_prepared.csv", index=False)
+    products.to_csv(etl.PREPARED_DATA_DIR / "products_data_prepared.csv", index=False)
+    sales.to_csv(etl.PREPARED_DATA_DIR / "sales_data_prepared.csv", index=False)
+
+
+def query(etl, sql):
+    conn = connect(etl.DB_PATH)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_incremental_load_writes_delta_and_retries_quarantine(etl):
+    write_prepared_files(etl, CUSTOMERS, PRODUCTS, SALES)
+    etl.load_data_to_db()
+
+    assert query(etl, "SELECT sale_id FROM sale_fact ORDER BY sale_id") == [(1,), (2,), (4,)]
+    assert query(etl, "SELECT high_water_mark FROM etl_watermark WHERE table_name = 'sale_fact'") == [(4,)]
+    assert (etl.QUARANTINE_DIR / etl.SALE_QUARANTINE_FILE).exists()
+
+    # Next extract: the missing customer arrives, Bob is renamed, one new sale
+    customers = pd.concat([CUSTOMERS, pd.DataFrame({
+        "customer_id": [1009], "name": ["Dee"], "region": ["West"], "join_date": ["2025-05-05"],
+        "preferred_contact_method": ["Email"],
+    })], ignore_index=True)
+    customers.loc[customers["customer_id"] == 1001, "name"] = "Robert"
+    new_sales = SALES[SALES["TransactionID"] != 3].copy()
+    new_sales = pd.concat([new_sales, SALES.iloc[[1]].assign(TransactionID=5)], ignore_index=True)
+    write_prepared_files(etl, customers, PRODUCTS, new_sales)
+    etl.load_data_to_db(incremental=True)
+
+    assert query(etl, "SELECT sale_id FROM sale_fact ORDER BY sale_id") == [(1,), (2,), (3,), (4,), (5,)]
+    assert query(etl, "SELECT high_water_mark FROM etl_watermark WHERE table_name = 'sale_fact'") == [(5,)]
+    assert query(etl, "SELECT name FROM customer WHERE customer_id = 1001") == [("Robert",)]
+    assert query(etl, "SELECT COUNT(*) FROM customer") == [(4,)]
+    assert not (etl.QUARANTINE_DIR / etl.SALE_QUARANTINE_FILE).exists()
+
+    # The cube counts every loaded sale exactly once, including the retried one
+    assert query(etl, "SELECT SUM(transactions), SUM(total_sales) FROM sale_cube") == [(5, 999.0 * 2 + 40.0 * 2 + 20.0)]
+
+
+def test_incremental_load_without_changes_writes_nothing(etl, capsys):
+    write_prepared_files(etl, CUSTOMERS, PRODUCTS, SALES)
+    etl.load_data_to_db()
+    capsys.readouterr()
+
+    etl.load_data_to_db(incremental=True)
+    output = capsys.readouterr().out
+
+    assert "customer: 0 new or changed rows, 3 unchanged" in output
+    assert "sale_fact: 0 rows above high-water mark 4" in output
+    assert query(etl, "SELECT SUM(transactions) FROM sale_cube") == [(3,)]
@@ -0,0 +1,59 @@
+"""
+test/test_etl_quarantine.py
+
+Sales whose customer or product is not in the warehouse are kept out of the
+fact table and written to data/quarantine/sale_orphans with the reasons.
+
+"""
+
+# Imports from Python Standard Library
+import sqlite3
+
+# Imports from external packages
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils.prepared_io import read_prepared
+
+
+@pytest.fixture
+def cursor(etl):
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    etl.create_schema(cursor)
+    cursor.executemany("INSERT INTO customer (customer_id, name) VALUES (?, ?)", [(1000, "Ann"), (1001, "Bob")])
+    cursor.executemany("INSERT INTO product (product_id, product_name) VALUES (?, ?)", [(2000, "Laptop")])
+    yield cursor
+    conn.close()
+
+
+def sales(customer_ids, product_ids):
+    return pd.DataFrame({
+        "sale_id": range(1, len(customer_ids) + 1),
+        "customer_id": pd.array(customer_ids, dtype="Int64"),
+        "product_id": pd.array(product_ids, dtype="Int64"),
+        "sale_amount": 10.0,
+    })
+
+
+def test_orphans_are_quarantined_with_their_reasons(etl, cursor):
+    sales_df = sales([1000, 1009, 1001, 1009, None], [2000, 2000, 2005, 2005, 2000])
+
+    valid = etl.quarantine_orphan_sales(sales_df, cursor)
+
+    assert valid["sale_id"].tolist() == [1, 5]  # a missing key references nothing, as with FOREIGN KEY
+    quarantined = read_prepared(etl.QUARANTINE_DIR / etl.SALE_QUARANTINE_FILE)
+    assert quarantined["sale_id"].tolist() == [2, 3, 4]
+    assert quarantined["violations"].tolist() == ["missing_customer", "missing_product", "missing_customer, missing_product"]
+
+
+def test_clean_load_removes_the_previous_quarantine(etl, cursor):
+    etl.quarantine_orphan_sales(sales([1009], [2000]), cursor)
+    quarantine_file = etl.QUARANTINE_DIR / etl.SALE_QUARANTINE_FILE
+    assert quarantine_file.exists()
+
+    valid = etl.quarantine_orphan_sales(sales([1000, 1001], [2000, 2000]), cursor)
+
+    assert len(valid) == 2
+    assert not quarantine_file.exists()
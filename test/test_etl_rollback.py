@@ -0,0 +1,64 @@
+"""
+test/test_etl_rollback.py
+
+A load that fails partway through rolls back as one transaction: the warehouse
+keeps the tables, rows, cube and version stamp of the previous load.
+
+"""
+
+# Imports from external packages
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from test_etl_incremental import CUSTOMERS, PRODUCTS, SALES, query, write_prepared_files
+
+SNAPSHOT_QUERIES = {
+    "customer": "SELECT customer_id, name FROM customer ORDER BY customer_id",
+    "product": "SELECT product_id, product_name FROM product ORDER BY product_id",
+    "sale_fact": "SELECT sale_id, customer_id, product_id, date_key, sale_amount FROM sale_fact ORDER BY sale_id",
+    "sale_cube": "SELECT category, region, store_id, month, payment_type, total_sales, transactions "
+                 "FROM sale_cube ORDER BY category, region, store_id, month, payment_type",
+    "etl_watermark": "SELECT table_name, high_water_mark FROM etl_watermark ORDER BY table_name",
+    "warehouse_version": "SELECT * FROM warehouse_version",
+}
+
+
+def snapshot(etl):
+    return {table: query(etl, sql) for table, sql in SNAPSHOT_QUERIES.items()}
+
+
+def fail_after_first_batch(etl, monkeypatch):
+    """Make the sale_fact insert write its first batch, then fail."""
+    original = etl.bulk_insert
+
+    def bulk_insert(df, table, cursor, batch_size=etl.BATCH_SIZE, on_conflict=""):
+        if table != "sale_fact":
+            return original(df, table, cursor, batch_size, on_conflict)
+        original(df.iloc[:batch_size], table, cursor, batch_size, on_conflict)
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(etl, "bulk_insert", bulk_insert)
+
+
+@pytest.mark.parametrize("suffix", [".db", ".duckdb"])
+@pytest.mark.parametrize("incremental", [False, True])
+def test_failed_load_leaves_previous_warehouse_intact(etl, monkeypatch, capsys, suffix, incremental):
+    if suffix == ".duckdb":
+        pytest.importorskip("duckdb")
+    monkeypatch.setattr(etl, "DB_PATH", etl.DW_DIR / f"smart_sales{suffix}")
+    write_prepared_files(etl, CUSTOMERS, PRODUCTS, SALES)
+    etl.load_data_to_db()
+    before = snapshot(etl)
+    assert len(before["sale_fact"]) == 3
+
+    # The next extract renames a customer and brings three new sales
+    customers = CUSTOMERS.copy()
+    customers.loc[customers["customer_id"] == 1001, "name"] = "Robert"
+    new_sales = SALES.iloc[[0, 1, 3]].assign(TransactionID=[5, 6, 7])
+    write_prepared_files(etl, customers, PRODUCTS, pd.concat([SALES, new_sales], ignore_index=True))
+    fail_after_first_batch(etl, monkeypatch)
+    etl.load_data_to_db(batch_size=1, incremental=incremental)
+
+    assert "disk full" in capsys.readouterr().out
+    assert snapshot(etl) == before
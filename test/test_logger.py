@@ -0,0 +1,70 @@
+"""
+test/test_logger.py
+
+Stage profiling: memory tracing is opt-in, the RSS delta and peak RSS are always recorded.
+
+"""
+
+# Imports from Python Standard Library
+import json
+import tracemalloc
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils.logger import current_rss_mb, profile_stage, profiled
+
+
+def test_profile_stage_does_not_trace_by_default(tmp_path):
+    profile_file = tmp_path / "profile.jsonl"
+
+    with profile_stage("untraced", rows_in=3, profile_file=profile_file) as record:
+        assert not tracemalloc.is_tracing()
+        record["rows_out"] = 2
+
+    written = json.loads(profile_file.read_text())
+    assert written["rows_out"] == 2
+    assert "peak_memory_delta_mb" not in written
+    assert "peak_rss_mb" in written
+
+
+@pytest.mark.skipif(current_rss_mb() is None, reason="no /proc/self/statm on this platform")
+def test_profile_stage_records_the_rss_delta_by_default(tmp_path):
+    profile_file = tmp_path / "profile.jsonl"
+
+    with profile_stage("allocate", profile_file=profile_file):
+        buffer = np.ones(64 * 1024 * 1024, dtype=np.uint8)  # 64 MB, touched so it is resident
+
+    written = json.loads(profile_file.read_text())
+    assert written["rss_delta_mb"] >= 60
+    del buffer
+
+
+def test_profile_stage_traces_nested_stages_on_request(tmp_path):
+    profile_file = tmp_path / "profile.jsonl"
+
+    with profile_stage("outer", trace_memory=True, profile_file=profile_file):
+        with profile_stage("inner", trace_memory=True, profile_file=profile_file):
+            buffer = bytearray(8 * 1024 * 1024)
+        del buffer
+
+    inner, outer = [json.loads(line) for line in profile_file.read_text().splitlines()]
+    assert inner["peak_memory_delta_mb"] >= 8
+    assert outer["peak_memory_delta_mb"] >= inner["peak_memory_delta_mb"]
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiled_counts_rows(monkeypatch, tmp_path):
+    monkeypatch.setattr("utils.logger.PROFILE_FILE", tmp_path / "profile.jsonl")
+
+    @profiled("halve")
+    def halve(df):
+        return df.iloc[: len(df) // 2]
+
+    halve(pd.DataFrame({"a": range(10)}))
+
+    record = json.loads((tmp_path / "profile.jsonl").read_text())
+    assert (record["stage"], record["rows_in"], record["rows_out"]) == ("halve", 10, 5)
@@ -0,0 +1,83 @@
+"""
+test/test_mmap_csv.py
+
+MappedCSV parses the same rows as pd.read_csv, whole, by row range and by
+split, including a byte order mark, CRLF line ends, quoted newlines and a
+last row without a newline.
+
+"""
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils.mmap_csv import MappedCSV
+
+
+def read_ranges(csv, ranges):
+    return pd.concat([csv.read(start, stop) for start, stop in ranges], ignore_index=True)
+
+
+@pytest.fixture
+def sales_file(tmp_path):
+    rng = np.random.default_rng(3)
+    n = 500
+    df = pd.DataFrame({
+        "id": range(n),
+        "amount": np.where(rng.random(n) < 0.1, np.nan, rng.integers(0, 1_000, n) / 4),
+        "note": rng.choice(["plain", "comma, inside", 'quote "inside"', "two\nlines", ""], n),
+    })
+    path = tmp_path / "sales.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_read_matches_pandas(sales_file):
+    expected = pd.read_csv(sales_file)
+
+    with MappedCSV(sales_file) as csv:
+        assert csv.n_rows == len(expected)
+        assert csv.columns == expected.columns.tolist()
+        pd.testing.assert_frame_equal(csv.read(), expected)
+        pd.testing.assert_frame_equal(read_ranges(csv, csv.split(7)), expected)
+        pd.testing.assert_frame_equal(pd.concat(csv.iter_chunks(64), ignore_index=True), expected)
+        tail = csv.read(csv.n_rows - 20)
+        parts = [csv.read_bytes(*csv.byte_range(start, stop)) for start, stop in csv.split(3)]
+
+    pd.testing.assert_frame_equal(tail, expected.iloc[-20:].reset_index(drop=True))
+    pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True), expected)
+
+
+def test_byte_order_mark_and_crlf(tmp_path):
+    path = tmp_path / "customers.csv"
+    path.write_bytes("﻿CustomerID,Name\r\n1,Ann\r\n2,\"Bo\r\nLee\"\r\n3,Cy\r\n".encode("utf-8"))
+    expected = pd.read_csv(path)
+
+    with MappedCSV(path) as csv:
+        assert csv.columns == ["CustomerID", "Name"]
+        assert csv.n_rows == 3
+        pd.testing.assert_frame_equal(csv.read(), expected)
+        pd.testing.assert_frame_equal(read_ranges(csv, [(0, 1), (1, 3)]), expected)
+
+
+def test_last_row_without_trailing_newline(tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text("ProductID,Price\n1,2.5\n2,3.5\n3,4.5")
+    expected = pd.read_csv(path)
+
+    with MappedCSV(path) as csv:
+        assert csv.n_rows == 3
+        pd.testing.assert_frame_equal(read_ranges(csv, [(0, 2), (2, 3)]), expected)
+        assert bytes(csv.slice(2)) == b"3,4.5"
+
+
+def test_header_only_file(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("id,amount\n")
+
+    with MappedCSV(path) as csv:
+        assert csv.n_rows == 0
+        assert csv.split(4) == []
+        assert csv.read(0, 0).columns.tolist() == ["id", "amount"]
@@ -0,0 +1,77 @@
+"""
+test/test_outliers.py
+
+IQR outlier filtering: the one-pass multi-column mask matches a per-column
+filter, saved bounds are reused, and degenerate columns (all missing,
+constant) do not drop every row.
+
+"""
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils import outliers
+from utils.outliers import StreamingQuantiles, iqr_bounds, iqr_bounds_cached, outlier_mask
+
+
+@pytest.fixture
+def products():
+    rng = np.random.default_rng(11)
+    n = 3_000
+    price = rng.lognormal(3, 0.6, n)
+    price[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        "price": price,
+        "stock": rng.integers(0, 500, n).astype(float) * np.where(rng.random(n) < 0.02, 20, 1),
+        "weight": rng.normal(10, 2, n),
+        "name": rng.choice(["a", "b"], n),
+    })
+
+
+@pytest.mark.parametrize("k", [1.5, 3.0])
+def test_mask_matches_a_per_column_iqr_filter(products, k):
+    keep = pd.Series(True, index=products.index)
+    for column in ["price", "stock", "weight"]:
+        q1, q3 = products[column].quantile([0.25, 0.75])
+        inside = products[column].between(q1 - k * (q3 - q1), q3 + k * (q3 - q1))
+        keep &= inside | products[column].isna()
+
+    mask = outlier_mask(products, iqr_bounds(products, k=k))
+
+    np.testing.assert_array_equal(mask, keep.to_numpy())
+    assert 0 < (~mask).sum() < len(products) // 10
+
+
+def test_saved_bounds_are_reused(products, tmp_path, monkeypatch):
+    bounds_file = tmp_path / "products_outlier_bounds.json"
+    first = iqr_bounds_cached(products, bounds_file)
+
+    def recompute(*args, **kwargs):
+        raise AssertionError("bounds were recomputed")
+    monkeypatch.setattr(outliers, "iqr_bounds", recompute)
+
+    assert iqr_bounds_cached(products.iloc[:100], bounds_file) == first
+    assert iqr_bounds_cached(products, bounds_file, columns=["price"]) == {"price": first["price"]}
+    with pytest.raises(AssertionError, match="recomputed"):
+        iqr_bounds_cached(products, bounds_file, k=3.0)
+
+
+def test_all_missing_and_constant_columns_keep_every_row():
+    df = pd.DataFrame({"discount": [np.nan] * 6, "region_id": [4.0] * 6, "amount": [1.0, 2, 3, 4, 5, 6]})
+
+    bounds = iqr_bounds(df)
+
+    assert bounds["region_id"] == (4.0, 4.0)
+    assert outlier_mask(df, bounds).all()
+
+
+def test_bounds_without_data_do_not_bound():
+    # A column with no values yet (e.g. the first chunks of a stream) has no quartiles
+    sketch = StreamingQuantiles(["discount"])
+    sketch.update(pd.DataFrame({"discount": [np.nan, np.nan]}))
+    bounds = sketch.iqr_bounds()
+
+    assert outlier_mask(pd.DataFrame({"discount": [0.0, 5.0, 95.0]}), bounds).all()
@@ -0,0 +1,77 @@
+"""
+test/test_parallel_csv.py
+
+Parsing on several cores gives the same frame as a serial read, whatever the
+range boundaries cut through, and the parallel sales pipeline reads
+ambiguous dates the same way as the serial one.
+
+"""
+
+# Imports from Python Standard Library
+import functools
+import importlib
+
+# Imports from external packages
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils import parallel_csv
+from utils.parallel_csv import read_csv_parallel
+
+
+@pytest.fixture
+def many_ranges(monkeypatch):
+    """Split even a small test file into one range per couple hundred bytes."""
+    monkeypatch.setattr(parallel_csv, "MIN_PART_BYTES", 200)
+
+
+def scale(df, factor=1):
+    """Row-by-row stage loaded by the worker processes."""
+    return df.assign(amount=df["amount"] * factor)
+
+
+def test_ranges_match_a_serial_read(tmp_path, many_ranges):
+    # A quoted newline on every 7th row, missing amounts in the middle, a stray text store at the end
+    lines = ["id,store,amount,note"]
+    for i in range(300):
+        note = f'"line one\nline two {i}"' if i % 7 == 0 else f"note {i}"
+        amount = "" if 100 <= i < 110 else str(i * 3)
+        store = "online" if i == 290 else str(i % 5)
+        lines.append(f"{i},{store},{amount},{note}")
+    path = tmp_path / "sales.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+    result = read_csv_parallel(path, max_workers=3)
+
+    pd.testing.assert_frame_equal(result, pd.read_csv(path))
+
+
+def test_stages_run_in_every_range_with_bound_keywords(tmp_path, many_ranges):
+    path = tmp_path / "sales.csv"
+    pd.DataFrame({"id": range(200), "amount": range(200)}).to_csv(path, index=False)
+
+    result = read_csv_parallel(path, stages=[functools.partial(scale, factor=10)], max_workers=2)
+
+    pd.testing.assert_frame_equal(result, scale(pd.read_csv(path), factor=10))
+
+
+def test_parallel_sales_dates_match_the_serial_pipeline(data_dirs, many_ranges):
+    module = importlib.import_module("prepare_sales_data")
+    raw_dir, prepared_dir = data_dirs(module)
+    # Month-first dates up front; the tail only has day-first and ambiguous dates,
+    # so a range that detected its own format would read 05/04/2025 as April 5
+    dates = ["01/13/2025", "02/14/2025", "03/15/2025", "05/04/2025"] * 40 + ["25/04/2025", "05/04/2025"] * 40
+    raw = pd.DataFrame({
+        "TransactionID": range(len(dates)), "SaleDate": dates, "CustomerID": 1001, "ProductID": 2001,
+        "StoreID": 401, "CampaignID": 0, "SaleAmount": 10.5, "DiscountPercent": 5.0, "PaymentType": "Cash",
+    })
+    raw.to_csv(raw_dir / "sales_data.csv", index=False)
+
+    module.main(use_cache=False)
+    serial = pd.read_csv(prepared_dir / "sales_prepared.csv")
+    module.main(use_cache=False, max_workers=3)
+    parallel = pd.read_csv(prepared_dir / "sales_prepared.csv")
+
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert (serial.loc[serial["TransactionID"] == len(dates) - 1, "SaleDate"] == "2025-05-04").all()
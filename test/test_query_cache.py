@@ -0,0 +1,86 @@
+"""
+test/test_query_cache.py
+
+QueryCache: results are reused until the warehouse version stamp changes.
+
+"""
+
+# Imports from Python Standard Library
+import sqlite3
+
+# Imports from external packages
+import pytest
+
+# Imports from local modules
+from utils.query_cache import QueryCache, bump_warehouse_version, normalize_sql
+
+SQL = "SELECT region, SUM(amount) AS total FROM sale GROUP BY region ORDER BY region"
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    db_path = tmp_path / "smart_sales.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE sale (region TEXT, amount REAL)")
+    conn.executemany("INSERT INTO sale VALUES (?, ?)", [("East", 10.0), ("West", 5.0)])
+    bump_warehouse_version(conn.cursor())
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def load(conn, rows):
+    """Append rows and stamp a new version in the same transaction, as load_data_to_db does."""
+    conn.executemany("INSERT INTO sale VALUES (?, ?)", rows)
+    bump_warehouse_version(conn.cursor())
+    conn.commit()
+
+
+def test_repeated_query_is_a_hit(warehouse):
+    queries = QueryCache(warehouse)
+
+    first = queries.read_sql(SQL)
+    first["total"] = 0  # callers get copies
+    second = queries.read_sql("  SELECT region, SUM(amount) AS total\n FROM sale GROUP BY region ORDER BY region;")
+
+    assert (queries.hits, queries.misses) == (1, 1)
+    assert second["total"].tolist() == [10.0, 5.0]
+
+
+def test_version_bump_invalidates_memory_and_disk(warehouse, tmp_path):
+    cache_dir = tmp_path / "queries"
+    queries = QueryCache(warehouse, cache_dir=cache_dir)
+    assert queries.read_sql(SQL)["total"].tolist() == [10.0, 5.0]
+
+    load(warehouse, [("East", 1.0)])
+
+    assert queries.read_sql(SQL)["total"].tolist() == [11.0, 5.0]
+    assert (queries.hits, queries.misses) == (0, 2)
+    # A new process reuses the disk results of the current version only
+    other_process = QueryCache(warehouse, cache_dir=cache_dir)
+    assert other_process.read_sql(SQL)["total"].tolist() == [11.0, 5.0]
+    assert other_process.hits == 1
+
+
+def test_disk_results_of_an_old_version_are_dropped(warehouse, tmp_path):
+    cache_dir = tmp_path / "queries"
+    QueryCache(warehouse, cache_dir=cache_dir).read_sql(SQL)
+
+    load(warehouse, [("West", 2.0)])
+    queries = QueryCache(warehouse, cache_dir=cache_dir)
+
+    assert queries.read_sql(SQL)["total"].tolist() == [10.0, 7.0]
+    assert queries.misses == 1
+
+
+def test_parameters_are_part_of_the_key(warehouse):
+    queries = QueryCache(warehouse)
+    sql = "SELECT SUM(amount) AS total FROM sale WHERE region = ?"
+
+    assert queries.read_sql(sql, params=("East",))["total"].tolist() == [10.0]
+    assert queries.read_sql(sql, params=("West",))["total"].tolist() == [5.0]
+    assert queries.misses == 2
+
+
+def test_normalize_sql_keeps_string_literals():
+    assert normalize_sql("SELECT  'a   b'\n FROM t ;") == "SELECT 'a   b' FROM t"
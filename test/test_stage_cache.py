@@ -0,0 +1,168 @@
+"""
+test/test_stage_cache.py
+
+Stage cache: hits on unchanged inputs and code, resumes after a failed stage,
+and never stores a failed or empty load.
+
+"""
+
+# Imports from Python Standard Library
+import json
+import pathlib
+
+# Imports from external packages
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils import stage_cache
+from utils.stage_cache import DIGEST_INDEX_FILE, StageCache, file_digest, run_cached_pipeline, stage_keys
+
+
+class CountingPipeline:
+    """A load and two stages that count their calls; fail_at makes a stage raise."""
+
+    def __init__(self, input_file, fail_at=None):
+        self.input_file = input_file
+        self.fail_at = fail_at
+        self.calls = []
+
+    def read(self):
+        self.calls.append("read")
+        if self.fail_at == "read":
+            raise OSError("disk went away")
+        return pd.read_csv(self.input_file)
+
+    def double(self, df):
+        self.calls.append("double")
+        return df.assign(amount=df["amount"] * 2)
+
+    def positive(self, df):
+        self.calls.append("positive")
+        if self.fail_at == "positive":
+            raise RuntimeError("crash")
+        return df[df["amount"] > 0]
+
+    def run(self, cache, sources=()):
+        load = ("read", self.read, {})
+        stages = [("double", self.double, {}), ("positive", self.positive, {})]
+        return run_cached_pipeline(self.input_file, load, stages, cache, sources=sources)
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    path = tmp_path / "sales.csv"
+    pd.DataFrame({"amount": [1, -2, 3]}).to_csv(path, index=False)
+    return path
+
+
+def test_unchanged_input_is_a_cache_hit(raw_file, tmp_path):
+    cache = StageCache(tmp_path / ".cache")
+    first = CountingPipeline(raw_file)
+    expected, shape = first.run(cache)
+
+    second = CountingPipeline(raw_file)
+    df, cached_shape = second.run(cache)
+
+    assert second.calls == []
+    pd.testing.assert_frame_equal(df, expected)
+    assert cached_shape == shape == (3, 1)
+
+
+def test_changed_input_misses(raw_file, tmp_path):
+    cache = StageCache(tmp_path / ".cache")
+    CountingPipeline(raw_file).run(cache)
+    pd.DataFrame({"amount": [5, 6]}).to_csv(raw_file, index=False)
+
+    pipeline = CountingPipeline(raw_file)
+    df, _ = pipeline.run(cache)
+
+    assert pipeline.calls == ["read", "double", "positive"]
+    assert df["amount"].tolist() == [10, 12]
+
+
+def test_failed_stage_resumes_after_the_last_completed_one(raw_file, tmp_path):
+    cache = StageCache(tmp_path / ".cache")
+    with pytest.raises(RuntimeError):
+        CountingPipeline(raw_file, fail_at="positive").run(cache)
+
+    pipeline = CountingPipeline(raw_file)
+    df, _ = pipeline.run(cache)
+
+    assert pipeline.calls == ["positive"]
+    assert df["amount"].tolist() == [2, 6]
+
+
+def test_failed_load_is_not_cached(raw_file, tmp_path):
+    cache = StageCache(tmp_path / ".cache")
+    with pytest.raises(OSError):
+        CountingPipeline(raw_file, fail_at="read").run(cache)
+
+    assert not list(cache.cache_dir.glob("*.pkl"))
+    pipeline = CountingPipeline(raw_file)
+    df, _ = pipeline.run(cache)
+    assert pipeline.calls == ["read", "double", "positive"]
+    assert len(df) == 2
+
+
+def test_empty_load_is_not_cached(tmp_path):
+    cache = StageCache(tmp_path / ".cache")
+    empty_file = tmp_path / "empty.csv"
+    empty_file.write_text("amount\n")
+
+    df, shape = CountingPipeline(empty_file).run(cache)
+
+    assert shape == (0, 1) and df.empty
+    assert not list(cache.cache_dir.glob("*.pkl"))
+
+
+def test_keys_cover_utils_and_given_sources(raw_file, tmp_path, monkeypatch):
+    cache = StageCache(tmp_path / ".cache")
+    helper = tmp_path / "helper.py"
+    helper.write_text("RATE = 1\n")
+    pipeline = CountingPipeline(raw_file)
+    load, stages = ("read", pipeline.read, {}), [("double", pipeline.double, {})]
+    before = stage_keys(raw_file, load, stages, cache, sources=[helper])
+
+    helper.write_text("RATE = 20\n")
+    assert stage_keys(raw_file, load, stages, cache, sources=[helper]) != before
+
+    utils_dir = tmp_path / "utils"
+    utils_dir.mkdir()
+    (utils_dir / "dates.py").write_text("FORMAT = 1\n")
+    monkeypatch.setattr(stage_cache, "UTILS_DIR", utils_dir)
+    utils_before = stage_keys(raw_file, load, stages, cache)
+    (utils_dir / "dates.py").write_text("FORMAT = 22\n")
+    assert stage_keys(raw_file, load, stages, cache) != utils_before
+
+
+def test_file_digest_index_is_rewritten_whole(raw_file, tmp_path):
+    index_dir = tmp_path / ".cache"
+    digest = file_digest(raw_file, index_dir)
+
+    index = json.loads((index_dir / DIGEST_INDEX_FILE).read_text())
+    assert index[str(raw_file.resolve())]["digest"] == digest
+    assert not list(index_dir.glob("*.tmp"))
+    assert file_digest(raw_file, index_dir) == digest
+
+
+def test_entry_larger_than_the_cache_is_not_written(tmp_path, monkeypatch):
+    cache = StageCache(tmp_path / ".cache", max_bytes=100)
+    writes = []
+    monkeypatch.setattr(stage_cache, "_write_atomic", lambda path, write: writes.append(path))
+
+    cache.put("big", pd.DataFrame({"amount": range(1_000)}))
+
+    assert not writes
+    assert cache.get("big") == (None, None)
+
+
+def test_evict_skips_entries_removed_by_another_process(tmp_path, monkeypatch):
+    cache = StageCache(tmp_path / ".cache", max_bytes=10_000)
+    cache.put("small", pd.DataFrame({"amount": [1, 2]}))
+    glob = pathlib.Path.glob
+    gone = cache.cache_dir / "gone.pkl"  # listed, then unlinked before its stat
+    monkeypatch.setattr(pathlib.Path, "glob", lambda self, pattern: [gone, *glob(self, pattern)])
+
+    assert cache.evict() == 0
+    assert cache.get("small")[0] is not None
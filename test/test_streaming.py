@@ -0,0 +1,65 @@
+"""
+test/test_streaming.py
+
+Streaming (chunked) mode must give the same prepared data as the in-memory pipelines.
+
+"""
+
+# Imports from Python Standard Library
+import importlib
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from utils.streaming import ChunkDeduplicator
+
+PREPARE_MODULES = ["prepare_customers_data", "prepare_products_data", "prepare_sales_data"]
+
+
+def read_prepared(prepared_dir, file_name):
+    return pd.read_csv(prepared_dir / file_name, dtype=str, keep_default_na=False).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("module_name", PREPARE_MODULES)
+def test_streaming_matches_in_memory(module_name, data_dirs, tmp_path):
+    module = importlib.import_module(module_name)
+    _, prepared_dir = data_dirs(module)
+    output_file = f"{module_name.removeprefix('prepare_').removesuffix('_data')}_prepared.csv"
+
+    in_memory_shapes = module.main(use_cache=False)
+    expected = read_prepared(prepared_dir, output_file)
+    streamed_shapes = module.main(chunk_size=300)
+    streamed = read_prepared(prepared_dir, output_file)
+
+    assert streamed_shapes == in_memory_shapes
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_sales_rows_without_amount_or_in_range_are_dropped(data_dirs):
+    module = importlib.import_module("prepare_sales_data")
+    raw_dir, prepared_dir = data_dirs(module)
+    raw = pd.read_csv(raw_dir / "sales_data.csv", dtype=str)
+    assert (raw["SaleAmount"] == "?").any()
+
+    module.main(use_cache=False)
+    prepared = pd.read_csv(prepared_dir / "sales_prepared.csv")
+
+    assert pd.api.types.is_numeric_dtype(prepared["SaleAmount"])
+    assert prepared[module.REQUIRED_COLUMNS].notna().all().all()
+    assert (prepared["SaleAmount"] >= 0).all()
+    assert prepared["DiscountPercent"].between(0, 100).all()
+
+
+@pytest.mark.parametrize("max_keys_in_memory", [1_000_000, 50])
+def test_chunk_deduplicator_matches_drop_duplicates(max_keys_in_memory, tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"a": rng.integers(0, 30, 2_000), "b": rng.choice(["x", "y", "z"], 2_000)})
+    deduplicator = ChunkDeduplicator(max_keys_in_memory=max_keys_in_memory, spill_dir=tmp_path)
+
+    kept = pd.concat([deduplicator.drop_seen(df.iloc[start:start + 170]) for start in range(0, len(df), 170)])
+
+    pd.testing.assert_frame_equal(kept, df.drop_duplicates())
+    assert len(deduplicator) == len(kept)
@@ -0,0 +1,54 @@
+"""
+test/test_strings.py
+
+normalize_columns gives the same values with or without pyarrow, and the
+modules that import it load when pyarrow is not installed.
+
+"""
+
+# Imports from Python Standard Library
+import subprocess
+import sys
+
+# Imports from external packages
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from conftest import DATA_PREP_DIR, PROJECT_ROOT, SCRIPTS_DIR
+import utils.strings
+from utils.strings import normalize_columns
+
+
+@pytest.fixture
+def names():
+    return pd.DataFrame({
+        "name": ["  Ann   Lee ", "ÉCOLE\tdu  Nord", None, "bob"] * 3,
+        "payment": pd.Categorical([" Cash", "cash ", "CARD", None] * 3),
+    })
+
+
+@pytest.mark.parametrize("options", [
+    {"case": "lower", "collapse_whitespace": True},
+    {"case": "title", "trim": False, "collapse_whitespace": True},
+    {"case": "upper", "unicode_form": "NFKD"},
+    {},
+])
+def test_pandas_fallback_matches_pyarrow_kernels(names, monkeypatch, options):
+    pytest.importorskip("pyarrow")
+    expected = normalize_columns(names, ["name", "payment"], **options)
+    monkeypatch.setattr(utils.strings, "_import_pyarrow", lambda: None)
+
+    result = normalize_columns(names, ["name", "payment"], **options)
+
+    assert isinstance(result["payment"].dtype, pd.CategoricalDtype)
+    for column in ("name", "payment"):
+        assert result[column].astype(object).tolist() == expected[column].astype(object).tolist()
+
+
+def test_modules_import_without_pyarrow():
+    # A None entry in sys.modules makes "import pyarrow" raise ImportError
+    code = "import sys; sys.modules['pyarrow'] = None; import data_scrubber, etl_to_dw, prepare_customers_data, prepare_products_data, prepare_sales_data"
+    paths = [str(PROJECT_ROOT), str(SCRIPTS_DIR), str(DATA_PREP_DIR)]
+    subprocess.run([sys.executable, "-c", f"import sys; sys.path[:0] = {paths!r}; {code}"],
+                   cwd=PROJECT_ROOT, check=True, capture_output=True)
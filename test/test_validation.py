@@ -0,0 +1,40 @@
+"""
+test/test_validation.py
+
+Pattern rules give the same violations with the pyarrow kernels and with the
+pandas fallback used when pyarrow is not installed.
+
+"""
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+import pytest
+
+# Imports from local modules
+import utils.validation
+from utils.validation import RuleSet
+
+RULES = [
+    {"name": "sku_format", "column": "sku", "check": "pattern", "pattern": r"^[A-Z]{3}-\d+$"},
+    {"name": "region_word", "column": "region", "check": "pattern", "pattern": r"(?i)north|south"},
+]
+
+
+@pytest.fixture
+def products():
+    return pd.DataFrame({
+        "sku": ["ABC-1", "abc-2", None, "XYZ-10", "XY-3", 42],
+        "region": pd.Categorical(["North", "east", None, "SOUTH", "west", "North"]),
+    })
+
+
+def test_pattern_fallback_matches_pyarrow(products, monkeypatch):
+    pytest.importorskip("pyarrow")
+    expected = RuleSet(RULES).validate(products)
+    monkeypatch.setattr(utils.validation, "_import_pyarrow", lambda: None)
+
+    result = RuleSet(RULES).validate(products)
+
+    np.testing.assert_array_equal(result.mask, expected.mask)
+    assert result.counts == expected.counts == {"sku_format": 3, "region_word": 2}
@@ -0,0 +1,57 @@
+"""
+test/test_warehouse_engines.py
+
+The repo's real prepared files load into SQLite and DuckDB with the same results.
+
+"""
+
+# Imports from Python Standard Library
+import shutil
+
+# Imports from external packages
+import pandas as pd
+import pytest
+
+# Imports from local modules
+from conftest import SAMPLE_DATA_DIR
+from utils.olap_cube import query_cube
+from utils.warehouse import connect, read_sql
+
+TABLE_QUERIES = {
+    "sale_fact": "SELECT sale_id, customer_id, product_id, date_key, sale_amount, discount_percent FROM sale_fact ORDER BY sale_id",
+    "customer": "SELECT customer_id, name FROM customer ORDER BY customer_id",
+    "product": "SELECT product_id, product_name FROM product ORDER BY product_id",
+    "sale_cube": "SELECT category, region, store_id, month, payment_type, total_sales, transactions "
+                 "FROM sale_cube ORDER BY category, region, store_id, month, payment_type",
+}
+
+
+def load_real_data(etl, suffix):
+    for path in (SAMPLE_DATA_DIR / "prepared").glob("*_data_prepared.csv"):
+        shutil.copyfile(path, etl.PREPARED_DATA_DIR / path.name)
+    etl.DB_PATH = etl.DW_DIR / f"smart_sales{suffix}"
+    etl.load_data_to_db()
+    conn = connect(etl.DB_PATH)
+    try:
+        tables = {table: read_sql(conn, sql) for table, sql in TABLE_QUERIES.items()}
+        tables["cube_by_region"] = query_cube(conn, ["region"])
+        return tables
+    finally:
+        conn.close()
+
+
+def test_real_prepared_files_load_the_same_on_both_engines(etl):
+    pytest.importorskip("duckdb")
+    sqlite_tables = load_real_data(etl, ".db")
+    duckdb_tables = load_real_data(etl, ".duckdb")
+
+    prepared_sales = pd.read_csv(SAMPLE_DATA_DIR / "prepared" / "sales_data_prepared.csv", dtype=str)
+    assert (prepared_sales["sale_amount"] == "?").any()
+    # Every sale except the quarantined orphan is loaded, with "?" as a NULL amount
+    assert len(sqlite_tables["sale_fact"]) == prepared_sales["TransactionID"].nunique() - 1
+    assert sqlite_tables["sale_fact"]["sale_amount"].isna().sum() == 1
+    for table in TABLE_QUERIES:
+        pd.testing.assert_frame_equal(duckdb_tables[table], sqlite_tables[table], check_dtype=False)
+    # Cube roll-ups have the same types on both engines: integer transaction counts
+    assert pd.api.types.is_integer_dtype(sqlite_tables["cube_by_region"]["transactions"])
+    pd.testing.assert_frame_equal(duckdb_tables["cube_by_region"], sqlite_tables["cube_by_region"])
@@ -0,0 +1,278 @@
+"""
+utils/column_profile.py
+
+Single-pass column profiling for the prepare pipelines.
+
+Profiling a DataFrame column by column with pandas (df.isnull().sum(),
+df.nunique(), df.describe(), value_counts() per column, ...) reads the data
+once per statistic. DataFrameProfiler computes, per column, from one
+value_counts pass over each chunk:
+- row and null counts
+- distinct count estimate (HyperLogLog: fixed memory, about 0.8% error)
+- min / max
+- mean and variance (numeric columns; merged across chunks exactly)
+- top-k most frequent values (Misra-Gries: bounded memory; exact while a
+  column has at most HEAVY_HITTER_COUNTERS distinct values)
+
+Every statistic merges across chunks, so the streaming mode profiles a file
+of any size in the same scan that cleans it, with memory bounded per column.
+Profiles are saved as JSON next to the prepared files.
+
+This module provides:
+- HyperLogLog: mergeable distinct count estimate
+- ColumnProfiler / DataFrameProfiler: per-column statistics, updated chunk by chunk
+- profile_dataframe: profile of an in-memory DataFrame
+- profile_path / save_profile: where and how profiles are stored
+- log_profile: one log line per column
+
+Example:
+    from utils.column_profile import DataFrameProfiler, save_profile
+    profiler = DataFrameProfiler()
+    for chunk in read_csv_in_chunks(raw_path, chunk_size):
+        profiler.update(chunk)
+    save_profile(profiler.to_dict(), PREPARED_DATA_DIR / "sales_prepared.csv")  # sales_prepared.profile.json
+
+"""
+
+# Imports from Python Standard Library
+import json
+import math
+import pathlib
+from typing import Any, Dict, List, Optional
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Imports from local modules
+from utils.logger import logger
+
+# Define global constants
+DEFAULT_HLL_PRECISION: int = 14  # 2**14 registers: 16 KB per column, about 0.8% standard error
+DEFAULT_TOP_K: int = 10  # Most frequent values reported per column
+HEAVY_HITTER_COUNTERS: int = 1000  # Values counted per column for the top-k (Misra-Gries)
+PROFILE_SUFFIX: str = ".profile.json"
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct count estimate over 64-bit hashes.
+
+    Adding a value twice does not change the estimate, so each chunk only
+    adds its distinct values. Two sketches with the same precision merge by
+    taking the register-wise maximum.
+    """
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        """
+        Parameters:
+            precision (int): log2 of the number of registers, 4 to 18.
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision must be between 4 and 18, got {precision}.")
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """Add uint64 hashes: the top bits pick a register, the rest give its leading-zero rank."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # rank = leading zeros in the width-bit rest + 1; frexp gives floor(log2) exactly (rest < 2**53)
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, width + 1, width - (exponent - 1)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge precision {other.precision} into precision {self.precision}.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """Return the estimated number of distinct values added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))  # linear counting for small cardinalities
+        return int(round(raw))
+
+
+def _json_value(value: Any) -> Any:
+    """Convert a numpy / pandas scalar to a JSON-friendly Python value."""
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ColumnProfiler:
+    """Statistics of one column, updated chunk by chunk."""
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K, precision: int = DEFAULT_HLL_PRECISION):
+        """
+        Parameters:
+            top_k (int): Most frequent values to report.
+            precision (int): HyperLogLog precision of the distinct count.
+        """
+        self.top_k = top_k
+        self.dtype: Optional[str] = None
+        self.count = 0
+        self.null_count = 0
+        self.distinct = HyperLogLog(precision)
+        self.minimum: Any = None
+        self.maximum: Any = None
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.sum_squared_deviations = 0.0  # M2 of Welford / Chan
+        self.counts: Optional[pd.Series] = None
+        self.top_values_exact = True
+
+    def update(self, series: pd.Series) -> None:
+        """Add a chunk of the column."""
+        self.dtype = str(series.dtype)
+        self.count += len(series)
+        counts = series.value_counts(sort=False)  # one hash pass: distinct values with their counts
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            counts = counts[counts > 0]
+            counts.index = counts.index.astype(counts.index.categories.dtype)
+        self.null_count += len(series) - int(counts.sum())
+        if counts.empty:
+            return
+
+        distinct_values = counts.index
+        self.distinct.add_hashes(pd.util.hash_pandas_object(pd.Series(distinct_values), index=False).to_numpy())
+        self._update_range(distinct_values)
+        if pd.api.types.is_numeric_dtype(distinct_values.dtype) and not pd.api.types.is_bool_dtype(distinct_values.dtype):
+            self._update_moments(distinct_values.to_numpy(dtype=np.float64), counts.to_numpy(dtype=np.float64))
+        self._update_heavy_hitters(counts)
+
+    def _update_range(self, distinct_values: pd.Index) -> None:
+        """Merge the chunk's min / max (skipped for values that do not compare, e.g. mixed types)."""
+        try:
+            low, high = distinct_values.min(), distinct_values.max()
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+        except TypeError:
+            pass
+
+    def _update_moments(self, values: np.ndarray, weights: np.ndarray) -> None:
+        """Merge the chunk's count, mean and M2 (Chan et al.), from distinct values and their counts."""
+        n = weights.sum()
+        mean = float((values * weights).sum() / n)
+        m2 = float((weights * (values - mean) ** 2).sum())
+        total = self.numeric_count + n
+        delta = mean - self.mean
+        self.sum_squared_deviations += m2 + delta * delta * self.numeric_count * n / total
+        self.mean += delta * n / total
+        self.numeric_count = int(total)
+
+    def _update_heavy_hitters(self, counts: pd.Series) -> None:
+        """Merge the chunk's value counts into at most HEAVY_HITTER_COUNTERS counters (Misra-Gries)."""
+        if self.counts is None:
+            # First chunk: its counts are exact, so keeping the largest ones keeps exact counts
+            self.counts = counts.nlargest(HEAVY_HITTER_COUNTERS).astype(np.int64)
+            return
+        merged = self.counts.add(counts, fill_value=0)
+        if len(merged) > HEAVY_HITTER_COUNTERS:
+            # Subtract the (k+1)-th largest count from every counter: counts become lower bounds
+            threshold = merged.nlargest(HEAVY_HITTER_COUNTERS + 1).iloc[-1]
+            merged = merged[merged > threshold] - threshold
+            self.top_values_exact = False
+        self.counts = merged.astype(np.int64)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the profile as a JSON-friendly dict."""
+        variance = self.sum_squared_deviations / (self.numeric_count - 1) if self.numeric_count > 1 else None
+        top = self.counts.nlargest(self.top_k) if self.counts is not None else pd.Series(dtype=np.int64)
+        return {
+            "dtype": self.dtype,
+            "count": self.count,
+            "null_count": self.null_count,
+            "distinct_estimate": self.distinct.estimate(),
+            "min": _json_value(self.minimum),
+            "max": _json_value(self.maximum),
+            "mean": self.mean if self.numeric_count else None,
+            "variance": variance,
+            "top_values": [{"value": _json_value(value), "count": int(count)} for value, count in top.items()],
+            "top_values_exact": self.top_values_exact,
+        }
+
+
+class DataFrameProfiler:
+    """Profiles of every column of a DataFrame, updated chunk by chunk (columns may appear in any chunk)."""
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K, precision: int = DEFAULT_HLL_PRECISION):
+        """
+        Parameters:
+            top_k (int): Most frequent values to report per column.
+            precision (int): HyperLogLog precision of the distinct counts.
+        """
+        self.top_k = top_k
+        self.precision = precision
+        self.rows = 0
+        self.columns: Dict[str, ColumnProfiler] = {}
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Add a chunk of rows."""
+        self.rows += len(df)
+        for column in df.columns:
+            profiler = self.columns.setdefault(str(column), ColumnProfiler(self.top_k, self.precision))
+            profiler.update(df[column])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return {"rows": ..., "columns": {column: profile}}."""
+        return {"rows": self.rows, "columns": {column: profiler.to_dict() for column, profiler in self.columns.items()}}
+
+
+def profile_dataframe(df: pd.DataFrame, top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
+    """
+    Profile every column of a DataFrame.
+
+    Args:
+        df (pd.DataFrame): Data to profile.
+        top_k (int): Most frequent values to report per column.
+
+    Returns:
+        Dict[str, Any]: {"rows": ..., "columns": {column: profile}}; see ColumnProfiler.to_dict().
+    """
+    profiler = DataFrameProfiler(top_k)
+    profiler.update(df)
+    return profiler.to_dict()
+
+
+def profile_path(data_path: pathlib.Path) -> pathlib.Path:
+    """Return the profile file next to a data file: <file name without suffix>.profile.json."""
+    data_path = pathlib.Path(data_path)
+    return data_path.with_name(data_path.stem + PROFILE_SUFFIX)
+
+
+def save_profile(profile: Dict[str, Any], data_path: pathlib.Path) -> pathlib.Path:
+    """
+    Write a profile as JSON next to a data file.
+
+    Args:
+        profile (dict): From profile_dataframe() or DataFrameProfiler.to_dict().
+        data_path (pathlib.Path): File the profile belongs to (see profile_path()).
+
+    Returns:
+        pathlib.Path: The profile file.
+    """
+    path = profile_path(data_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(profile, indent=2, default=str))
+    logger.info(f"Column profile saved to {path}")
+    return path
+
+
+def log_profile(profile: Dict[str, Any]) -> None:
+    """Log the type, null count and distinct estimate of every column."""
+    summaries: List[str] = [
+        f"{column} ({stats['dtype']}): {stats['null_count']} nulls, ~{stats['distinct_estimate']} distinct"
+        for column, stats in profile["columns"].items()
+    ]
+    logger.info(f"Column profile of {profile['rows']} rows:\n" + "\n".join(summaries))
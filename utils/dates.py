@@ -0,0 +1,237 @@
+"""
+utils/dates.py
+
+Fast date parsing and ISO normalization for the raw date columns.
+
+pd.to_datetime without a format has to infer the format of values like
+5/4/2025, which is very slow on millions of rows. Dates also repeat heavily
+(a year of sales has at most 366 distinct SaleDate values), so parsing every
+row is wasted work. DateParser:
+- detects the format of a column once, from a sample of distinct values
+- parses only distinct values, with the fast explicit-format path, and maps
+  them back to the rows
+- caches value -> timestamp across calls, so every chunk of a streamed file
+  only parses dates it has not seen before
+
+The prepare scripts write dates as ISO YYYY-MM-DD strings, so downstream
+readers (the warehouse load, the analysis scripts) never parse them again.
+
+This module provides:
+- detect_date_format: the format that parses the most sample values
+- day_month_order: whether a format reads the day or the month first
+- DateParser: cached parsing and ISO normalization for one column
+- parse_dates / to_iso_dates: one-off helpers
+
+Example:
+    from utils.dates import to_iso_dates
+    df["SaleDate"] = to_iso_dates(df["SaleDate"])
+
+"""
+
+# Imports from Python Standard Library
+from typing import Optional, Sequence
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Imports from local modules
+from utils.logger import logger
+
+# Define global constants
+# Tried in order; the first format that parses the most sample values wins,
+# so month-first (US) beats day-first when both parse every value
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%Y/%m/%d",
+    "%m-%d-%Y",
+    "%d.%m.%Y",
+    "%Y%m%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+]
+ISO_DATE_FORMAT: str = "%Y-%m-%d"
+FORMAT_SAMPLE_SIZE: int = 1_000  # Distinct values used to detect a format
+MAX_CACHED_DATES: int = 1_000_000  # Distinct values a DateParser remembers
+
+
+def detect_date_format(values: Sequence[str], formats: Sequence[str] = DATE_FORMATS,
+                       sample_size: int = FORMAT_SAMPLE_SIZE) -> Optional[str]:
+    """
+    Detect the date format of a column from a sample of its distinct values.
+
+    Args:
+        values (list-like): Date strings (missing values are ignored).
+        formats (list): Candidate strptime formats, in order of preference.
+        sample_size (int): Distinct values to try.
+
+    Returns:
+        str or None: The format that parses the most sample values, or None
+            if no format parses any.
+    """
+    sample = pd.Series(pd.unique(pd.Series(values).dropna().astype(str)))[:sample_size]
+    if sample.empty:
+        return None
+    best_format, best_count = None, 0
+    for date_format in formats:
+        count = pd.to_datetime(sample, format=date_format, errors="coerce").notna().sum()
+        if count > best_count:
+            best_format, best_count = date_format, count
+        if count == len(sample):
+            break
+    return best_format
+
+
+def day_month_order(date_format: str) -> Optional[str]:
+    """
+    Return "dm" or "md" for a format whose day and month come in that order
+    after any other field, or None for year-first formats (e.g. ISO).
+
+    Args:
+        date_format (str): strptime format.
+
+    Returns:
+        str or None: "dm", "md" or None.
+    """
+    day, month, year = date_format.find("%d"), date_format.find("%m"), date_format.find("%Y")
+    if day < 0 or month < 0 or 0 <= year < min(day, month):
+        return None
+    return "dm" if day < month else "md"
+
+
+class DateParser:
+    """
+    Parse one date column (possibly chunk by chunk) with a detected format and a cache.
+
+    Values the detected format cannot parse are tried with the other
+    candidate formats (so a column mixing 5/4/2025 and 2025-05-04 still
+    parses); values no format parses become missing. A fallback format with
+    the other day/month order is only trusted when the value has one reading
+    (a day above 12, or day == month): 05.04.2025 in a month-first column
+    could be April 5 or May 4, so it is logged and becomes missing.
+
+    Example:
+        parser = DateParser()
+        for chunk in chunks:
+            chunk["SaleDate"] = parser.to_iso(chunk["SaleDate"])
+    """
+
+    def __init__(self, date_format: Optional[str] = None, formats: Sequence[str] = DATE_FORMATS,
+                 max_cached: int = MAX_CACHED_DATES):
+        """
+        Parameters:
+            date_format (str, optional): Known format; detected from the first values parsed otherwise.
+            formats (list): Candidate formats for detection and for values the main format cannot parse.
+            max_cached (int): Distinct values kept in the cache; it is cleared when full.
+        """
+        self.date_format = date_format
+        self.formats = list(formats)
+        self.max_cached = max_cached
+        self.cache = pd.Series(dtype="datetime64[ns]")
+
+    def _parse_unique(self, values: pd.Index) -> pd.Series:
+        """Parse distinct string values, indexed by value, using and filling the cache."""
+        missing = values.difference(self.cache.index)
+        if len(missing):
+            if self.date_format is None:
+                self.date_format = detect_date_format(missing, self.formats)
+            formats = [self.date_format] + [f for f in self.formats if f != self.date_format] if self.date_format else []
+            # The column's day/month order: the detected format's, else the first candidate's
+            orders = [day_month_order(date_format) for date_format in formats]
+            column_order = next((order for order in orders if order), None)
+            parsed = pd.Series(pd.NaT, index=missing, dtype="datetime64[ns]")
+            ambiguous = np.zeros(len(missing), dtype=bool)
+            for date_format, order in zip(formats, orders):
+                unparsed = parsed.isna().to_numpy()
+                if not unparsed.any():
+                    break
+                attempt = pd.DatetimeIndex(pd.to_datetime(missing[unparsed], format=date_format, errors="coerce"))
+                if order is not None and order != column_order:
+                    swappable = (attempt.day <= 12) & (attempt.day != attempt.month)
+                    ambiguous[np.flatnonzero(unparsed)[swappable]] = True
+                    attempt = attempt.where(~swappable)
+                parsed[unparsed] = np.asarray(attempt, dtype="datetime64[ns]")
+            ambiguous &= parsed.isna().to_numpy()
+            if ambiguous.any():
+                logger.warning(f"{ambiguous.sum()} dates (e.g. {missing[ambiguous][0]!r}) have a different "
+                               f"day/month order than {self.date_format}; set to missing")
+            if len(self.cache) + len(parsed) > self.max_cached:
+                self.cache = self.cache.iloc[:0]
+            self.cache = pd.concat([self.cache, parsed]) if len(self.cache) else parsed
+        return self.cache.reindex(values)
+
+    def parse(self, dates: pd.Series) -> pd.Series:
+        """
+        Parse date strings to datetime64.
+
+        Parameters:
+            dates (pd.Series): Date strings (or a category column of them).
+
+        Returns:
+            pd.Series: datetime64 values, NaT where the value is missing or not a date.
+        """
+        codes, uniques = pd.factorize(dates)
+        parsed = self._parse_unique(pd.Index(uniques.astype(str))).to_numpy()
+        result = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]")
+        valid = codes >= 0
+        result[valid] = parsed[codes[valid]]
+        return pd.Series(result, index=dates.index, name=dates.name)
+
+    def to_iso(self, dates: pd.Series) -> pd.Series:
+        """
+        Normalize date strings to ISO YYYY-MM-DD.
+
+        Only the distinct values are parsed and formatted. A category column
+        stays a category column; its ISO categories follow from its categories
+        alone, so chunks that share categories (see utils.dtypes) also share
+        the ISO ones.
+
+        Parameters:
+            dates (pd.Series): Date strings (or a category column of them).
+
+        Returns:
+            pd.Series: ISO date strings, missing where the value is missing or not a date.
+        """
+        if isinstance(dates.dtype, pd.CategoricalDtype):
+            categories = dates.cat.categories
+            iso = self._parse_unique(pd.Index(categories.astype(str))).dt.strftime(ISO_DATE_FORMAT).to_numpy()
+            iso_categories = pd.Index(pd.unique(iso[pd.notna(iso)])).sort_values()
+            category_codes = np.where(pd.notna(iso), iso_categories.get_indexer(iso), -1)
+            codes = dates.cat.codes.to_numpy()
+            codes = np.where(codes >= 0, category_codes[codes], -1)
+            return pd.Series(pd.Categorical.from_codes(codes, categories=iso_categories),
+                             index=dates.index, name=dates.name)
+        codes, uniques = pd.factorize(dates)
+        iso = self._parse_unique(pd.Index(uniques.astype(str))).dt.strftime(ISO_DATE_FORMAT).to_numpy()
+        iso = np.append(iso, None)  # code -1 (missing) picks the last entry
+        return pd.Series(iso[codes], index=dates.index, name=dates.name, dtype="str")
+
+
+def parse_dates(dates: pd.Series, date_format: Optional[str] = None) -> pd.Series:
+    """
+    Parse date strings to datetime64, detecting the format if not given (see DateParser).
+
+    Args:
+        dates (pd.Series): Date strings.
+        date_format (str, optional): Known strptime format.
+
+    Returns:
+        pd.Series: datetime64 values, NaT where the value is missing or not a date.
+    """
+    return DateParser(date_format).parse(dates)
+
+
+def to_iso_dates(dates: pd.Series, date_format: Optional[str] = None) -> pd.Series:
+    """
+    Normalize date strings to ISO YYYY-MM-DD, detecting the format if not given (see DateParser).
+
+    Args:
+        dates (pd.Series): Date strings (or a category column of them).
+        date_format (str, optional): Known strptime format.
+
+    Returns:
+        pd.Series: ISO date strings, missing where the value is missing or not a date.
+    """
+    return DateParser(date_format).to_iso(dates)
@@ -0,0 +1,205 @@
+"""
+utils/dtypes.py
+
+Plan compact column types for the raw, prepared and warehouse data.
+
+pd.read_csv loads text columns as Python strings and numbers as 64-bit. Most
+of the raw columns are far smaller than that: Region, PaymentType, Category,
+Supplier and PreferredContactMethod have a handful of distinct values,
+StoreID and CampaignID fit in one or two bytes, and LoyaltyPoints and
+StockQuantity fit in 16 bits. The planner picks, per column:
+- category, for text columns with few distinct values (a small integer code
+  per row instead of a string object)
+- the smallest integer type that holds every value (a nullable Int type when
+  there are missing values, e.g. CampaignID 0-3 read as float)
+- float32, for floats that float32 stores exactly
+
+Every change is lossless: values and missing values are unchanged (whole
+numbers read as float, like CampaignID, are written to CSV without ".0").
+Floats such as SaleAmount or DiscountPercent (two decimals) stay float64,
+because float32 cannot store them exactly.
+
+This module provides:
+- plan_dtypes: plan the types of an in-memory DataFrame
+- ColumnStats / plan_from_stats: the same planning over chunks
+  (utils.streaming.plan_csv_dtypes plans a whole CSV file this way)
+- apply_dtypes: convert a DataFrame to a plan
+- save_dtype_plan / load_dtype_plan: keep a plan as JSON next to a prepared CSV,
+  so the next reader (e.g. the warehouse load) gets the same types
+
+Example:
+    from utils.dtypes import apply_dtypes, plan_dtypes
+    df = pd.read_csv(file_path)
+    df = apply_dtypes(df, plan_dtypes(df))
+
+"""
+
+# Imports from Python Standard Library
+import json
+import pathlib
+from typing import Any, Dict, Optional, Sequence
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Define global constants
+MAX_CATEGORIES: int = 1_000  # Most distinct values for a category column
+MAX_CATEGORY_RATIO: float = 0.5  # Most distinct values per non-missing value for a category column
+INTEGER_TYPES = ["int8", "int16", "int32", "int64"]
+DTYPE_PLAN_SUFFIX: str = ".dtypes.json"
+
+DtypePlan = Dict[str, Any]  # Column -> dtype string or pd.CategoricalDtype
+
+
+class ColumnStats:
+    """Statistics of one column, merged over chunks, that the planner decides from."""
+
+    def __init__(self, max_categories: int):
+        self.max_categories = max_categories
+        self.kinds: set = set()
+        self.count = 0
+        self.has_missing = False
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.whole = True
+        self.float32_exact = True
+        self.values: Optional[set] = set()
+
+    def update(self, series: pd.Series) -> None:
+        """Add one chunk of the column."""
+        values = series.dropna()
+        self.count += len(values)
+        self.has_missing |= len(values) < len(series)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(series.dtype.categories.dtype)
+        if pd.api.types.is_bool_dtype(series):
+            self.kinds.add("bool")
+        elif pd.api.types.is_integer_dtype(series) or pd.api.types.is_float_dtype(series):
+            self.kinds.add("integer" if pd.api.types.is_integer_dtype(series) else "float")
+            if len(values):
+                numbers = values.to_numpy(dtype="float64")
+                self.minimum = min(self.minimum, numbers.min())
+                self.maximum = max(self.maximum, numbers.max())
+                self.whole &= bool(np.all(np.isfinite(numbers)) and np.all(numbers == np.round(numbers)))
+                self.float32_exact &= bool(np.all(numbers.astype("float32").astype("float64") == numbers))
+        elif pd.api.types.is_string_dtype(series) or pd.api.types.is_object_dtype(series):
+            self.kinds.add("text")
+            if self.values is not None:
+                self.values.update(values.unique().tolist())
+                if len(self.values) > self.max_categories:
+                    self.values = None
+        else:
+            self.kinds.add("other")
+
+    def plan(self, max_category_ratio: float) -> Optional[Any]:
+        """Return the planned dtype, or None to keep the type pandas reads."""
+        if self.kinds == {"text"}:
+            if self.values is None or len(self.values) > max_category_ratio * max(self.count, 1):
+                return None
+            if not all(isinstance(value, str) for value in self.values):
+                return None
+            return pd.CategoricalDtype(sorted(self.values))
+        if self.kinds and self.kinds <= {"integer", "float"}:
+            if self.count == 0:
+                return None
+            if self.whole:
+                for dtype in INTEGER_TYPES:
+                    info = np.iinfo(dtype)
+                    if info.min <= self.minimum and self.maximum <= info.max:
+                        return dtype.capitalize() if self.has_missing else dtype
+            if self.float32_exact:
+                return "float32"
+            return "float64"
+        return None
+
+
+def plan_from_stats(stats: Dict[str, ColumnStats], max_category_ratio: float,
+                    exclude: Sequence[str]) -> DtypePlan:
+    """Collect the planned dtype of every column that changes (see ColumnStats)."""
+    plan = {}
+    for column, column_stats in stats.items():
+        if column in exclude:
+            continue
+        dtype = column_stats.plan(max_category_ratio)
+        if dtype is not None:
+            plan[column] = dtype
+    return plan
+
+
+def plan_dtypes(df: pd.DataFrame, exclude: Sequence[str] = (), max_categories: int = MAX_CATEGORIES,
+                max_category_ratio: float = MAX_CATEGORY_RATIO) -> DtypePlan:
+    """
+    Plan compact, lossless column types for a DataFrame.
+
+    Args:
+        df (pd.DataFrame): Data to plan for.
+        exclude (list, optional): Columns to leave as they are (e.g. dates still to be parsed).
+        max_categories (int): Most distinct values for a category column.
+        max_category_ratio (float): Most distinct values per non-missing value for a category column.
+
+    Returns:
+        DtypePlan: Column -> dtype, for the columns to convert.
+    """
+    stats = {}
+    for column in df.columns:
+        stats[column] = ColumnStats(max_categories)
+        stats[column].update(df[column])
+    return plan_from_stats(stats, max_category_ratio, exclude)
+
+
+def apply_dtypes(df: pd.DataFrame, plan: DtypePlan) -> pd.DataFrame:
+    """
+    Convert the planned columns of a DataFrame.
+
+    Args:
+        df (pd.DataFrame): Data to convert.
+        plan (DtypePlan): Column -> dtype; columns not in df are ignored.
+
+    Returns:
+        pd.DataFrame: DataFrame with the planned column types.
+    """
+    plan = {column: dtype for column, dtype in plan.items() if column in df.columns and df[column].dtype != dtype}
+    if not plan:
+        return df
+    return df.astype(plan)
+
+
+def dtype_plan_path(file_path: pathlib.Path) -> pathlib.Path:
+    """Return the path of the dtype plan kept next to a prepared CSV file."""
+    return file_path.with_name(file_path.name + DTYPE_PLAN_SUFFIX)
+
+
+def save_dtype_plan(df: pd.DataFrame, file_path: pathlib.Path) -> None:
+    """
+    Save the category and numeric column types of a DataFrame as JSON, for
+    readers of the CSV written from it. Other columns are left to pd.read_csv.
+
+    Args:
+        df (pd.DataFrame): Data whose types to keep.
+        file_path (pathlib.Path): JSON file (see dtype_plan_path).
+    """
+    plan = {}
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            plan[column] = {"dtype": "category", "categories": dtype.categories.tolist()}
+        elif pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            plan[column] = str(dtype)
+    file_path.write_text(json.dumps(plan, indent=2))
+
+
+def load_dtype_plan(file_path: pathlib.Path) -> Dict[str, Any]:
+    """
+    Load a plan saved by save_dtype_plan, ready for pd.read_csv(dtype=...).
+
+    Args:
+        file_path (pathlib.Path): JSON file (see dtype_plan_path).
+
+    Returns:
+        Dict[str, Any]: Column -> dtype.
+    """
+    plan = json.loads(file_path.read_text())
+    return {
+        column: pd.CategoricalDtype(dtype["categories"]) if isinstance(dtype, dict) else dtype
+        for column, dtype in plan.items()
+    }
@@ -5,30 +5,224 @@ File: utils/logger.py
 This script provides logging functions for the project. Logging is an essential way to
 track events and issues during software execution. This logger setup uses Loguru to log
 messages and errors both to a file and to the console.
+
+It also provides lightweight stage profiling, so a pipeline run shows where the time goes
+without attaching a profiler:
+- profile_stage: context manager that times a block of code
+- profiled: decorator that times every call of a function
+- summarize_profile: total the recorded stages per stage name
+- peak_rss_mb: peak resident memory of the process so far
+- current_rss_mb: resident memory of the process now
+
+Each profiled stage appends one JSON line to logs/profile.jsonl with wall time, CPU time,
+rows in/out, the stage's RSS delta (resident memory at the end minus at the start) and the
+process's peak RSS. Stages that opt in with trace_memory=True also
+record the peak traced memory above the memory in use when the stage started; tracing
+hooks every allocation, so it slows the stage down (by an order of magnitude for code
+that creates one Python object per value, such as to_csv) and is off by default.
+
+Example:
+    from utils.logger import profiled, profile_stage
+
+    @profiled()
+    def remove_duplicates(df): ...
+
+    with profile_stage("insert_sales", rows_in=len(sales_df)) as record:
+        record["rows_out"] = insert_sales(sales_df, cursor)
 """
 
 # Imports from Python Standard Library
+import contextlib
+import functools
+import json
+import os
 import pathlib
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 # Imports from external packages
 from loguru import logger
 
+# resource is not available on Windows; peak RSS is then recorded as null
+try:
+    import resource
+except ImportError:
+    resource = None
+
 # Define global constants
 CURRENT_SCRIPT = pathlib.Path(__file__).stem  # Gets the current file name without the extension
 PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent  # Navigate to the project's root directory
 LOG_FOLDER: pathlib.Path = PROJECT_ROOT.joinpath("logs")  # Directory where logs will be stored
 LOG_FILE: pathlib.Path = LOG_FOLDER.joinpath("project_log.log")  # Path to the log file
+PROFILE_FILE: pathlib.Path = LOG_FOLDER.joinpath("profile.jsonl")  # Stage profiling records (JSON lines)
 
 # Ensure the log folder exists or create it
 LOG_FOLDER.mkdir(exist_ok=True)
 
-# Configure Loguru to write to the log file
-logger.add(LOG_FILE, level="INFO")
+# Configure Loguru to write to the log file. enqueue=True hands every record to one
+# writer thread through a multiprocessing queue, so the worker processes of
+# scripts/data_prep.py do not interleave or lose lines in the shared file.
+logger.add(LOG_FILE, level="INFO", enqueue=True)
 
 # Optionally, add console output for logging (Uncomment the following line if needed)
 # logger.add(sys.stderr, level="DEBUG")
 
 
+# Peak traced memory seen by each open profile_stage, innermost last
+_memory_peaks: List[int] = []
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Return the peak resident set size of this process so far, in MB (None on Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """Return the resident set size of this process now, in MB (None where /proc is not available)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _rows(value: Any) -> Optional[int]:
+    """Return the row count of a DataFrame-like value, or None."""
+    shape = getattr(value, "shape", None)
+    return int(shape[0]) if shape else None
+
+
+@contextlib.contextmanager
+def profile_stage(stage: str, rows_in: Optional[int] = None, trace_memory: bool = False,
+                  profile_file: Optional[pathlib.Path] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Time a pipeline stage and append its record to the profile file.
+
+    The yielded record can be updated inside the block, e.g. to set rows_out.
+    The stage's RSS delta (memory it leaves resident, negative if it frees more
+    than it allocates) and the process's peak RSS are always recorded; both come
+    from the operating system and cost nothing. With trace_memory, the stage's own
+    peak is measured with tracemalloc (numpy and pandas buffers included);
+    stages can be nested and each reports its own peak.
+
+    Args:
+        stage (str): Stage name, e.g. "prepare_sales_data.remove_duplicates".
+        rows_in (int, optional): Rows going into the stage.
+        trace_memory (bool): Record the peak memory delta with tracemalloc (slows the stage down).
+        profile_file (pathlib.Path, optional): JSON lines file; defaults to PROFILE_FILE.
+
+    Yields:
+        Dict[str, Any]: The record that will be written.
+    """
+    record: Dict[str, Any] = {"stage": stage, "rows_in": rows_in, "rows_out": None}
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if _memory_peaks:
+            # Keep the enclosing stage's peak before resetting it for this one
+            _memory_peaks[-1] = max(_memory_peaks[-1], peak)
+        tracemalloc.reset_peak()
+        _memory_peaks.append(current)
+    start_rss = current_rss_mb()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield record
+    finally:
+        record["wall_seconds"] = round(time.perf_counter() - start_wall, 6)
+        record["cpu_seconds"] = round(time.process_time() - start_cpu, 6)
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(_memory_peaks.pop(), peak)
+            record["peak_memory_delta_mb"] = round((peak - current) / (1024 * 1024), 3)
+            if _memory_peaks:
+                _memory_peaks[-1] = max(_memory_peaks[-1], peak)
+            if started_tracing:
+                tracemalloc.stop()
+        end_rss = current_rss_mb()
+        record["rss_delta_mb"] = None if start_rss is None or end_rss is None else round(end_rss - start_rss, 3)
+        record["peak_rss_mb"] = peak_rss_mb()
+        record["pid"] = os.getpid()
+        record["timestamp"] = datetime.now().isoformat(timespec="seconds")
+        logger.info(f"PROFILE {stage}: {record}")
+        with open(profile_file or PROFILE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def profiled(stage: Optional[str] = None, trace_memory: bool = False) -> Callable:
+    """
+    Decorator that profiles every call of a function with profile_stage.
+
+    Rows in are taken from the first DataFrame argument and rows out from a
+    DataFrame return value (or an int return value, e.g. rows inserted).
+
+    Args:
+        stage (str, optional): Stage name; defaults to "<file name>.<function>",
+            which stays the same when a script runs as __main__.
+        trace_memory (bool): Record the peak memory delta with tracemalloc (slows the function down).
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(func: Callable) -> Callable:
+        name = stage or f"{pathlib.Path(func.__code__.co_filename).stem}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows_in = next((_rows(arg) for arg in list(args) + list(kwargs.values()) if _rows(arg) is not None), None)
+            with profile_stage(name, rows_in=rows_in, trace_memory=trace_memory) as record:
+                result = func(*args, **kwargs)
+                record["rows_out"] = result if isinstance(result, int) and not isinstance(result, bool) else _rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def summarize_profile(profile_file: Optional[pathlib.Path] = None, since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Total the profile records per stage, slowest stage first.
+
+    Args:
+        profile_file (pathlib.Path, optional): JSON lines file; defaults to PROFILE_FILE.
+        since (str, optional): Only records with an ISO timestamp >= since (e.g. the start of a run).
+
+    Returns:
+        List[Dict[str, Any]]: One entry per stage with calls, wall/CPU seconds,
+            rows in/out, the largest RSS delta and the largest peak memory delta.
+    """
+    profile_file = profile_file or PROFILE_FILE
+    if not profile_file.exists():
+        return []
+    stages: Dict[str, Dict[str, Any]] = {}
+    with open(profile_file, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if since and record["timestamp"] < since:
+                continue
+            total = stages.setdefault(record["stage"], {
+                "stage": record["stage"], "calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                "rows_in": 0, "rows_out": 0, "max_rss_delta_mb": 0.0, "max_peak_memory_delta_mb": 0.0,
+            })
+            total["calls"] += 1
+            total["wall_seconds"] += record["wall_seconds"]
+            total["cpu_seconds"] += record["cpu_seconds"]
+            total["rows_in"] += record.get("rows_in") or 0
+            total["rows_out"] += record.get("rows_out") or 0
+            total["max_rss_delta_mb"] = max(total["max_rss_delta_mb"], record.get("rss_delta_mb") or 0.0)
+            total["max_peak_memory_delta_mb"] = max(total["max_peak_memory_delta_mb"], record.get("peak_memory_delta_mb") or 0.0)
+    return sorted(stages.values(), key=lambda total: total["wall_seconds"], reverse=True)
+
+
 def log_example() -> None:
     """Example logging function to demonstrate logging behavior."""
     logger.info("This is an example info message.")
@@ -42,6 +236,10 @@ def main() -> None:
     
     # Call the example logging function
     log_example()
+
+    # Summarize the stage profiles recorded so far
+    for total in summarize_profile():
+        logger.info(f"PROFILE SUMMARY {total}")
     
     logger.info(f"View the log output at {LOG_FILE}")
     logger.info(f"EXITING {CURRENT_SCRIPT}.py.")
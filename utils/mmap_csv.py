@@ -0,0 +1,268 @@
+"""
+utils/mmap_csv.py
+
+Memory-mapped CSV reading with a row (line) offset index.
+
+MappedCSV maps the file into memory instead of reading it through a Python
+file buffer. The operating system pages the file in on demand from the page
+cache, so several jobs reading the same raw file one after another (or at the
+same time) share one cached copy instead of each copying it into their own
+buffers.
+
+The first time a row range is needed, the row start offsets are indexed in a
+single vectorized pass over the mapped bytes (about 8 bytes of index per row).
+Newlines inside quoted fields do not end a row. With the index:
+- any row range is a zero-copy memoryview of the mapped file
+- a range is parsed with pd.read_csv, which copies only into its own parse buffer
+- the file can be split into row-aligned ranges of about equal size, for
+  parsing disjoint ranges in parallel
+
+Reading the whole file needs no index.
+
+This module provides:
+- MappedCSV: mapped file, row index, zero-copy row slices and parsing of row ranges
+
+Example:
+    from utils.mmap_csv import MappedCSV
+    with MappedCSV(raw_path) as csv:
+        df = csv.read()                            # whole file
+        tail = csv.read(csv.n_rows - 1000)         # last 1000 rows, no scan of the rest
+        ranges = csv.split(8)                      # 8 row ranges of about equal bytes
+
+"""
+
+# Imports from Python Standard Library
+import io
+import mmap
+import pathlib
+from typing import Any, Iterator, List, Optional, Tuple
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Define global constants
+INDEX_BLOCK_SIZE: int = 16 * 1024**2  # Bytes scanned at a time while indexing rows
+NEWLINE: int = ord("\n")
+QUOTE: int = ord('"')
+
+
+class _BufferReader(io.RawIOBase):
+    """Read-only file object over a memoryview; reads copy straight into the caller's buffer."""
+
+    def __init__(self, buffer: memoryview):
+        self._buffer = buffer
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        size = min(len(target), len(self._buffer) - self._position)
+        target[:size] = self._buffer[self._position:self._position + size]
+        self._position += size
+        return size
+
+
+class MappedCSV:
+    """
+    A CSV file mapped into memory, with a lazily built row offset index.
+
+    Rows are numbered from 0 after the header line. Row ranges are
+    half-open: rows start_row .. stop_row - 1. A blank line counts as a row
+    for indexing (pd.read_csv skips it when parsing).
+
+    Memoryviews returned by slice() must be released before close().
+    """
+
+    def __init__(self, file_path: pathlib.Path):
+        """
+        Parameters:
+            file_path (pathlib.Path): CSV file with a header line.
+        """
+        self.file_path = pathlib.Path(file_path)
+        self._file = open(self.file_path, "rb")
+        self._mmap: Optional[mmap.mmap] = None
+        if self.file_path.stat().st_size > 0:  # an empty file cannot be mapped
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buffer = memoryview(self._mmap)
+        else:
+            self._buffer = memoryview(b"")
+        self._offsets: Optional[np.ndarray] = None
+        self._columns: Optional[List[str]] = None
+
+    def __enter__(self) -> "MappedCSV":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap and close the file."""
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _advise_sequential(self) -> None:
+        """Tell the OS the next access is a front-to-back scan (read-ahead), where supported."""
+        if self._mmap is not None and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+
+    @property
+    def line_offsets(self) -> np.ndarray:
+        """
+        Byte offsets of the header and every row, then the end of the last row.
+
+        Built on first use, in one pass over the file.
+        """
+        if self._offsets is None:
+            self._advise_sequential()
+            data = np.frombuffer(self._buffer, dtype=np.uint8)  # zero-copy view of the mapped bytes
+            row_ends = []
+            quotes_before = 0
+            for start in range(0, len(data), INDEX_BLOCK_SIZE):
+                block = data[start:start + INDEX_BLOCK_SIZE]
+                newlines = np.flatnonzero(block == NEWLINE)
+                quotes = np.flatnonzero(block == QUOTE)
+                if len(quotes) or quotes_before % 2:
+                    # A newline ends a row only outside quotes: after an even number of quote characters
+                    outside = (quotes_before + np.searchsorted(quotes, newlines)) % 2 == 0
+                    newlines = newlines[outside]
+                    quotes_before += len(quotes)
+                row_ends.append(newlines + start + 1)
+            del data
+            offsets = np.concatenate([np.zeros(1, dtype=np.int64), *row_ends]).astype(np.int64)
+            if offsets[-1] != len(self._buffer):  # last row without a trailing newline
+                offsets = np.append(offsets, len(self._buffer))
+            self._offsets = offsets
+        return self._offsets
+
+    @property
+    def n_rows(self) -> int:
+        """Number of rows after the header line."""
+        return max(len(self.line_offsets) - 2, 0)
+
+    @property
+    def columns(self) -> List[str]:
+        """Column names from the header line."""
+        if self._columns is None:
+            header_end = self._mmap.find(b"\n") if self._mmap is not None else -1
+            header = self._buffer[:header_end + 1 if header_end >= 0 else len(self._buffer)]
+            self._columns = pd.read_csv(_BufferReader(header), nrows=0).columns.tolist()
+        return self._columns
+
+    def byte_range(self, start_row: int = 0, stop_row: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Return the (start, stop) byte offsets of a row range.
+
+        Parameters:
+            start_row (int): First row.
+            stop_row (int, optional): Row after the last one; the end of the file by default.
+
+        Returns:
+            Tuple[int, int]: Byte offsets, stop exclusive.
+
+        Raises:
+            ValueError: If the range is outside the file.
+        """
+        stop_row = self.n_rows if stop_row is None else stop_row
+        if not 0 <= start_row <= stop_row <= self.n_rows:
+            raise ValueError(f"Row range [{start_row}, {stop_row}) is outside the {self.n_rows} rows of {self.file_path}.")
+        offsets = self.line_offsets
+        return int(offsets[start_row + 1]), int(offsets[stop_row + 1])
+
+    def slice(self, start_row: int = 0, stop_row: Optional[int] = None) -> memoryview:
+        """
+        Return the bytes of a row range as a zero-copy memoryview of the mapped file.
+
+        Parameters:
+            start_row (int): First row.
+            stop_row (int, optional): Row after the last one; the end of the file by default.
+
+        Returns:
+            memoryview: The rows' bytes (no header). Release it before close().
+        """
+        start, stop = self.byte_range(start_row, stop_row)
+        return self._buffer[start:stop]
+
+    def read(self, start_row: int = 0, stop_row: Optional[int] = None, **read_csv_kwargs: Any) -> pd.DataFrame:
+        """
+        Parse a row range (the whole file by default) with pd.read_csv.
+
+        Parsing a range only touches the pages of that range. pandas infers
+        column types from the range alone; pass dtype= (e.g. from
+        utils.streaming.infer_csv_dtypes) for the same types as a whole-file read.
+
+        Parameters:
+            start_row (int): First row.
+            stop_row (int, optional): Row after the last one; the end of the file by default.
+            **read_csv_kwargs: Passed to pd.read_csv (dtype, usecols, ...).
+
+        Returns:
+            pd.DataFrame: The parsed rows, with the file's column names.
+        """
+        if start_row == 0 and stop_row is None:
+            self._advise_sequential()
+            return pd.read_csv(_BufferReader(self._buffer), **read_csv_kwargs)
+        return self.read_bytes(*self.byte_range(start_row, stop_row), **read_csv_kwargs)
+
+    def read_bytes(self, start: int, stop: int, **read_csv_kwargs: Any) -> pd.DataFrame:
+        """
+        Parse the rows in a byte range, e.g. from byte_range() in another process.
+
+        Needs no row index, so a worker given row-aligned byte offsets can
+        parse its range without scanning the file.
+
+        Parameters:
+            start (int): Offset of the first row.
+            stop (int): Offset after the last row.
+            **read_csv_kwargs: Passed to pd.read_csv (dtype, usecols, ...).
+
+        Returns:
+            pd.DataFrame: The parsed rows, with the file's column names.
+        """
+        with self._buffer[start:stop] as rows:
+            if len(rows) == 0:
+                return pd.read_csv(_BufferReader(self._buffer), nrows=0, **read_csv_kwargs)
+            return pd.read_csv(_BufferReader(rows), header=None, names=self.columns, **read_csv_kwargs)
+
+    def split(self, n_parts: int) -> List[Tuple[int, int]]:
+        """
+        Split the rows into up to n_parts contiguous row ranges of about equal byte size.
+
+        Parameters:
+            n_parts (int): Number of ranges wanted.
+
+        Returns:
+            List[Tuple[int, int]]: (start_row, stop_row) ranges, in order, covering every row.
+
+        Raises:
+            ValueError: If n_parts is not a positive integer.
+        """
+        if n_parts <= 0:
+            raise ValueError(f"n_parts must be a positive integer, got {n_parts}.")
+        row_offsets = self.line_offsets[1:]
+        targets = np.linspace(row_offsets[0], row_offsets[-1], n_parts + 1)[1:-1] if self.n_rows else []
+        bounds = np.unique(np.concatenate([[0], np.searchsorted(row_offsets, targets), [self.n_rows]]))
+        return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def iter_chunks(self, chunk_size: int, **read_csv_kwargs: Any) -> Iterator[pd.DataFrame]:
+        """
+        Parse the file as consecutive row ranges of at most chunk_size rows.
+
+        Parameters:
+            chunk_size (int): Maximum number of rows per chunk.
+            **read_csv_kwargs: Passed to pd.read_csv (dtype, usecols, ...).
+
+        Returns:
+            Iterator[pd.DataFrame]: The chunks, in file order.
+
+        Raises:
+            ValueError: If chunk_size is not a positive integer.
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be a positive integer, got {chunk_size}.")
+        for start_row in range(0, self.n_rows, chunk_size):
+            yield self.read(start_row, min(start_row + chunk_size, self.n_rows), **read_csv_kwargs)
@@ -0,0 +1,180 @@
+"""
+utils/olap_cube.py
+
+Pre-aggregated OLAP cube stored in the data warehouse (smart_sales.db).
+
+The ETL keeps a sale_cube table with one row per
+(category, region, store_id, month, payment_type) holding the sum, count and
+sum of squares of sale_amount. Roll-ups and slices over any subset of those
+dimensions (including averages and standard deviations) are answered from the
+cube, so reports read a few thousand rows instead of scanning the sale table.
+
+This module provides:
+- create_cube_table: create the sale_cube table
+- refresh_sale_cube: add sales (all, or only new ones) to the cube
+- query_cube: roll up / slice the cube
+
+Example:
+    from utils.olap_cube import query_cube
+    cube = query_cube(conn, group_by=["category", "month"], filters={"category": "Electronics"})
+
+"""
+
+# Imports from Python Standard Library
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Imports from local modules
+from utils.query_cache import QueryCache
+from utils.warehouse import read_sql
+
+# Define global constants
+CUBE_TABLE: str = "sale_cube"
+CUBE_DIMENSIONS: List[str] = ["category", "region", "store_id", "month", "payment_type"]
+SALE_ID_BATCH: int = 500  # sale ids per refresh statement, well below SQLite's bound-parameter limit
+
+# SQL expression for the YYYYMM month key of a YYYYMMDD date key. Written without
+# integer "/", which DuckDB evaluates as float division (see utils/warehouse.py)
+MONTH_KEY_SQL: str = "CAST((s.date_key - s.date_key % 100) / 100 AS INTEGER)"
+
+# SQL expression for the YYYY-MM month of a YYYYMM month key
+MONTH_LABEL_SQL: str = (
+    "CASE WHEN g.month_key IS NOT NULL THEN printf('%04d-%02d', "
+    "CAST((g.month_key - g.month_key % 100) / 100 AS INTEGER), g.month_key % 100) END"
+)
+
+
+def create_cube_table(cursor: sqlite3.Cursor) -> None:
+    """Create the sale_cube table if it does not exist."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CUBE_TABLE} (
+            category TEXT NOT NULL,
+            region TEXT NOT NULL,
+            store_id TEXT NOT NULL,
+            month TEXT NOT NULL,
+            payment_type TEXT NOT NULL,
+            total_sales DOUBLE,
+            transactions BIGINT,
+            sum_squares DOUBLE,
+            PRIMARY KEY (category, region, store_id, month, payment_type)
+        )
+    """)
+
+
+def refresh_sale_cube(cursor: sqlite3.Cursor, after_sale_id: int = 0, sale_ids: Sequence[int] = ()) -> None:
+    """
+    Add sales with sale_id > after_sale_id, and the listed sales, to the cube.
+
+    Use after_sale_id=0 on an empty cube (full load), or the previous sale
+    high-water mark for an incremental load so only the new sales are
+    aggregated and merged into the existing cells. Changes to existing
+    dimension rows (e.g. a customer moving region) are picked up by the
+    next full load, which rebuilds the cube.
+
+    Parameters:
+        cursor (sqlite3.Cursor): Cursor on the warehouse, inside the load transaction.
+        after_sale_id (int): Only sales above this id are added.
+        sale_ids (list, optional): Sales at or below after_sale_id that were loaded
+            late (e.g. retried from quarantine), added as well.
+    """
+    _merge_sales_into_cube(cursor, "s.sale_id > ?", [after_sale_id])
+    sale_ids = [int(sale_id) for sale_id in sale_ids]
+    for start in range(0, len(sale_ids), SALE_ID_BATCH):
+        batch = sale_ids[start:start + SALE_ID_BATCH]
+        _merge_sales_into_cube(cursor, f"s.sale_id IN ({', '.join('?' * len(batch))})", batch)
+
+
+def _merge_sales_into_cube(cursor: sqlite3.Cursor, condition: str, params: List[int]) -> None:
+    """Aggregate the sales matching condition and add them to the cube cells."""
+    cursor.execute(f"""
+        INSERT INTO {CUBE_TABLE} (category, region, store_id, month, payment_type, total_sales, transactions, sum_squares)
+        SELECT
+            COALESCE(cat.category, 'Unknown'),
+            COALESCE(r.region, 'Unknown'),
+            COALESCE(st.store_id, 'Unknown'),
+            COALESCE({MONTH_LABEL_SQL}, 'Unknown'),
+            COALESCE(pt.payment_type, 'Unknown'),
+            SUM(g.total_sales),
+            CAST(SUM(g.transactions) AS BIGINT),
+            SUM(g.sum_squares)
+        FROM (
+            -- Aggregate on the integer keys first; labels are joined to the (few) groups
+            SELECT
+                p.category_key,
+                c.region_key,
+                s.store_key,
+                {MONTH_KEY_SQL} AS month_key,
+                s.payment_type_key,
+                SUM(s.sale_amount) AS total_sales,
+                COUNT(s.sale_amount) AS transactions,
+                SUM(s.sale_amount * s.sale_amount) AS sum_squares
+            FROM sale_fact s
+            LEFT JOIN product p ON s.product_id = p.product_id
+            LEFT JOIN customer c ON s.customer_id = c.customer_id
+            WHERE {condition}
+            GROUP BY 1, 2, 3, 4, 5
+        ) g
+        LEFT JOIN category cat ON g.category_key = cat.category_key
+        LEFT JOIN region r ON g.region_key = r.region_key
+        LEFT JOIN store st ON g.store_key = st.store_key
+        LEFT JOIN payment_type pt ON g.payment_type_key = pt.payment_type_key
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (category, region, store_id, month, payment_type) DO UPDATE SET
+            total_sales = total_sales + excluded.total_sales,
+            transactions = transactions + excluded.transactions,
+            sum_squares = sum_squares + excluded.sum_squares
+    """, params)
+
+
+def query_cube(conn: sqlite3.Connection, group_by: List[str], filters: Optional[Dict[str, Any]] = None,
+               query_cache: Optional[QueryCache] = None) -> pd.DataFrame:
+    """
+    Roll up and slice the cube.
+
+    Parameters:
+        conn: Connection to the warehouse (SQLite or DuckDB).
+        group_by (list): Dimensions to keep; every other dimension is rolled up.
+            An empty list gives the grand total.
+        filters (dict, optional): Dimension -> value, or list of values, to slice on.
+        query_cache (QueryCache, optional): Reuse the result until the next warehouse load.
+
+    Returns:
+        pd.DataFrame: One row per group with total_sales, transactions,
+            average_sale and std_sale (sample standard deviation).
+
+    Raises:
+        ValueError: If a dimension is not part of the cube.
+    """
+    filters = filters or {}
+    for dimension in list(group_by) + list(filters):
+        if dimension not in CUBE_DIMENSIONS:
+            raise ValueError(f"'{dimension}' is not a cube dimension. Choose from {CUBE_DIMENSIONS}.")
+
+    conditions = []
+    params: List[Any] = []
+    for dimension, value in filters.items():
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        conditions.append(f"{dimension} IN ({', '.join('?' for _ in values)})")
+        params.extend(values)
+
+    select_columns = ", ".join(list(group_by) + [
+        "SUM(total_sales) AS total_sales",
+        "CAST(SUM(transactions) AS BIGINT) AS transactions",  # DuckDB sums BIGINT to HUGEINT, read as float
+        "SUM(sum_squares) AS sum_squares",
+    ])
+    sql = f"SELECT {select_columns} FROM {CUBE_TABLE}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if group_by:
+        sql += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+
+    cube = query_cache.read_sql(sql, params) if query_cache is not None else read_sql(conn, sql, params=params)
+    count = cube["transactions"].astype("float64")
+    cube["average_sale"] = cube["total_sales"] / count
+    variance = (cube["sum_squares"] - count * cube["average_sale"] ** 2) / (count - 1)
+    cube["std_sale"] = np.sqrt(variance.clip(lower=0))
+    return cube.drop(columns=["sum_squares"])
@@ -0,0 +1,250 @@
+"""
+utils/outliers.py
+
+Vectorized IQR outlier bounds and filtering for many columns at once.
+
+The quartiles of every numeric column come from one DataFrame.quantile call,
+and rows are filtered with one combined mask instead of one filtered copy of
+the frame per column. Bounds can be saved per dataset and reused by later
+runs, so the statistics are not recomputed every night. For chunked (streaming)
+inputs, StreamingQuantiles keeps a fixed-size uniform row sample and gives
+approximate quartiles without loading the whole file.
+
+By default missing values are not treated as outliers; handle them separately.
+
+This module provides:
+- iqr_bounds: lower/upper bounds (Q1 - k*IQR, Q3 + k*IQR) for many columns
+- outlier_mask: one boolean keep-mask for all bounded columns
+- save_bounds / load_bounds: persist bounds as JSON
+- iqr_bounds_cached: load saved bounds, or compute and save them
+- StreamingQuantiles: approximate quantiles over a stream of chunks
+
+Example:
+    from utils.outliers import iqr_bounds_cached, outlier_mask
+    bounds = iqr_bounds_cached(df, PREPARED_DATA_DIR / "products_outlier_bounds.json")
+    df = df[outlier_mask(df, bounds)]
+
+"""
+
+# Imports from Python Standard Library
+import json
+import pathlib
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Define global constants
+DEFAULT_IQR_MULTIPLIER: float = 1.5
+DEFAULT_SAMPLE_SIZE: int = 100_000  # Rows kept by StreamingQuantiles (rank error around 1/sqrt(n))
+
+Bounds = Dict[str, Tuple[float, float]]
+
+
+def numeric_columns(df: pd.DataFrame) -> List[str]:
+    """Return the names of the numeric (non-boolean) columns."""
+    return [column for column, dtype in df.dtypes.items()
+            if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)]
+
+
+def bounds_from_quartiles(quartiles: pd.DataFrame, k: float = DEFAULT_IQR_MULTIPLIER) -> Bounds:
+    """
+    Turn a quartile table (index 0.25 and 0.75, one column per data column) into IQR bounds.
+
+    Args:
+        quartiles (pd.DataFrame): Result of DataFrame.quantile([0.25, 0.75]).
+        k (float): IQR multiplier.
+
+    Returns:
+        Bounds: Column -> (lower bound, upper bound).
+    """
+    q1 = quartiles.loc[0.25]
+    q3 = quartiles.loc[0.75]
+    iqr = q3 - q1
+    lower = q1 - k * iqr
+    upper = q3 + k * iqr
+    return {column: (float(lower[column]), float(upper[column])) for column in quartiles.columns}
+
+
+def iqr_bounds(df: pd.DataFrame, columns: Optional[Sequence[str]] = None, k: float = DEFAULT_IQR_MULTIPLIER) -> Bounds:
+    """
+    Compute IQR outlier bounds for several columns in one vectorized pass.
+
+    Args:
+        df (pd.DataFrame): Data to compute the quartiles on.
+        columns (list, optional): Columns to bound; every numeric column by default.
+        k (float): IQR multiplier (1.5 is the usual Tukey fence).
+
+    Returns:
+        Bounds: Column -> (lower bound, upper bound).
+
+    Raises:
+        ValueError: If a column is missing or not numeric.
+    """
+    columns = numeric_columns(df) if columns is None else list(columns)
+    not_numeric = [column for column in columns if column not in numeric_columns(df)]
+    if not_numeric:
+        raise ValueError(f"Columns {not_numeric} are not numeric columns of the DataFrame.")
+    if not columns:
+        return {}
+    return bounds_from_quartiles(df[columns].quantile([0.25, 0.75]), k)
+
+
+def outlier_mask(df: pd.DataFrame, bounds: Bounds, keep_missing: bool = True) -> np.ndarray:
+    """
+    Build one keep-mask for all bounded columns.
+
+    Args:
+        df (pd.DataFrame): Data to filter.
+        bounds (Bounds): Column -> (lower bound, upper bound), inclusive; a NaN bound does not bound.
+        keep_missing (bool): Keep rows with a missing value in a bounded column.
+
+    Returns:
+        np.ndarray: Boolean array, True for rows inside the bounds of every
+            column (or missing in that column, if keep_missing).
+
+    Raises:
+        ValueError: If a bounded column is not in the DataFrame.
+    """
+    missing = [column for column in bounds if column not in df.columns]
+    if missing:
+        raise ValueError(f"Columns {missing} not found in the DataFrame.")
+    if not bounds:
+        return np.ones(len(df), dtype=bool)
+    columns = list(bounds)
+    values = df[columns].to_numpy(dtype="float64", na_value=np.nan)
+    # A missing bound (quartiles of a column with no values) does not bound the column
+    lower = np.nan_to_num(np.array([bounds[column][0] for column in columns], dtype="float64"), nan=-np.inf)
+    upper = np.nan_to_num(np.array([bounds[column][1] for column in columns], dtype="float64"), nan=np.inf)
+    inside = (values >= lower) & (values <= upper)
+    if keep_missing:
+        inside |= np.isnan(values)
+    return inside.all(axis=1)
+
+
+def save_bounds(bounds: Bounds, file_path: pathlib.Path, k: float = DEFAULT_IQR_MULTIPLIER) -> None:
+    """Save bounds (and the multiplier they were computed with) as JSON."""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"k": k, "bounds": {column: list(bound) for column, bound in bounds.items()}}
+    file_path.write_text(json.dumps(payload, indent=2))
+
+
+def load_bounds(file_path: pathlib.Path) -> Tuple[Bounds, float]:
+    """Load bounds saved by save_bounds; returns (bounds, k)."""
+    payload = json.loads(file_path.read_text())
+    bounds = {column: (float(lower), float(upper)) for column, (lower, upper) in payload["bounds"].items()}
+    return bounds, float(payload["k"])
+
+
+def iqr_bounds_cached(df: pd.DataFrame, bounds_file: pathlib.Path, columns: Optional[Sequence[str]] = None,
+                      k: float = DEFAULT_IQR_MULTIPLIER, refresh: bool = False) -> Bounds:
+    """
+    Reuse the bounds saved for a dataset, or compute and save them.
+
+    Saved bounds are reused when they were computed with the same k and cover
+    every requested column; otherwise they are recomputed from df.
+
+    Args:
+        df (pd.DataFrame): Data to compute the quartiles on, if needed.
+        bounds_file (pathlib.Path): JSON file for this dataset's bounds.
+        columns (list, optional): Columns to bound; every numeric column by default.
+        k (float): IQR multiplier.
+        refresh (bool): Always recompute (e.g. after a large change in the data).
+
+    Returns:
+        Bounds: Column -> (lower bound, upper bound).
+    """
+    columns = numeric_columns(df) if columns is None else list(columns)
+    if not refresh and bounds_file.exists():
+        bounds, saved_k = load_bounds(bounds_file)
+        if saved_k == k and all(column in bounds for column in columns):
+            return {column: bounds[column] for column in columns}
+    bounds = iqr_bounds(df, columns, k)
+    save_bounds(bounds, bounds_file, k)
+    return bounds
+
+
+class StreamingQuantiles:
+    """
+    Approximate quantiles over a stream of chunks, in bounded memory.
+
+    Every row gets a random key, and the sample_size rows with the smallest
+    keys seen so far are kept (a uniform bottom-k sample of the whole stream).
+    Quantiles of the sample estimate the quantiles of the stream with a rank
+    error of roughly 1/sqrt(sample_size); inputs no larger than sample_size
+    give exact results.
+
+    Example:
+        sketch = StreamingQuantiles(["SaleAmount", "DiscountPercent"])
+        for chunk in read_csv_in_chunks(raw_path):
+            sketch.update(chunk)
+        bounds = sketch.iqr_bounds()
+    """
+
+    def __init__(self, columns: Optional[Sequence[str]] = None, sample_size: int = DEFAULT_SAMPLE_SIZE, seed: int = 0):
+        """
+        Parameters:
+            columns (list, optional): Columns to track; every numeric column of the first chunk by default.
+            sample_size (int): Rows kept in the sample.
+            seed (int): Random seed, so results are reproducible.
+        """
+        if sample_size <= 0:
+            raise ValueError(f"sample_size must be a positive integer, got {sample_size}.")
+        self.columns = list(columns) if columns is not None else None
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.sample = np.empty((0, len(self.columns) if self.columns else 0))
+        self.rows_seen = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Add a chunk to the sample.
+
+        Parameters:
+            chunk (pd.DataFrame): Next chunk of the stream.
+        """
+        if self.columns is None:
+            self.columns = numeric_columns(chunk)
+            self.sample = np.empty((0, len(self.columns)))
+        values = chunk[self.columns].to_numpy(dtype="float64", na_value=np.nan)
+        keys = self.rng.random(len(values))
+        self.keys = np.concatenate([self.keys, keys])
+        self.sample = np.concatenate([self.sample, values])
+        self.rows_seen += len(values)
+        if len(self.keys) > self.sample_size:
+            keep = np.argpartition(self.keys, self.sample_size)[:self.sample_size]
+            self.keys = self.keys[keep]
+            self.sample = self.sample[keep]
+
+    def quantiles(self, q: Sequence[float]) -> pd.DataFrame:
+        """
+        Estimate quantiles of every tracked column.
+
+        Parameters:
+            q (list): Quantiles to estimate, between 0 and 1.
+
+        Returns:
+            pd.DataFrame: One row per quantile (index q), one column per tracked column.
+        """
+        q = list(q)
+        if len(self.sample) == 0:
+            return pd.DataFrame(np.nan, index=q, columns=self.columns or [])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # a column with no values gives NaN quantiles
+            estimates = np.nanquantile(self.sample, q, axis=0)
+        return pd.DataFrame(estimates, index=q, columns=self.columns)
+
+    def iqr_bounds(self, k: float = DEFAULT_IQR_MULTIPLIER) -> Bounds:
+        """
+        Estimate IQR outlier bounds for every tracked column.
+
+        Parameters:
+            k (float): IQR multiplier.
+
+        Returns:
+            Bounds: Column -> (lower bound, upper bound).
+        """
+        return bounds_from_quartiles(self.quantiles([0.25, 0.75]), k)
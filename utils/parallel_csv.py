@@ -0,0 +1,164 @@
+"""
+utils/parallel_csv.py
+
+Parse one large CSV file on several cores.
+
+pd.read_csv parses on a single core. read_csv_parallel splits the file into
+row-aligned byte ranges (see utils.mmap_csv), parses the ranges in a process
+pool, runs the row-by-row cleaning stages on each range in the same worker,
+and concatenates the results in file order.
+
+Workers map the file themselves, so no raw bytes are sent to them: each gets
+only its byte offsets and parses from the shared page cache.
+
+The result is identical to a serial pd.read_csv followed by the stages (for
+a column pandas warns has mixed types, identical to low_memory=False: every
+value as text):
+- pandas infers types per range, so a column can be int64 in one range and
+  float64 (missing values) or str (a stray text value) in another. The types
+  are unified as for a whole-file read (see utils.streaming.unify_dtypes), and
+  only the ranges whose types differ are parsed again with the unified types.
+- the ranges are concatenated in file order, with a fresh RangeIndex.
+
+Stages must be row-by-row (e.g. renaming columns, normalizing values): a
+stage that looks across rows (duplicates, outlier bounds) must run after the
+ranges are combined. Stages are module-level functions, or functools.partial
+objects binding keyword arguments of one (e.g. a date format detected once
+in the parent, so every range parses dates the same way); workers load the
+module of each stage (a script is loaded from its file path), so scripts
+loaded by path work too.
+
+This module provides:
+- read_csv_parallel: parallel parse of one CSV, with optional per-range stages
+
+Example:
+    from utils.parallel_csv import read_csv_parallel
+    df = read_csv_parallel(raw_path, stages=[clean_column_names, normalize_dates], max_workers=8)
+
+"""
+
+# Imports from Python Standard Library
+import functools
+import importlib
+import importlib.util
+import inspect
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Imports from external packages
+import pandas as pd
+
+# Imports from local modules
+from utils.logger import logger
+from utils.mmap_csv import MappedCSV
+from utils.streaming import unify_dtypes
+
+# Define global constants
+PARTS_PER_WORKER: int = 2  # More ranges than workers evens out uneven parse times
+MIN_PART_BYTES: int = 4 * 1024**2  # Smaller ranges cost more in process overhead than they save
+
+StageRef = Tuple[str, str, str, Dict[str, Any]]  # (module name, module file, function name, keyword arguments)
+
+_loaded_modules: Dict[str, Any] = {}  # Modules loaded from a file path, per worker process
+
+
+def _stage_ref(stage: Callable[[pd.DataFrame], pd.DataFrame]) -> StageRef:
+    """Describe a module-level function (or a partial binding its keyword arguments) so a worker process can load it."""
+    keywords: Dict[str, Any] = {}
+    if isinstance(stage, functools.partial):
+        if stage.args:
+            raise ValueError(f"Stage {stage.func.__name__}: bind keyword arguments only, got positional {stage.args}.")
+        stage, keywords = stage.func, dict(stage.keywords)
+    return stage.__module__, inspect.getfile(inspect.unwrap(stage)), stage.__name__, keywords  # unwrap: see @profiled
+
+
+def _load_stage(ref: StageRef) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """Load a stage in a worker: import its module, or load it from its file (scripts)."""
+    module_name, module_file, function_name, keywords = ref
+    module = None
+    if module_name != "__main__":
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            module = None
+    if module is None:
+        module = _loaded_modules.get(module_file)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(pathlib.Path(module_file).stem, module_file)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _loaded_modules[module_file] = module
+    function = getattr(module, function_name)
+    return functools.partial(function, **keywords) if keywords else function
+
+
+def _parse_part(file_path: pathlib.Path, start: int, stop: int, stage_refs: Sequence[StageRef],
+                read_csv_kwargs: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """Worker: parse one byte range and run the stages on it; returns (result, parsed dtypes)."""
+    with MappedCSV(file_path) as csv:
+        df = csv.read_bytes(start, stop, **read_csv_kwargs)
+    parsed_dtypes = {column: str(dtype) for column, dtype in df.dtypes.items()}
+    for ref in stage_refs:
+        df = _load_stage(ref)(df)
+    return df, parsed_dtypes
+
+
+def read_csv_parallel(file_path: pathlib.Path, stages: Sequence[Callable[[pd.DataFrame], pd.DataFrame]] = (),
+                      max_workers: Optional[int] = None, **read_csv_kwargs: Any) -> pd.DataFrame:
+    """
+    Parse a CSV file on several cores, running row-by-row stages on each range.
+
+    Args:
+        file_path (pathlib.Path): CSV file with a header line.
+        stages (list, optional): Module-level functions df -> df (or partials
+            binding their keyword arguments), applied in order to every parsed range.
+        max_workers (int, optional): Worker processes; the number of CPUs by default.
+            Small files and max_workers=1 are parsed in this process.
+        **read_csv_kwargs: Passed to pd.read_csv (usecols, dtype as a column -> dtype dict, ...).
+
+    Returns:
+        pd.DataFrame: Same as pd.read_csv(file_path, **read_csv_kwargs) followed
+            by the stages, in file order.
+
+    Raises:
+        ValueError: If max_workers is not a positive integer.
+    """
+    max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+    if max_workers <= 0:
+        raise ValueError(f"max_workers must be a positive integer, got {max_workers}.")
+
+    with MappedCSV(file_path) as csv:
+        n_parts = min(max_workers * PARTS_PER_WORKER, max(os.path.getsize(file_path) // MIN_PART_BYTES, 1))
+        if max_workers == 1 or n_parts == 1:
+            df = csv.read(**read_csv_kwargs)
+            for stage in stages:
+                df = stage(df)
+            return df
+        byte_ranges = [csv.byte_range(start_row, stop_row) for start_row, stop_row in csv.split(n_parts)]
+
+    stage_refs = [_stage_ref(stage) for stage in stages]
+    logger.info(f"Parsing {file_path.name} in {len(byte_ranges)} ranges with {max_workers} worker(s)")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_parse_part, file_path, start, stop, stage_refs, read_csv_kwargs)
+                   for start, stop in byte_ranges]
+        results = [future.result() for future in futures]
+
+        # Parse again, with the whole-file types, the ranges whose inferred types differ
+        seen_dtypes: Dict[str, set] = {}
+        for _, parsed_dtypes in results:
+            for column, dtype in parsed_dtypes.items():
+                seen_dtypes.setdefault(column, set()).add(dtype)
+        dtypes = unify_dtypes(seen_dtypes)
+        retry = [i for i, (_, parsed_dtypes) in enumerate(results) if parsed_dtypes != dtypes]
+        if retry:
+            logger.info(f"Parsing {len(retry)} range(s) again with the whole-file column types")
+            retry_kwargs = {**read_csv_kwargs, "dtype": {**dtypes, **read_csv_kwargs.get("dtype", {})}}
+            futures = {i: executor.submit(_parse_part, file_path, *byte_ranges[i], stage_refs, retry_kwargs)
+                       for i in retry}
+            for i, future in futures.items():
+                results[i] = future.result()
+
+    parts: List[pd.DataFrame] = [df for df, _ in results]
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,176 @@
+"""
+utils/prepared_io.py
+
+Read and write the prepared data layer (data/prepared) in a selectable format.
+
+CSV is the default. CSV files get a small <file>.dtypes.json next to them with
+the compact column types (category, small integers; see utils.dtypes), so
+readers get the same types back. CSV files are read memory-mapped (see
+utils.mmap_csv). For large files, the columnar binary formats
+avoid a full text serialize/parse round trip on every hop and keep the column
+types with the data:
+- "parquet": compressed, column-pruned reads (requires pyarrow)
+- "feather": Arrow IPC file, fastest to read and write (requires pyarrow)
+
+This module provides:
+- prepared_path: path of a prepared file in the chosen format
+- write_prepared: write a whole DataFrame
+- PreparedWriter: append chunks (streaming mode)
+- read_prepared: read a prepared file, optionally only some columns
+
+Example:
+    from utils.prepared_io import prepared_path, read_prepared, write_prepared
+    path = prepared_path(PREPARED_DATA_DIR / "sales_prepared.csv", "parquet")
+    write_prepared(df, path)
+    df = read_prepared(path, columns=["SaleDate", "SaleAmount"])
+
+"""
+
+# Imports from Python Standard Library
+import pathlib
+from typing import List, Optional
+
+# Imports from external packages
+import pandas as pd
+
+# Imports from local modules
+from utils.dtypes import dtype_plan_path, load_dtype_plan, save_dtype_plan
+from utils.mmap_csv import MappedCSV
+
+# Define global constants
+DEFAULT_PREPARED_FORMAT: str = "csv"
+PREPARED_FORMAT_SUFFIXES = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".arrow",
+}
+
+
+def _import_pyarrow():
+    """Import pyarrow, which the columnar formats need, with a clear message if it is missing."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("The parquet and feather prepared formats require pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _format_of(file_path: pathlib.Path) -> str:
+    """Return the prepared format of a file from its suffix."""
+    for file_format, suffix in PREPARED_FORMAT_SUFFIXES.items():
+        if file_path.suffix == suffix:
+            return file_format
+    raise ValueError(f"Unsupported prepared file type '{file_path.suffix}' for {file_path}.")
+
+
+def prepared_path(file_path: pathlib.Path, file_format: str = DEFAULT_PREPARED_FORMAT) -> pathlib.Path:
+    """
+    Return the path of a prepared file in the given format.
+
+    Args:
+        file_path (pathlib.Path): Prepared file path, e.g. data/prepared/sales_prepared.csv.
+        file_format (str): One of "csv", "parquet", "feather".
+
+    Returns:
+        pathlib.Path: Same path with the suffix of the chosen format.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if file_format not in PREPARED_FORMAT_SUFFIXES:
+        raise ValueError(f"Unsupported prepared format '{file_format}'. Choose from {list(PREPARED_FORMAT_SUFFIXES)}.")
+    return file_path.with_suffix(PREPARED_FORMAT_SUFFIXES[file_format])
+
+
+def write_prepared(df: pd.DataFrame, file_path: pathlib.Path) -> None:
+    """
+    Write a DataFrame to a prepared file; the format follows the file suffix.
+
+    Args:
+        df (pd.DataFrame): Cleaned DataFrame.
+        file_path (pathlib.Path): Output path (see prepared_path).
+    """
+    with PreparedWriter(file_path) as writer:
+        writer.write(df)
+
+
+def read_prepared(file_path: pathlib.Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a prepared file; the format follows the file suffix.
+
+    Args:
+        file_path (pathlib.Path): Prepared file path.
+        columns (list, optional): Read only these columns. Columnar formats skip
+            the other columns entirely.
+
+    Returns:
+        pd.DataFrame: Loaded DataFrame with the stored column types.
+    """
+    file_format = _format_of(file_path)
+    if file_format == "csv":
+        plan_path = dtype_plan_path(file_path)
+        dtype = load_dtype_plan(plan_path) if plan_path.exists() else None
+        with MappedCSV(file_path) as prepared_csv:
+            return prepared_csv.read(usecols=columns, dtype=dtype)
+    _import_pyarrow()
+    if file_format == "parquet":
+        return pd.read_parquet(file_path, columns=columns)
+    return pd.read_feather(file_path, columns=columns)
+
+
+class PreparedWriter:
+    """
+    Write a prepared file one chunk at a time; the format follows the file suffix.
+
+    The first chunk fixes the schema. Later chunks are cast to it, so all chunks
+    must have the same columns (see utils.streaming.infer_csv_dtypes).
+
+    Example:
+        with PreparedWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, file_path: pathlib.Path):
+        self.file_path = file_path
+        self.file_format = _format_of(file_path)
+        self._schema = None
+        self._writer = None
+
+    def __enter__(self) -> "PreparedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append one chunk to the prepared file.
+
+        Parameters:
+            df (pd.DataFrame): Cleaned chunk.
+        """
+        if self.file_format == "csv":
+            first_chunk = self._schema is None
+            df.to_csv(self.file_path, index=False, mode="w" if first_chunk else "a", header=first_chunk)
+            if first_chunk:
+                save_dtype_plan(df, dtype_plan_path(self.file_path))
+            self._schema = list(df.columns)
+        else:
+            pa = _import_pyarrow()
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.file_format == "parquet":
+                    self._writer = pa.parquet.ParquetWriter(self.file_path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.file_path, self._schema)
+            self._writer.write_table(table)
+
+    def close(self) -> None:
+        """Finish the file. Columnar files are only valid after close()."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
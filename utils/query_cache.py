@@ -0,0 +1,216 @@
+"""
+utils/query_cache.py
+
+Result cache for the analysis queries against the data warehouse (smart_sales.db).
+
+The warehouse only changes when load_data_to_db runs, but the analysis
+scripts (olap_analysis.py, payment_analysis.py) re-run their SQL on every
+invocation. QueryCache keeps query results, keyed on:
+- the normalized SQL (whitespace outside string literals collapsed)
+- the query parameters and pd.read_sql options
+- the warehouse version stamp, which load_data_to_db replaces in the same
+  transaction as the data it loads
+
+A load therefore invalidates every cached result automatically: the next
+query sees a new stamp, drops the old results and runs the SQL again.
+
+Results are kept in memory (least recently used first out, bounded in bytes)
+and, with a cache_dir, on disk (see utils.stage_cache.StageCache), so a
+dashboard refresh in a new process is a file read instead of a query.
+
+This module provides:
+- create_version_table / bump_warehouse_version: the version stamp, for the ETL
+- read_warehouse_version: the current stamp of a warehouse
+- normalize_sql: the SQL text used in cache keys
+- QueryCache: cached pd.read_sql
+
+Example:
+    from utils.query_cache import QueryCache
+    queries = QueryCache(conn, cache_dir=PROJECT_ROOT / "data" / ".cache" / "queries")
+    df = queries.read_sql("SELECT * FROM sale WHERE sale_date >= ?", params=("2025-05-01",))
+
+"""
+
+# Imports from Python Standard Library
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional, Sequence, Tuple
+
+# Imports from external packages
+import pandas as pd
+
+# Imports from local modules
+from utils.logger import logger
+from utils.stage_cache import StageCache
+from utils.warehouse import read_sql
+
+# Define global constants
+VERSION_TABLE: str = "warehouse_version"
+VERSION_FILE: str = "warehouse_version.txt"  # Stamp the on-disk results belong to
+DEFAULT_MAX_MEMORY_BYTES: int = 256 * 1024**2  # 256 MB of results kept in memory
+DEFAULT_MAX_DISK_BYTES: int = 1024**3  # 1 GB of results kept on disk
+
+# A quoted string or identifier (kept as is), or a run of whitespace (collapsed)
+_SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|\s+""")
+
+
+def create_version_table(cursor: sqlite3.Cursor) -> None:
+    """Create the one-row warehouse_version table if it does not exist (it is never dropped)."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version TEXT NOT NULL,
+            loaded_at TEXT
+        )
+    """)
+
+
+def bump_warehouse_version(cursor: sqlite3.Cursor) -> str:
+    """
+    Give the warehouse a new version stamp. Call it inside the load transaction,
+    so the new stamp becomes visible together with the new data.
+
+    The stamp is random rather than a counter, so a warehouse that is deleted
+    and rebuilt never repeats a stamp that cached results were stored under.
+
+    Parameters:
+        cursor (sqlite3.Cursor): Cursor on the warehouse, inside the load transaction.
+
+    Returns:
+        str: The new stamp.
+    """
+    create_version_table(cursor)
+    version = uuid.uuid4().hex
+    loaded_at = datetime.datetime.now().isoformat(timespec="seconds")
+    cursor.execute(f"""
+        INSERT INTO {VERSION_TABLE} (id, version, loaded_at) VALUES (1, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET version = excluded.version, loaded_at = excluded.loaded_at
+    """, (version, loaded_at))
+    return version
+
+
+def read_warehouse_version(conn: sqlite3.Connection) -> str:
+    """
+    Return the version stamp of a warehouse.
+
+    Warehouses loaded before the stamp existed fall back to the size and
+    modification time of the database file.
+
+    Parameters:
+        conn (sqlite3.Connection): Connection to the warehouse.
+
+    Returns:
+        str: The stamp.
+    """
+    row = None
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [VERSION_TABLE]).fetchone():
+        row = conn.execute(f"SELECT version FROM {VERSION_TABLE} WHERE id = 1").fetchone()
+    if row is not None:
+        return row[0]
+    # The main database is listed first (DuckDB names it after the file rather than "main")
+    database_file = conn.execute("PRAGMA database_list").fetchone()[2] or ""
+    if not database_file:  # in-memory database: nothing stable to key on
+        return uuid.uuid4().hex
+    stat = os.stat(database_file)
+    return f"file:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace outside string literals and drop a trailing semicolon."""
+    normalized = _SQL_TOKENS.sub(lambda match: match.group(1) or " ", sql).strip()
+    return normalized.rstrip(";").rstrip()
+
+
+class QueryCache:
+    """
+    Cached pd.read_sql for one warehouse connection.
+
+    Results are returned as copies, so callers can add columns or filter
+    in place without changing the cached result.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, cache_dir: Optional[pathlib.Path] = None,
+                 max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES, max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        """
+        Parameters:
+            conn (sqlite3.Connection): Connection to the warehouse.
+            cache_dir (pathlib.Path, optional): Directory for results kept on disk; memory only by default.
+            max_memory_bytes (int): Memory for results; the least recently used are dropped beyond it.
+            max_disk_bytes (int): Disk space for results; the least recently used are evicted beyond it.
+        """
+        self.conn = conn
+        self.max_memory_bytes = max_memory_bytes
+        self.disk = StageCache(cache_dir, max_disk_bytes) if cache_dir is not None else None
+        self.memory: "OrderedDict[str, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self.memory_bytes = 0
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self) -> str:
+        """Read the warehouse stamp; on a change, drop the results of the previous version."""
+        version = read_warehouse_version(self.conn)
+        if version != self.version:
+            self.memory.clear()
+            self.memory_bytes = 0
+            if self.disk is not None:
+                version_file = self.disk.cache_dir / VERSION_FILE
+                if not version_file.exists() or version_file.read_text() != version:
+                    self.disk.clear()
+                    version_file.write_text(version)
+            if self.version is not None:
+                logger.info("Warehouse version changed; cached query results dropped")
+            self.version = version
+        return version
+
+    def _remember(self, key: str, df: pd.DataFrame) -> None:
+        """Keep a result in memory, dropping the least recently used beyond max_memory_bytes."""
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_memory_bytes:
+            return
+        self.memory[key] = (df, size)
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_memory_bytes:
+            _, (_, dropped_size) = self.memory.popitem(last=False)
+            self.memory_bytes -= dropped_size
+
+    def read_sql(self, sql: str, params: Optional[Sequence[Any]] = None, **read_sql_kwargs: Any) -> pd.DataFrame:
+        """
+        Run a query through the cache, like pd.read_sql(sql, conn, params=params, ...).
+
+        Parameters:
+            sql (str): SELECT statement.
+            params (list-like, optional): Query parameters.
+            **read_sql_kwargs: Passed to pd.read_sql (parse_dates, ...); part of the key.
+
+        Returns:
+            pd.DataFrame: The result (a copy of the cached one).
+        """
+        version = self._check_version()
+        key_text = json.dumps([version, normalize_sql(sql), params, read_sql_kwargs], sort_keys=True, default=str)
+        key = hashlib.blake2b(key_text.encode("utf-8"), digest_size=20).hexdigest()
+
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key][0].copy()
+        if self.disk is not None:
+            df, _ = self.disk.get(key)
+            if df is not None:
+                self._remember(key, df)
+                self.hits += 1
+                return df.copy()
+
+        self.misses += 1
+        df = read_sql(self.conn, sql, params=params, **read_sql_kwargs)
+        self._remember(key, df)
+        if self.disk is not None:
+            self.disk.put(key, df)
+        return df.copy()
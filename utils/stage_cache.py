@@ -0,0 +1,330 @@
+"""
+utils/stage_cache.py
+
+Content-addressed cache of pipeline stage outputs.
+
+A prepare pipeline is a chain of stages (read the raw file, clean column
+names, remove duplicates, ...). Each stage output is stored under a key made
+from the key of its input and the stage itself (name, source code and
+parameters); the first key comes from the content hash of the raw file and
+of the code the stages run: the utils package and the given source files
+(the pipeline script, scripts/data_scrubber.py). So:
+- an unchanged raw file and unchanged code give the same keys, and the final
+  output is loaded from the cache instead of being recomputed
+- a crashed run, started again, resumes from the last stage it completed
+- any change to the raw file, a stage, its parameters, or a helper it calls gives new keys
+
+A load that fails raises and caches nothing; an empty load is not cached either.
+
+Outputs are pickled DataFrames (column types included) in data/.cache. The
+cache is bounded in size; when it grows past max_bytes, the least recently
+used entries are evicted. File hashes are remembered by path, size and
+modification time, so an unchanged multi-GB raw file is not hashed again.
+
+This module provides:
+- file_digest: content hash of a file (remembered while the file is unchanged)
+- source_digest: combined content hash of source files
+- StageCache: get / put / evict stage outputs
+- run_cached_pipeline: run a chain of stages, reusing and resuming from cached outputs
+
+Example:
+    df, original_shape = run_cached_pipeline(
+        RAW_DATA_DIR / "sales_data.csv",
+        load=("read_raw_data", read_raw_data, {"file_name": "sales_data.csv"}),
+        stages=[("remove_duplicates", remove_duplicates, {}), ("remove_outliers", remove_outliers, {})],
+        cache=StageCache(DATA_DIR / ".cache"),
+        sources=[pathlib.Path(__file__)],
+    )
+
+"""
+
+# Imports from Python Standard Library
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+import pickle
+import tempfile
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Imports from external packages
+import pandas as pd
+
+# Imports from local modules
+from utils.logger import logger
+
+# Define global constants
+DEFAULT_MAX_CACHE_BYTES: int = 2 * 1024**3  # 2 GB
+DIGEST_BLOCK_SIZE: int = 8 * 1024**2  # Bytes read at a time while hashing a file
+DIGEST_INDEX_FILE: str = "file_digests.json"
+ENTRY_SUFFIX: str = ".pkl"
+UTILS_DIR: pathlib.Path = pathlib.Path(__file__).resolve().parent  # helpers every stage may call
+
+Stage = Tuple[str, Callable[..., pd.DataFrame], Dict[str, Any]]  # (name, function, keyword parameters)
+
+
+def _hash_text(*parts: str) -> str:
+    """Return a hex digest of the given strings."""
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _code_identity(func: Callable) -> str:
+    """Return the source code of a function (or its qualified name if the source is unavailable)."""
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+
+
+def _write_atomic(path: pathlib.Path, write: Callable[[BinaryIO], None]) -> None:
+    """Call write on a temporary file and rename it into place, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_name, path)
+    except BaseException:
+        pathlib.Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def file_digest(file_path: pathlib.Path, index_dir: Optional[pathlib.Path] = None) -> str:
+    """
+    Return the content hash of a file.
+
+    With an index_dir, the hash is remembered there by path, size and
+    modification time, and reused while those are unchanged.
+
+    Args:
+        file_path (pathlib.Path): File to hash.
+        index_dir (pathlib.Path, optional): Directory holding the remembered hashes.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    file_path = pathlib.Path(file_path).resolve()
+    stat = file_path.stat()
+    index_path = index_dir / DIGEST_INDEX_FILE if index_dir is not None else None
+    index: Dict[str, Any] = {}
+    if index_path is not None and index_path.exists():
+        try:
+            index = json.loads(index_path.read_text())
+        except ValueError:
+            index = {}
+        entry = index.get(str(file_path))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["digest"]
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(DIGEST_BLOCK_SIZE), b""):
+            digest.update(block)
+    hex_digest = digest.hexdigest()
+
+    if index_path is not None:
+        index[str(file_path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": hex_digest}
+        _write_atomic(index_path, lambda f: f.write(json.dumps(index, indent=2).encode("utf-8")))
+    return hex_digest
+
+
+def source_digest(paths: Sequence[pathlib.Path], index_dir: Optional[pathlib.Path] = None) -> str:
+    """
+    Return one content hash for a set of source files (see file_digest).
+
+    Args:
+        paths (list): Source files, in any order.
+        index_dir (pathlib.Path, optional): Directory holding the remembered hashes.
+
+    Returns:
+        str: Hex digest of the files' names and contents.
+    """
+    paths = sorted(pathlib.Path(path).resolve() for path in paths)
+    return _hash_text(*[f"{path.name}:{file_digest(path, index_dir)}" for path in paths])
+
+
+class StageCache:
+    """
+    Size-bounded, least-recently-used store of stage outputs, one pickle file per key.
+
+    Entries are written to a temporary file and renamed into place, so a crash
+    never leaves a partial entry behind.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path, max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        """
+        Parameters:
+            cache_dir (pathlib.Path): Directory for the cache entries (e.g. data/.cache).
+            max_bytes (int): Total size of the entries above which the least recently used are evicted.
+        """
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be a positive integer, got {max_bytes}.")
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / f"{key}{ENTRY_SUFFIX}"
+
+    def get(self, key: str) -> Tuple[Optional[pd.DataFrame], Optional[Tuple[int, int]]]:
+        """
+        Load the output stored under key and mark it as recently used.
+
+        Parameters:
+            key (str): Cache key.
+
+        Returns:
+            Tuple: (stored output, shape of the pipeline input if stored), or (None, None) if there is none.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            df, input_shape = entry["df"], entry["input_shape"] and tuple(entry["input_shape"])
+        except FileNotFoundError:
+            return None, None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, KeyError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None, None
+        os.utime(path)  # the modification time orders entries for LRU eviction
+        return df, input_shape
+
+    def put(self, key: str, df: pd.DataFrame, input_shape: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Store an output under key, then evict old entries if the cache is too large.
+
+        An output larger in memory than max_bytes is not stored: it would be
+        evicted as soon as it was written.
+
+        Parameters:
+            key (str): Cache key.
+            df (pd.DataFrame): Stage output.
+            input_shape (tuple, optional): Shape of the pipeline input, reported on a cache hit.
+        """
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            logger.info(f"Not caching {key}: {size} bytes in memory is more than the {self.max_bytes}-byte cache")
+            return
+        entry = {"df": df, "input_shape": input_shape}
+        _write_atomic(self._path(key), lambda f: pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL))
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        entries = []
+        for path in self.cache_dir.glob(f"*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # removed by another process sharing the cache
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cache entries from {self.cache_dir}")
+        return removed
+
+    def clear(self) -> None:
+        """Remove every entry and remembered file hash."""
+        for path in self.cache_dir.glob(f"*{ENTRY_SUFFIX}"):
+            path.unlink(missing_ok=True)
+        (self.cache_dir / DIGEST_INDEX_FILE).unlink(missing_ok=True)
+
+
+def stage_keys(input_file: pathlib.Path, load: Stage, stages: Sequence[Stage], cache: StageCache,
+               version: str = "", sources: Sequence[pathlib.Path] = ()) -> List[str]:
+    """
+    Compute the cache key of the loaded input and of every stage output.
+
+    A stage's own source is part of its key, but the helpers it calls are
+    not, so the first key also covers every module of the utils package and
+    the given source files.
+
+    Args:
+        input_file (pathlib.Path): Raw input file whose contents the outputs depend on.
+        load (Stage): (name, function, parameters) reading the input into a DataFrame.
+        stages (list): (name, function, parameters) of each stage, in order.
+        cache (StageCache): Cache whose directory remembers file hashes.
+        version (str, optional): Extra text in the first key, e.g. a data format version.
+        sources (list, optional): Source files outside utils the stages depend on
+            (e.g. the pipeline script and scripts/data_scrubber.py).
+
+    Returns:
+        List[str]: len(stages) + 1 keys: the loaded input, then each stage output.
+    """
+    code = source_digest([*UTILS_DIR.glob("*.py"), *sources], cache.cache_dir)
+    key = _hash_text(file_digest(input_file, cache.cache_dir), code, version)
+    keys = []
+    for name, func, params in [load, *stages]:
+        key = _hash_text(key, name, _code_identity(func), json.dumps(params, sort_keys=True, default=str))
+        keys.append(key)
+    return keys
+
+
+def run_cached_pipeline(input_file: pathlib.Path, load: Stage, stages: Sequence[Stage], cache: StageCache,
+                        version: str = "", sources: Sequence[pathlib.Path] = ()) -> Tuple[pd.DataFrame, Tuple[int, int]]:
+    """
+    Load input_file and run the stages on it, reusing cached outputs.
+
+    The latest stage whose output is cached is loaded and only the stages
+    after it run, so an unchanged input is a cache hit on the final output and
+    a crashed run resumes where it stopped. Every computed output is cached,
+    except when the load returned an empty DataFrame: that is more likely a
+    read problem than the file's real contents, so nothing is stored for it.
+    Errors raised by the load or a stage propagate; the outputs of the stages
+    completed before them stay cached.
+
+    Args:
+        input_file (pathlib.Path): Raw input file whose contents the outputs depend on.
+        load (Stage): (name, function, parameters) reading the input; called as function(**parameters).
+        stages (list): (name, function, parameters) of each stage, in order;
+            each function is called as function(df, **parameters).
+        cache (StageCache): Where outputs are stored.
+        version (str, optional): Extra text in the first key, e.g. a data format version.
+        sources (list, optional): Source files outside utils the stages depend on (see stage_keys).
+
+    Returns:
+        Tuple[pd.DataFrame, Tuple[int, int]]: (output of the last stage, shape of the loaded input).
+    """
+    keys = stage_keys(input_file, load, stages, cache, version, sources)
+    pipeline = [load, *stages]
+
+    start, df, input_shape = 0, None, None
+    for position in range(len(keys) - 1, -1, -1):
+        df, input_shape = cache.get(keys[position])
+        if df is not None:
+            start = position + 1
+            logger.info(f"Cache hit for {input_file.name} after stage '{pipeline[position][0]}'")
+            break
+
+    cacheable = True
+    for position in range(start, len(keys)):
+        name, func, params = pipeline[position]
+        if position == 0:
+            df = func(**params)
+            input_shape = df.shape
+            if df.empty:
+                logger.warning(f"'{name}' read no rows from {input_file.name}; its outputs are not cached")
+                cacheable = False
+        else:
+            df = func(df, **params)
+        if cacheable:
+            cache.put(keys[position], df, input_shape)
+    return df, input_shape
@@ -0,0 +1,443 @@
+"""
+utils/streaming.py
+
+Helpers for running the data preparation pipelines in streaming (chunked) mode.
+
+Large raw files (e.g. daily sales extracts) may not fit in memory. Instead of
+loading the whole CSV with a single pd.read_csv call, the prepare scripts can
+read the file in bounded chunks, run each cleaning stage on a chunk, and
+append the result to the prepared CSV. Peak memory then depends on the chunk
+size, not on the size of the input file.
+
+This module provides:
+- infer_csv_dtypes: one bounded-memory pass to find the full-file column types
+- unify_dtypes: the full-file column types from the types of the chunks
+- plan_csv_dtypes: the same, with compact types (category, small integers; see utils.dtypes)
+- read_csv_in_chunks: bounded-size chunk reader
+- process_in_chunks: run a prepare pipeline's stages chunk by chunk into the prepared file
+- ChunkDeduplicator: removes duplicate rows across chunks (keep first, one pass)
+- ExternalDeduplicator: deduplicates files larger than memory, with any keep
+  policy, by spilling row fingerprints to disk in hash partitions
+
+Cleaned chunks are appended to the prepared file with utils.prepared_io.PreparedWriter.
+
+Example:
+    from utils.prepared_io import PreparedWriter
+    from utils.streaming import ChunkDeduplicator, infer_csv_dtypes, read_csv_in_chunks
+    deduplicator = ChunkDeduplicator()
+    dtypes = infer_csv_dtypes(raw_path)
+    with PreparedWriter(prepared_path) as writer:
+        for chunk in read_csv_in_chunks(raw_path, dtype=dtypes):
+            writer.write(deduplicator.drop_seen(chunk))
+
+"""
+
+# Imports from Python Standard Library
+import pathlib
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Imports from local modules
+from utils.column_profile import DataFrameProfiler
+from utils.dedup import Keep, check_keep, row_fingerprints
+from utils.dtypes import MAX_CATEGORIES, MAX_CATEGORY_RATIO, ColumnStats, plan_from_stats
+from utils.logger import logger
+from utils.prepared_io import PreparedWriter
+
+# Define global constants
+DEFAULT_CHUNK_SIZE: int = 100_000  # Rows per chunk when streaming a raw file
+DEFAULT_MAX_KEYS_IN_MEMORY: int = 20_000_000  # Fingerprints kept or deduplicated in memory at once
+
+# One spilled row: its fingerprint and its position in the input stream
+SPILL_DTYPE = np.dtype([("fingerprint", np.uint64), ("row_number", np.int64)])
+
+
+def infer_csv_dtypes(file_path: pathlib.Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, str]:
+    """
+    Infer the column types pandas would use for the whole file, reading it in chunks.
+
+    pandas infers types per chunk, so a column can come back as int64 in one
+    chunk, float64 in another (missing values) and str in a third (a stray
+    text value). Reading every chunk with the unified types keeps the
+    streaming output identical to a single pd.read_csv call.
+
+    Args:
+        file_path (pathlib.Path): Path to the CSV file.
+        chunk_size (int): Maximum number of rows per chunk.
+
+    Returns:
+        Dict[str, str]: Column name -> dtype to pass to pd.read_csv.
+    """
+    seen_dtypes: Dict[str, set] = {}
+    for chunk in read_csv_in_chunks(file_path, chunk_size):
+        for column, dtype in chunk.dtypes.items():
+            seen_dtypes.setdefault(column, set()).add(dtype)
+    return unify_dtypes(seen_dtypes)
+
+
+def unify_dtypes(seen_dtypes: Dict[str, set]) -> Dict[str, str]:
+    """
+    Pick the type pandas would infer for a whole file from the types it inferred for its parts.
+
+    Args:
+        seen_dtypes (dict): Column name -> set of dtypes inferred for the chunks.
+
+    Returns:
+        Dict[str, str]: Column name -> dtype: the common type, float64 for a mix
+            of integer and float, str otherwise.
+    """
+    dtypes = {}
+    for column, column_dtypes in seen_dtypes.items():
+        if len(column_dtypes) == 1:
+            dtypes[column] = str(next(iter(column_dtypes)))
+        elif all(pd.api.types.is_integer_dtype(d) or pd.api.types.is_float_dtype(d) for d in column_dtypes):
+            dtypes[column] = "float64"
+        else:
+            dtypes[column] = "str"
+    return dtypes
+
+
+def plan_csv_dtypes(file_path: pathlib.Path, chunk_size: int, exclude: Sequence[str] = (),
+                    max_categories: int = MAX_CATEGORIES,
+                    max_category_ratio: float = MAX_CATEGORY_RATIO) -> Dict[str, Any]:
+    """
+    Plan the column types of a whole CSV file, reading it in chunks.
+
+    The result can be passed straight to pd.read_csv(dtype=...): every chunk
+    is then parsed with the same compact types and the same categories, so
+    chunks can be concatenated or appended to one prepared file. Columns the
+    planner leaves alone get the type pandas infers for the whole file (see
+    infer_csv_dtypes).
+
+    Args:
+        file_path (pathlib.Path): Path to the CSV file.
+        chunk_size (int): Maximum number of rows per chunk.
+        exclude (list, optional): Columns to leave as they are.
+        max_categories (int): Most distinct values for a category column.
+        max_category_ratio (float): Most distinct values per non-missing value for a category column.
+
+    Returns:
+        Dict[str, Any]: Column -> dtype for every column of the file.
+    """
+    dtypes = infer_csv_dtypes(file_path, chunk_size)
+    stats: Dict[str, ColumnStats] = {}
+    for chunk in read_csv_in_chunks(file_path, chunk_size, dtype=dtypes):
+        for column in chunk.columns:
+            stats.setdefault(column, ColumnStats(max_categories)).update(chunk[column])
+    dtypes.update(plan_from_stats(stats, max_category_ratio, exclude))
+    return dtypes
+
+
+def read_csv_in_chunks(file_path: pathlib.Path, chunk_size: int = DEFAULT_CHUNK_SIZE, dtype: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV file as a sequence of DataFrames with at most chunk_size rows each.
+
+    Args:
+        file_path (pathlib.Path): Path to the CSV file.
+        chunk_size (int): Maximum number of rows per chunk.
+        dtype (dict, optional): Column types to use for every chunk (see infer_csv_dtypes).
+
+    Returns:
+        Iterator[pd.DataFrame]: The chunks, in file order.
+
+    Raises:
+        ValueError: If chunk_size is not a positive integer.
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be a positive integer, got {chunk_size}.")
+    with pd.read_csv(file_path, chunksize=chunk_size, dtype=dtype) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def process_in_chunks(input_path: pathlib.Path, output_path: pathlib.Path,
+                      stages: Sequence[Callable[[pd.DataFrame], pd.DataFrame]],
+                      chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      profiler: Optional[DataFrameProfiler] = None) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """
+    Streaming mode of a prepare pipeline: read the raw CSV in bounded chunks,
+    run the stages on each chunk, and append it to the prepared file. Peak
+    memory depends on chunk_size, not on the size of the input file.
+
+    Column types are planned for the whole file first (see plan_csv_dtypes),
+    so every chunk is parsed the same way. Stages that carry state from one
+    chunk to the next (a ChunkDeduplicator's drop_seen, date parsers, a
+    validation report) are bound by the caller, e.g. with functools.partial.
+
+    Args:
+        input_path (pathlib.Path): Raw CSV file.
+        output_path (pathlib.Path): Prepared file; CSV, parquet or feather by suffix (see utils.prepared_io).
+        stages (list): Functions chunk -> chunk, run in order.
+        chunk_size (int): Maximum number of rows per chunk.
+        profiler (DataFrameProfiler, optional): Updated with every raw chunk, in the same scan.
+
+    Returns:
+        Tuple[Tuple[int, int], Tuple[int, int]]: (original shape, cleaned shape).
+    """
+    rows_read = 0
+    rows_written = 0
+    columns_read = 0
+    columns_written = 0
+
+    dtypes = plan_csv_dtypes(input_path, chunk_size)
+    with PreparedWriter(output_path) as writer:
+        for chunk_number, chunk in enumerate(read_csv_in_chunks(input_path, chunk_size, dtype=dtypes)):
+            rows_read += len(chunk)
+            columns_read = len(chunk.columns)
+            if profiler is not None:
+                profiler.update(chunk)
+            for stage in stages:
+                chunk = stage(chunk)
+            writer.write(chunk)
+            rows_written += len(chunk)
+            columns_written = len(chunk.columns)
+            logger.info(f"Chunk {chunk_number}: {rows_read} rows read, {rows_written} rows written so far")
+
+    logger.info(f"Data saved to {output_path}")
+    return (rows_read, columns_read), (rows_written, columns_written)
+
+
+class ChunkDeduplicator:
+    """
+    Remove duplicate rows across a stream of chunks.
+
+    Each row is reduced to a 64-bit fingerprint (see utils.dedup.row_fingerprints),
+    over all columns or a key subset, so a row that duplicates one from an
+    earlier chunk is dropped just like DataFrame.drop_duplicates() would drop
+    it on the full frame (keep='first').
+
+    Fingerprints of rows already kept (8 bytes per distinct row) are stored
+    as sorted runs: each chunk adds one run, and runs no larger than the new
+    one are merged into it, so a fingerprint is merged O(log n) times rather
+    than the whole set being re-sorted for every chunk. When more than
+    max_keys_in_memory fingerprints are held, they are written to a sorted
+    file in spill_dir and looked up memory-mapped, which keeps memory bounded
+    for any number of distinct rows. Use ExternalDeduplicator for keep='last'.
+    """
+
+    def __init__(self, subset: Optional[Sequence[str]] = None,
+                 max_keys_in_memory: int = DEFAULT_MAX_KEYS_IN_MEMORY,
+                 spill_dir: Optional[pathlib.Path] = None):
+        """
+        Parameters:
+            subset (list, optional): Key columns; all columns by default.
+            max_keys_in_memory (int): Fingerprints held in memory before they are spilled to disk.
+            spill_dir (pathlib.Path, optional): Where fingerprints are spilled; a temporary directory by default.
+        """
+        if max_keys_in_memory <= 0:
+            raise ValueError(f"max_keys_in_memory must be a positive integer, got {max_keys_in_memory}.")
+        self.subset = list(subset) if subset is not None else None
+        self.max_keys_in_memory = max_keys_in_memory
+        self.spill_dir = spill_dir
+        self.runs: List[np.ndarray] = []  # sorted, in memory, largest first
+        self.spilled_runs: List[np.ndarray] = []  # sorted, memory-mapped
+        self._keys_in_memory = 0
+        self._spill_files: Optional[tempfile.TemporaryDirectory] = None
+
+    def __len__(self) -> int:
+        """Number of distinct rows seen so far."""
+        return self._keys_in_memory + sum(len(run) for run in self.spilled_runs)
+
+    def row_hashes(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Compute one 64-bit fingerprint per row.
+
+        Parameters:
+            df (pd.DataFrame): Chunk to fingerprint.
+
+        Returns:
+            np.ndarray: uint64 array with one value per row.
+        """
+        return row_fingerprints(df, self.subset)
+
+    def drop_seen(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop rows duplicated within the chunk or already seen in an earlier chunk.
+
+        Parameters:
+            df (pd.DataFrame): Next chunk of the stream.
+
+        Returns:
+            pd.DataFrame: Chunk with duplicate rows removed.
+        """
+        if df.empty:
+            return df
+        hashes = self.row_hashes(df)
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~self._seen(hashes)
+        self._add(hashes[keep])
+        return df[keep]
+
+    def _seen(self, hashes: np.ndarray) -> np.ndarray:
+        """Mark the fingerprints already stored, with a binary search in every run."""
+        # Sorted queries walk each run in order, which is much faster than random probes
+        order = np.argsort(hashes)
+        queries = hashes[order]
+        seen_sorted = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs + self.spilled_runs:
+            positions = np.searchsorted(run, queries)
+            np.minimum(positions, len(run) - 1, out=positions)
+            seen_sorted |= run[positions] == queries
+        seen = np.empty(len(hashes), dtype=bool)
+        seen[order] = seen_sorted
+        return seen
+
+    def _add(self, hashes: np.ndarray) -> None:
+        """Store new, distinct fingerprints as a run, merging the smaller runs into it."""
+        if len(hashes) == 0:
+            return
+        run = np.sort(hashes)
+        while self.runs and len(self.runs[-1]) <= len(run):
+            # Both halves are sorted, which the stable sort (timsort) merges in linear time
+            run = np.sort(np.concatenate([self.runs.pop(), run]), kind="stable")
+        self.runs.append(run)
+        self._keys_in_memory += len(hashes)
+        if self._keys_in_memory > self.max_keys_in_memory:
+            self._spill()
+
+    def _spill(self) -> None:
+        """Write the in-memory runs to one sorted file and look it up memory-mapped from now on."""
+        if self._spill_files is None:
+            # Removed with the deduplicator (or at exit)
+            self._spill_files = tempfile.TemporaryDirectory(prefix="chunk_dedup_", dir=self.spill_dir)
+        path = pathlib.Path(self._spill_files.name) / f"run_{len(self.spilled_runs)}.npy"
+        np.save(path, np.sort(np.concatenate(self.runs), kind="stable"))
+        self.spilled_runs.append(np.load(path, mmap_mode="r"))
+        self.runs = []
+        self._keys_in_memory = 0
+
+
+class ExternalDeduplicator:
+    """
+    Deduplicate CSV files too large to deduplicate in memory.
+
+    The input files are treated as one stream of rows, in order, and read
+    three times in chunks:
+    1. Fingerprint every row and append (fingerprint, row number) to one of N
+       spill files on disk, chosen by fingerprint, so every copy of a row lands
+       in the same partition.
+    2. Deduplicate each partition on its own and store the sorted row numbers
+       of the rows to keep.
+    3. Stream the rows again and write the kept ones, in the original order.
+
+    Only one partition's fingerprints are in memory at a time, so
+    max_keys_in_memory bounds peak memory. When the input fits, a single
+    partition is used and nothing but the spill file touches the disk.
+
+    Example:
+        deduplicator = ExternalDeduplicator(subset=["TransactionID"], keep="last")
+        rows_in, rows_out = deduplicator.dedup_files(sales_files, output_file)
+    """
+
+    def __init__(self, subset: Optional[Sequence[str]] = None, keep: Keep = "first",
+                 max_keys_in_memory: int = DEFAULT_MAX_KEYS_IN_MEMORY,
+                 spill_dir: Optional[pathlib.Path] = None):
+        """
+        Parameters:
+            subset (list, optional): Key columns; all columns by default.
+            keep (str or bool): "first", "last", or False to drop every copy.
+            max_keys_in_memory (int): Largest number of fingerprints deduplicated at once.
+            spill_dir (pathlib.Path, optional): Where partitions are spilled; a temporary directory by default.
+        """
+        check_keep(keep)
+        if max_keys_in_memory <= 0:
+            raise ValueError(f"max_keys_in_memory must be a positive integer, got {max_keys_in_memory}.")
+        self.subset = list(subset) if subset is not None else None
+        self.keep = keep
+        self.max_keys_in_memory = max_keys_in_memory
+        self.spill_dir = spill_dir
+
+    def _chunks(self, input_files: Sequence[pathlib.Path], chunk_size: int, dtypes: Dict[str, str]) -> Iterator[pd.DataFrame]:
+        """Read all input files as one stream of chunks, with the same column types."""
+        for file_path in input_files:
+            yield from read_csv_in_chunks(file_path, chunk_size, dtype=dtypes)
+
+    def _partition_count(self, input_files: Sequence[pathlib.Path], chunk_size: int) -> int:
+        """Estimate the number of partitions from the file sizes and the first chunk's bytes per row."""
+        sample = next(read_csv_in_chunks(input_files[0], min(chunk_size, 10_000)), None)
+        if sample is None or sample.empty:
+            return 1
+        bytes_per_row = max(1, len(sample.to_csv(index=False).encode()) // len(sample))
+        estimated_rows = sum(pathlib.Path(path).stat().st_size for path in input_files) // bytes_per_row
+        return max(1, int(np.ceil(estimated_rows / self.max_keys_in_memory)))
+
+    def _spill(self, chunks: Iterator[pd.DataFrame], spill_dir: pathlib.Path, partitions: int) -> int:
+        """Pass 1: write (fingerprint, row number) pairs to partition files; return the row count."""
+        files = [open(spill_dir / f"partition_{p}.bin", "wb") for p in range(partitions)]
+        row_count = 0
+        try:
+            for chunk in chunks:
+                records = np.empty(len(chunk), dtype=SPILL_DTYPE)
+                records["fingerprint"] = row_fingerprints(chunk, self.subset)
+                records["row_number"] = np.arange(row_count, row_count + len(chunk))
+                row_count += len(chunk)
+                partition_of_row = records["fingerprint"] % np.uint64(partitions)
+                for p in range(partitions):
+                    records[partition_of_row == p].tofile(files[p])
+        finally:
+            for f in files:
+                f.close()
+        return row_count
+
+    def _keep_rows(self, spill_dir: pathlib.Path, partitions: int) -> int:
+        """Pass 2: deduplicate each partition and save its sorted kept row numbers; return the kept count."""
+        kept_total = 0
+        for p in range(partitions):
+            records = np.fromfile(spill_dir / f"partition_{p}.bin", dtype=SPILL_DTYPE)
+            # Rows were appended in stream order, so first/last follow the input order
+            duplicated = pd.Series(records["fingerprint"]).duplicated(keep=self.keep).to_numpy()
+            kept = np.sort(records["row_number"][~duplicated])
+            np.save(spill_dir / f"keep_{p}.npy", kept)
+            (spill_dir / f"partition_{p}.bin").unlink()
+            kept_total += len(kept)
+        return kept_total
+
+    def dedup_files(self, input_files: Sequence[pathlib.Path], output_file: pathlib.Path,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[int, int]:
+        """
+        Write the rows of input_files, in order, without duplicates.
+
+        Args:
+            input_files (list): CSV files with the same columns, read as one stream.
+            output_file (pathlib.Path): Output file; CSV, parquet or feather by suffix
+                (see utils.prepared_io).
+            chunk_size (int): Rows per chunk read.
+
+        Returns:
+            Tuple[int, int]: Rows read and rows written.
+        """
+        input_files = [pathlib.Path(path) for path in input_files]
+        if not input_files:
+            raise ValueError("input_files must name at least one file.")
+        # One schema for every file and chunk, so equal values hash equally
+        seen_dtypes: Dict[str, set] = {}
+        for path in input_files:
+            for column, dtype in infer_csv_dtypes(path, chunk_size).items():
+                seen_dtypes.setdefault(column, set()).add(dtype)
+        dtypes = unify_dtypes(seen_dtypes)
+        partitions = self._partition_count(input_files, chunk_size)
+
+        spill_dir = pathlib.Path(tempfile.mkdtemp(prefix="dedup_", dir=self.spill_dir))
+        try:
+            rows_in = self._spill(self._chunks(input_files, chunk_size, dtypes), spill_dir, partitions)
+            rows_out = self._keep_rows(spill_dir, partitions)
+
+            kept = [np.load(spill_dir / f"keep_{p}.npy", mmap_mode="r") for p in range(partitions)]
+            start = 0
+            with PreparedWriter(output_file) as writer:
+                for chunk in self._chunks(input_files, chunk_size, dtypes):
+                    end = start + len(chunk)
+                    keep = np.zeros(len(chunk), dtype=bool)
+                    for rows in kept:
+                        lo, hi = np.searchsorted(rows, [start, end])
+                        keep[np.asarray(rows[lo:hi]) - start] = True
+                    writer.write(chunk[keep])
+                    start = end
+            del kept
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+        return rows_in, rows_out
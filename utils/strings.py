@@ -0,0 +1,183 @@
+"""
+utils/strings.py
+
+Vectorized normalization of text columns.
+
+Chaining .str.lower().str.strip() on object columns walks every value as a
+Python string once per step and allocates an intermediate Series per step.
+normalize_strings instead:
+- works on Arrow-backed strings, so each step (Unicode normalization,
+  whitespace collapsing, trimming, case) is one pyarrow kernel over
+  contiguous buffers, with no Python object per value (without pyarrow the
+  same steps run through the pandas .str methods)
+- normalizes low-cardinality columns (payment types, suppliers, regions)
+  through their distinct values: each distinct value is normalized once and
+  the result is mapped back to the rows by integer codes
+- keeps category columns as category, normalizing only the categories
+
+normalize_columns applies the same normalization to many columns at once.
+
+This module provides:
+- normalize_strings: normalize one text column
+- normalize_columns: normalize several columns of a DataFrame
+
+Example:
+    from utils.strings import normalize_columns
+    df = normalize_columns(df, ["Name", "ProductName", "Supplier", "PaymentType"], case="lower",
+                           collapse_whitespace=True)
+
+"""
+
+# Imports from Python Standard Library
+from typing import Optional, Sequence
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Define global constants
+CASES = (None, "lower", "upper", "title")
+UNICODE_FORMS = (None, "NFC", "NFD", "NFKC", "NFKD")
+DISTINCT_SAMPLE_SIZE: int = 10_000  # Rows sampled to estimate how repetitive a column is
+MAX_DISTINCT_RATIO: float = 0.5  # Normalize distinct values when at most this share of sampled rows is distinct
+
+
+def _import_pyarrow():
+    """Import pyarrow and its compute kernels; None when pyarrow is not installed (pandas .str fallback)."""
+    try:
+        import pyarrow
+        import pyarrow.compute
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _string_dtype() -> pd.StringDtype:
+    """Arrow-backed string dtype when pyarrow is installed, Python-backed otherwise."""
+    return pd.StringDtype("pyarrow" if _import_pyarrow() is not None else "python")
+
+
+def _check_options(case: Optional[str], unicode_form: Optional[str]) -> None:
+    """Raise ValueError for an unknown case or Unicode normalization form."""
+    if case not in CASES:
+        raise ValueError(f"case must be one of {CASES}, got {case!r}.")
+    if unicode_form not in UNICODE_FORMS:
+        raise ValueError(f"unicode_form must be one of {UNICODE_FORMS}, got {unicode_form!r}.")
+
+
+def _normalize_values(values: pd.Series, case: Optional[str], trim: bool, collapse_whitespace: bool,
+                      unicode_form: Optional[str]) -> pd.Series:
+    """Run the normalization steps on a string Series, one pyarrow kernel per step when pyarrow is installed."""
+    pa = _import_pyarrow()
+    if pa is None:
+        return _normalize_values_str(values, case, trim, collapse_whitespace, unicode_form)
+    pc = pa.compute
+    array = pa.array(values)  # zero-copy view of the Arrow buffers
+    if unicode_form is not None:
+        array = pc.utf8_normalize(array, form=unicode_form)
+    if collapse_whitespace and trim:
+        # Splitting on whitespace runs and joining with one space is much faster than a regex
+        words = pc.utf8_split_whitespace(pc.utf8_trim_whitespace(array))
+        array = pc.binary_join(words, pa.scalar(" ", array.type))
+    elif collapse_whitespace:
+        array = pc.replace_substring_regex(array, r"\s+", " ")
+    elif trim:
+        array = pc.utf8_trim_whitespace(array)
+    if case is not None:
+        array = pc.call_function(f"utf8_{case}", [array])
+    return pd.Series(pd.array(array, dtype=values.dtype), index=values.index, name=values.name)
+
+
+def _normalize_values_str(values: pd.Series, case: Optional[str], trim: bool, collapse_whitespace: bool,
+                          unicode_form: Optional[str]) -> pd.Series:
+    """Same steps as _normalize_values with the pandas .str methods, for installs without pyarrow."""
+    if unicode_form is not None:
+        values = values.str.normalize(unicode_form)
+    if collapse_whitespace:
+        values = values.str.replace(r"\s+", " ", regex=True)
+    if trim:
+        values = values.str.strip()
+    if case is not None:
+        values = getattr(values.str, case)()
+    return values
+
+
+def _is_repetitive(series: pd.Series) -> bool:
+    """Estimate from a sample whether a column repeats its values enough to normalize distinct values only."""
+    sample = series.iloc[:DISTINCT_SAMPLE_SIZE]
+    return len(sample) > 0 and sample.nunique() <= MAX_DISTINCT_RATIO * len(sample)
+
+
+def normalize_strings(series: pd.Series, case: Optional[str] = None, trim: bool = True,
+                      collapse_whitespace: bool = False, unicode_form: Optional[str] = None) -> pd.Series:
+    """
+    Normalize the text values of a column.
+
+    Steps run in this order: Unicode normalization, whitespace collapsing
+    (every run of whitespace becomes one space), trimming, case. Missing
+    values stay missing. Non-text values in an object column are converted
+    to text.
+
+    Args:
+        series (pd.Series): Text column (str, object or category).
+        case (str, optional): "lower", "upper" or "title"; unchanged by default.
+        trim (bool): Strip leading and trailing whitespace. Default is True.
+        collapse_whitespace (bool): Replace runs of whitespace with a single space.
+        unicode_form (str, optional): "NFC", "NFD", "NFKC" or "NFKD" Unicode normalization.
+
+    Returns:
+        pd.Series: The normalized column: category stays category, anything
+            else becomes a string column (Arrow-backed when pyarrow is installed).
+
+    Raises:
+        ValueError: If case or unicode_form is not one of the supported values.
+    """
+    _check_options(case, unicode_form)
+    options = (case, trim, collapse_whitespace, unicode_form)
+    string_dtype = _string_dtype()
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Normalize the categories; categories that become equal are merged
+        categories = _normalize_values(series.cat.categories.to_series().astype(string_dtype), *options)
+        category_codes, new_categories = pd.factorize(categories)
+        codes = series.cat.codes.to_numpy()
+        new_codes = np.where(codes >= 0, category_codes[codes], -1)
+        return pd.Series(pd.Categorical.from_codes(new_codes, categories=new_categories.astype(string_dtype)),
+                         index=series.index, name=series.name)
+
+    values = series.astype(string_dtype)
+    if _is_repetitive(values):
+        codes, distinct_values = pd.factorize(values)
+        normalized = _normalize_values(pd.Series(distinct_values, dtype=string_dtype), *options)
+        return pd.Series(normalized.array.take(codes, allow_fill=True), index=series.index, name=series.name)
+    return _normalize_values(values, *options)
+
+
+def normalize_columns(df: pd.DataFrame, columns: Sequence[str], case: Optional[str] = None, trim: bool = True,
+                      collapse_whitespace: bool = False, unicode_form: Optional[str] = None) -> pd.DataFrame:
+    """
+    Normalize several text columns at once (see normalize_strings).
+
+    Only the given columns are replaced; the other columns are not copied.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+        columns (list): Text columns to normalize.
+        case (str, optional): "lower", "upper" or "title"; unchanged by default.
+        trim (bool): Strip leading and trailing whitespace. Default is True.
+        collapse_whitespace (bool): Replace runs of whitespace with a single space.
+        unicode_form (str, optional): "NFC", "NFD", "NFKC" or "NFKD" Unicode normalization.
+
+    Returns:
+        pd.DataFrame: DataFrame with the normalized columns.
+
+    Raises:
+        ValueError: If a column is not found, or case or unicode_form is not supported.
+    """
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"Columns {missing} not found in the DataFrame.")
+    _check_options(case, unicode_form)
+    return df.assign(**{
+        column: normalize_strings(df[column], case, trim, collapse_whitespace, unicode_form) for column in columns
+    })
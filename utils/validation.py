@@ -0,0 +1,343 @@
+"""
+utils/validation.py
+
+Declarative data validation rules, compiled once and evaluated in one pass.
+
+Writing each business rule as its own pandas expression (df[df['price'] < 0],
+df[~df['category'].isin(...)], ...) scans and filters the frame once per rule.
+A RuleSet instead takes the rules as plain data (one dict per rule), checks
+and compiles them once, and evaluates them together:
+- rules are grouped by column, and each column is converted once (to floats
+  for ranges, to Arrow strings for patterns when pyarrow is installed)
+  however many rules use it
+- category columns are checked on their categories only; the results are
+  mapped back to the rows with one take of the category codes per column
+- every row gets a bitmask (bit i set = rule i violated), so the frame is
+  filtered once, with the per-rule counts computed on the way
+
+Rule checks (missing values pass every check but not_null):
+- not_null: the value is present
+- range: min <= value <= max (either bound may be left out)
+- allowed: the value is one of values
+- pattern: the value matches the regular expression (re.search semantics)
+- references: the value is a key of another table, e.g. sale.productid in
+  product.productid; the keys are given to RuleSet by reference name
+
+Membership checks (allowed, references) look values up in a KeyIndex:
+dense integer keys (surrogate ids) in a boolean table indexed by value,
+other keys in a hash index built once.
+
+Results of the chunks of a file add up in a ValidationReport, so the
+streaming mode validates a file of any size in the same scan that cleans it.
+
+This module provides:
+- KeyIndex: vectorized membership test against a set of keys
+- RuleSet: compiled rules; validate() returns a ValidationResult
+- ValidationResult: per-row violation bitmask and per-rule counts of one frame
+- ValidationReport: per-rule counts added up over chunks
+
+Example:
+    from utils.validation import RuleSet
+    rules = RuleSet([
+        {"name": "unit_price_range", "column": "unitprice", "check": "range", "min": 0},
+        {"name": "known_category", "column": "category", "check": "allowed", "values": ["Home", "Office"]},
+    ])
+    result = rules.validate(df)
+    df = df[result.valid]
+
+"""
+
+# Imports from Python Standard Library
+import re
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+# Imports from external packages
+import numpy as np
+import pandas as pd
+
+# Imports from local modules
+from utils.logger import logger
+
+# Define global constants
+CHECKS = ("not_null", "range", "allowed", "pattern", "references")
+MAX_RULES: int = 64  # One bit per rule in a uint64 mask
+DENSE_KEY_SPAN: int = 8  # Integer keys use a lookup table while it has at most this many slots per key
+
+
+def _import_pyarrow():
+    """Import pyarrow and its compute kernels; None when pyarrow is not installed (pandas .str fallback)."""
+    try:
+        import pyarrow
+        import pyarrow.compute
+    except ImportError:
+        return None
+    return pyarrow
+
+
+class KeyIndex:
+    """
+    Set of keys (e.g. the primary keys of a dimension) for vectorized membership tests.
+
+    Dense integer keys, such as surrogate ids (at most DENSE_KEY_SPAN slots
+    per key between the smallest and the largest), are stored as a boolean
+    table indexed by key - smallest key: a lookup is one array index per
+    value, with no hashing. Other keys go in a hash index, built once and
+    reused for every chunk. Missing keys are ignored.
+    """
+
+    def __init__(self, keys: Sequence[Any]):
+        """
+        Parameters:
+            keys (list-like): The keys.
+        """
+        keys = pd.Series(keys).dropna()
+        self.table: Optional[np.ndarray] = None
+        self.offset = 0
+        self.index = pd.Index(pd.unique(keys))
+        if len(keys) and _is_integral(keys):
+            integer_keys = keys.to_numpy(dtype=np.int64)
+            self.offset = int(integer_keys.min())
+            span = int(integer_keys.max()) - self.offset + 1
+            if span <= DENSE_KEY_SPAN * len(self.index):
+                self.table = np.zeros(span, dtype=bool)
+                self.table[integer_keys - self.offset] = True
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def contains(self, values: pd.Series) -> np.ndarray:
+        """
+        Return a boolean array: True where the value is one of the keys (missing values are False).
+
+        Parameters:
+            values (pd.Series): Values to look up.
+
+        Returns:
+            np.ndarray: One boolean per value.
+        """
+        if self.table is None or not pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+            return self.index.get_indexer(values) >= 0
+        if pd.api.types.is_integer_dtype(values.dtype) and not values.hasnans:
+            slots = values.to_numpy(dtype=np.int64) - self.offset
+            found = (slots >= 0) & (slots < len(self.table))
+        else:
+            numbers = values.to_numpy(dtype=np.float64, na_value=np.nan) - self.offset
+            found = (numbers >= 0) & (numbers < len(self.table)) & (numbers == np.floor(numbers))  # NaN fails all three
+            slots = np.where(found, numbers, 0).astype(np.int64)
+        found &= self.table[np.where(found, slots, 0)]
+        return found
+
+
+def _is_integral(values: pd.Series) -> bool:
+    """True for integer values, or floats that are all whole numbers within int64 range."""
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return False
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return True
+    if pd.api.types.is_float_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=np.float64)
+        return bool(np.all(np.isfinite(numbers)) and np.all(np.abs(numbers) < 2**53) and np.all(numbers == np.round(numbers)))
+    return False
+
+
+class _Rule:
+    """One checked rule: its bit, its column and the compiled check."""
+
+    def __init__(self, bit: int, spec: Mapping[str, Any], references: Mapping[str, Any]):
+        for key in ("name", "column", "check"):
+            if key not in spec:
+                raise ValueError(f"Rule {dict(spec)} has no '{key}'.")
+        self.bit = np.uint64(1) << np.uint64(bit)
+        self.name = str(spec["name"])
+        self.column = spec["column"]
+        self.check = spec["check"]
+        if self.check not in CHECKS:
+            raise ValueError(f"Rule '{self.name}': check must be one of {CHECKS}, got {self.check!r}.")
+
+        if self.check == "range":
+            self.minimum = spec.get("min")
+            self.maximum = spec.get("max")
+            if self.minimum is None and self.maximum is None:
+                raise ValueError(f"Rule '{self.name}': a range needs a min, a max or both.")
+        elif self.check == "allowed":
+            if "values" not in spec:
+                raise ValueError(f"Rule '{self.name}': an allowed check needs values.")
+            self.keys = KeyIndex(list(spec["values"]))
+        elif self.check == "references":
+            reference = spec.get("reference")
+            if reference not in references:
+                raise ValueError(f"Rule '{self.name}': no keys given for reference {reference!r}.")
+            self.keys = references[reference]
+            if not isinstance(self.keys, KeyIndex):
+                self.keys = KeyIndex(self.keys)
+        elif self.check == "pattern":
+            self.pattern = spec.get("pattern")
+            try:
+                re.compile(self.pattern)
+            except (re.error, TypeError) as e:
+                raise ValueError(f"Rule '{self.name}': invalid pattern {self.pattern!r}: {e}") from None
+
+    def violations(self, values: pd.Series, view: Dict[str, Any]) -> np.ndarray:
+        """Return a boolean array marking the values that break the rule (view caches column conversions)."""
+        if self.check == "not_null":
+            return values.isna().to_numpy()
+        if self.check == "range":
+            if "numbers" not in view:
+                view["numbers"] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            numbers = view["numbers"]
+            broken = np.zeros(len(numbers), dtype=bool)
+            if self.minimum is not None:
+                broken |= numbers < self.minimum
+            if self.maximum is not None:
+                broken |= numbers > self.maximum
+            return broken  # NaN compares False: missing values pass
+        if self.check == "pattern":
+            pa = _import_pyarrow()
+            if pa is None:
+                if "strings" not in view:
+                    view["strings"] = values.astype(pd.StringDtype("python"))
+                return ~view["strings"].str.contains(self.pattern, regex=True, na=True).to_numpy(dtype=bool)
+            if "strings" not in view:
+                view["strings"] = pa.array(values.astype(pd.StringDtype("pyarrow")))
+            matched = pa.compute.match_substring_regex(view["strings"], self.pattern)
+            return pa.compute.fill_null(pa.compute.invert(matched), False).to_numpy(zero_copy_only=False)
+        # allowed / references: every value looked up in the compiled keys at once
+        return ~self.keys.contains(values) & values.notna().to_numpy()
+
+
+class ValidationResult:
+    """Violations of one DataFrame: a uint64 bitmask per row and a count per rule."""
+
+    def __init__(self, mask: np.ndarray, counts: Dict[str, int], bits: Dict[str, np.uint64]):
+        """
+        Parameters:
+            mask (np.ndarray): uint64 per row; bit i is set when rule i is violated.
+            counts (dict): Rule name -> number of rows violating it.
+            bits (dict): Rule name -> its bit in mask.
+        """
+        self.mask = mask
+        self.counts = counts
+        self.bits = bits
+
+    @property
+    def valid(self) -> np.ndarray:
+        """Boolean array: True for the rows that pass every rule."""
+        return self.mask == 0
+
+    @property
+    def invalid_rows(self) -> int:
+        """Number of rows violating at least one rule."""
+        return int(np.count_nonzero(self.mask))
+
+    def violations(self, name: str) -> np.ndarray:
+        """Boolean array: True for the rows violating the named rule."""
+        return (self.mask & self.bits[name]) != 0
+
+    def violated_rules(self, mask_value: int) -> List[str]:
+        """Names of the rules whose bits are set in one row's mask value."""
+        return [name for name, bit in self.bits.items() if int(mask_value) & int(bit)]
+
+
+class RuleSet:
+    """
+    Validation rules compiled for one-pass evaluation.
+
+    Each rule is a dict with a name, a column, a check (see CHECKS) and the
+    check's parameters: min / max for range, values for allowed, pattern for
+    pattern, reference for references. A rule whose column is missing from a
+    frame counts every row as a violation, so a renamed column is not
+    silently unchecked.
+    """
+
+    def __init__(self, rules: Sequence[Mapping[str, Any]], references: Optional[Mapping[str, Any]] = None):
+        """
+        Parameters:
+            rules (list): Rule specs, one dict per rule.
+            references (dict, optional): Reference name -> keys (list-like or KeyIndex), for references checks.
+
+        Raises:
+            ValueError: If a rule is malformed, names repeat, or there are more than MAX_RULES rules.
+        """
+        if len(rules) > MAX_RULES:
+            raise ValueError(f"At most {MAX_RULES} rules fit in the violation bitmask, got {len(rules)}.")
+        self.rules = [_Rule(bit, spec, references or {}) for bit, spec in enumerate(rules)]
+        self.names = [rule.name for rule in self.rules]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Rule names must be unique, got {self.names}.")
+        self.bits = {rule.name: rule.bit for rule in self.rules}
+        self.by_column: Dict[Any, List[_Rule]] = {}
+        for rule in self.rules:
+            self.by_column.setdefault(rule.column, []).append(rule)
+
+    def validate(self, df: pd.DataFrame) -> ValidationResult:
+        """
+        Evaluate every rule on a DataFrame (or a chunk of one).
+
+        Parameters:
+            df (pd.DataFrame): Data to validate.
+
+        Returns:
+            ValidationResult: Per-row violation bitmask and per-rule counts.
+        """
+        rows = len(df)
+        mask = np.zeros(rows, dtype=np.uint64)
+        counts = dict.fromkeys(self.names, 0)
+
+        for column, rules in self.by_column.items():
+            if column not in df.columns:
+                for rule in rules:
+                    mask |= rule.bit
+                    counts[rule.name] = rows
+                continue
+            values = df[column]
+
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Check the categories once; the last slot stands for missing values (code -1)
+                categories = pd.Series(values.cat.categories)
+                codes = values.cat.codes.to_numpy()
+                slot_bits = np.zeros(len(categories) + 1, dtype=np.uint64)
+                slot_rows = np.bincount(np.where(codes < 0, len(categories), codes), minlength=len(categories) + 1)
+                view: Dict[str, Any] = {}
+                for rule in rules:
+                    broken = np.append(rule.violations(categories, view), rule.check == "not_null")
+                    slot_bits[broken] |= rule.bit
+                    counts[rule.name] = int(slot_rows[broken].sum())
+                mask |= slot_bits[codes]  # code -1 picks the missing-value slot
+                continue
+
+            view = {}
+            for rule in rules:
+                broken = rule.violations(values, view)
+                mask[broken] |= rule.bit
+                counts[rule.name] = int(np.count_nonzero(broken))
+
+        return ValidationResult(mask, counts, self.bits)
+
+
+class ValidationReport:
+    """Per-rule violation counts added up over the chunks of a file."""
+
+    def __init__(self, rule_set: RuleSet):
+        """
+        Parameters:
+            rule_set (RuleSet): Rules whose results are added up.
+        """
+        self.rows = 0
+        self.invalid_rows = 0
+        self.counts = dict.fromkeys(rule_set.names, 0)
+
+    def update(self, result: ValidationResult) -> None:
+        """Add the result of one chunk."""
+        self.rows += len(result.mask)
+        self.invalid_rows += result.invalid_rows
+        for name, count in result.counts.items():
+            self.counts[name] += count
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return {"rows": ..., "invalid_rows": ..., "violations": {rule: count}}."""
+        return {"rows": self.rows, "invalid_rows": self.invalid_rows, "violations": dict(self.counts)}
+
+    def log(self) -> None:
+        """Log the number of rows violating each rule."""
+        lines = [f"{name}: {count} rows" for name, count in self.counts.items()]
+        logger.info(f"Validation of {self.rows} rows: {self.invalid_rows} rows break a rule\n" + "\n".join(lines))
@@ -0,0 +1,352 @@
+"""
+utils/warehouse.py
+
+Connections to the data warehouse (smart_sales.db).
+
+Every connection to the warehouse goes through this module, so the path
+and the connection settings are the same in the ETL and in every report:
+- the path comes from the SMART_SALES_DB environment variable, or defaults
+  to data/dw/smart_sales.db under the project root
+- the writer (load_data_to_db) puts the database in WAL mode, so readers keep
+  reading the last committed state while a load runs, instead of waiting on it
+- readers open a read-only URI (mode=ro): a report can never write or
+  lock the warehouse
+- every connection gets a larger page cache, memory-mapped reads and
+  in-memory temporary tables (sorts, GROUP BY, DISTINCT)
+
+ConnectionPool keeps opened connections for reuse, so concurrent report jobs
+(threads) do not pay connection setup and a cold page cache on every query.
+
+The warehouse can be stored by one of two engines, with the same schema:
+- "sqlite" (default): smart_sales.db, a row store
+- "duckdb": smart_sales.duckdb, a columnar engine that reads only the columns
+  a query uses and aggregates them vectorized, so scans and GROUP BYs over a
+  large sale_fact table are much faster (requires the duckdb package)
+The engine follows the warehouse file suffix (.db or .duckdb), else the
+SMART_SALES_ENGINE environment variable. The SQL of the ETL and the reports runs
+on both (DuckDB also answers sqlite_master and PRAGMA database_list); read_sql
+returns DataFrames from either. DuckDB allows one read-write process, or any
+number of read-only ones, so reports wait for a DuckDB load to finish.
+
+This module provides:
+- warehouse_engine / warehouse_path: the configured engine and warehouse path
+- connect: one tuned connection, read-only or read-write (WAL)
+- engine_of: the engine of an open connection
+- read_sql: run a query into a DataFrame, on either engine
+- rollback: roll back an open transaction, if any
+- checkpoint: fold the WAL back into the database file after a load
+- ConnectionPool: thread-safe pool of tuned connections
+
+Example:
+    from utils.warehouse import ConnectionPool, read_sql
+    with ConnectionPool() as pool:
+        with pool.connection() as conn:
+            df = read_sql(conn, "SELECT * FROM sale WHERE sale_date >= ?", params=("2025-05-01",))
+
+"""
+
+# Imports from Python Standard Library
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Union
+
+# Imports from external packages
+import pandas as pd
+
+# Imports from local modules
+from utils.logger import logger
+
+# Define global constants
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+DB_PATH_ENV: str = "SMART_SALES_DB"  # Environment variable overriding the warehouse path
+ENGINE_ENV: str = "SMART_SALES_ENGINE"  # Environment variable selecting the engine
+ENGINE_SUFFIXES: Dict[str, str] = {"sqlite": ".db", "duckdb": ".duckdb"}
+DEFAULT_ENGINE: str = "sqlite"
+DEFAULT_DB_PATH: pathlib.Path = PROJECT_ROOT / "data" / "dw" / "smart_sales.db"  # smart_sales.duckdb for DuckDB
+DEFAULT_POOL_SIZE: int = 8  # Connections a pool opens at most
+BUSY_TIMEOUT_SECONDS: float = 30.0  # Wait for another writer's lock this long before failing
+
+# Applied to every connection; they last for the connection only
+CONNECTION_PRAGMAS: Dict[str, Union[int, str]] = {
+    "cache_size": -64 * 1024,  # 64 MB page cache (negative values are KB)
+    "mmap_size": 256 * 1024**2,  # Read up to 256 MB of the file through memory mapping
+    "temp_store": "MEMORY",  # Temporary b-trees for sorts and GROUP BY in memory
+}
+
+
+def _import_duckdb():
+    """Import duckdb, which the DuckDB engine needs, with a clear message if it is missing."""
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("The duckdb warehouse engine requires duckdb: pip install duckdb") from e
+    return duckdb
+
+
+def warehouse_engine(db_path: Optional[pathlib.Path] = None, engine: Optional[str] = None) -> str:
+    """
+    Return the warehouse engine: engine if given, else the one of the warehouse
+    path suffix (db_path or $SMART_SALES_DB: .db or .duckdb), else
+    $SMART_SALES_ENGINE, else "sqlite".
+
+    Args:
+        db_path (pathlib.Path, optional): Explicit warehouse path.
+        engine (str, optional): Explicit engine.
+
+    Returns:
+        str: "sqlite" or "duckdb".
+
+    Raises:
+        ValueError: If the engine is not supported.
+    """
+    if not engine:
+        path = db_path if db_path is not None else os.environ.get(DB_PATH_ENV)
+        suffix = pathlib.Path(path).suffix if path else ""
+        engines_by_suffix = {engine_suffix: name for name, engine_suffix in ENGINE_SUFFIXES.items()}
+        engine = engines_by_suffix.get(suffix) or os.environ.get(ENGINE_ENV) or DEFAULT_ENGINE
+    if engine not in ENGINE_SUFFIXES:
+        raise ValueError(f"Unsupported warehouse engine '{engine}'. Choose from {list(ENGINE_SUFFIXES)}.")
+    return engine
+
+
+def warehouse_path(db_path: Optional[pathlib.Path] = None, engine: Optional[str] = None) -> pathlib.Path:
+    """
+    Return the warehouse path: db_path if given, else $SMART_SALES_DB, else DEFAULT_DB_PATH
+    (with the .duckdb suffix for the DuckDB engine).
+
+    Args:
+        db_path (pathlib.Path, optional): Explicit path.
+        engine (str, optional): Engine; see warehouse_engine().
+
+    Returns:
+        pathlib.Path: Path of the warehouse file.
+    """
+    if db_path is not None:
+        return pathlib.Path(db_path)
+    if os.environ.get(DB_PATH_ENV):
+        return pathlib.Path(os.environ[DB_PATH_ENV])
+    return DEFAULT_DB_PATH.with_suffix(ENGINE_SUFFIXES[warehouse_engine(engine=engine)])
+
+
+def connect(db_path: Optional[pathlib.Path] = None, read_only: bool = True, engine: Optional[str] = None) -> Any:
+    """
+    Open a tuned connection to the warehouse.
+
+    SQLite: a read-only connection opens the file as a mode=ro URI. A read-write
+    connection switches the database to WAL mode, which stays set in the file.
+    Connections may be handed between threads (one thread at a time), as
+    ConnectionPool does. DuckDB: the file is opened read-only or read-write.
+
+    Args:
+        db_path (pathlib.Path, optional): Warehouse path; see warehouse_path().
+        read_only (bool): Open read-only (reports) or read-write (the ETL).
+        engine (str, optional): "sqlite" or "duckdb"; see warehouse_engine().
+
+    Returns:
+        sqlite3.Connection or duckdb.DuckDBPyConnection: The connection.
+
+    Raises:
+        FileNotFoundError: If a read-only connection is asked for and the warehouse does not exist.
+        ImportError: If the DuckDB engine is asked for and duckdb is not installed.
+    """
+    engine = warehouse_engine(db_path, engine)
+    db_path = warehouse_path(db_path, engine)
+    if read_only and not db_path.exists():
+        raise FileNotFoundError(
+            f"No warehouse at {db_path}. Run scripts/etl_to_dw.py, or set {DB_PATH_ENV} to its path."
+        )
+    if engine == "duckdb":
+        return _import_duckdb().connect(str(db_path), read_only=read_only)
+
+    if read_only:
+        conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True,
+                               timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        journal_mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            logger.warning(f"Could not enable WAL mode for {db_path} (journal_mode is {journal_mode})")
+    for name, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def engine_of(conn: Any) -> str:
+    """Return the engine of a connection (or SQLite cursor): "sqlite" or "duckdb"."""
+    return "sqlite" if isinstance(conn, (sqlite3.Connection, sqlite3.Cursor)) else "duckdb"
+
+
+def read_sql(conn: Any, sql: str, params: Optional[Sequence[Any]] = None, **read_sql_kwargs: Any) -> pd.DataFrame:
+    """
+    Run a query into a DataFrame, like pd.read_sql(sql, conn, params=params, ...), on either engine.
+
+    DuckDB results are fetched column by column (no Python tuple per row).
+
+    Args:
+        conn: Warehouse connection.
+        sql (str): SELECT statement with ? placeholders.
+        params (list-like, optional): Query parameters.
+        **read_sql_kwargs: Passed to pd.read_sql; only parse_dates is supported on DuckDB.
+
+    Returns:
+        pd.DataFrame: The result.
+
+    Raises:
+        ValueError: If a pd.read_sql option other than parse_dates is used on DuckDB.
+    """
+    if engine_of(conn) == "sqlite":
+        return pd.read_sql(sql, conn, params=params, **read_sql_kwargs)
+    parse_dates = read_sql_kwargs.pop("parse_dates", None) or {}
+    if read_sql_kwargs:
+        raise ValueError(f"read_sql options {sorted(read_sql_kwargs)} are not supported on DuckDB.")
+    df = conn.execute(sql, list(params) if params is not None else []).df()
+    if not isinstance(parse_dates, dict):
+        parse_dates = dict.fromkeys(parse_dates)
+    for column, date_format in parse_dates.items():
+        if isinstance(date_format, dict):
+            date_format = date_format.get("format")
+        if not pd.api.types.is_datetime64_any_dtype(df[column].dtype):
+            df[column] = pd.to_datetime(df[column], format=date_format)
+    return df
+
+
+def rollback(conn: Any) -> None:
+    """Roll back the open transaction of a connection; do nothing if there is none."""
+    if engine_of(conn) == "sqlite":
+        if conn.in_transaction:
+            conn.rollback()
+        return
+    try:
+        conn.rollback()
+    except _import_duckdb().TransactionException:  # no transaction is active
+        pass
+
+
+def checkpoint(conn: Any) -> None:
+    """
+    Copy the WAL into the database file and truncate it, e.g. after a large load.
+
+    Readers still on an older snapshot keep their part of the WAL; the rest
+    is folded in by SQLite's automatic checkpoints later.
+
+    Parameters:
+        conn: Read-write connection, outside a transaction.
+    """
+    if engine_of(conn) == "duckdb":
+        conn.execute("CHECKPOINT")
+        return
+    busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    if busy:
+        logger.info("WAL checkpoint incomplete: readers are still on the previous snapshot")
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of warehouse connections.
+
+    Connections are opened on demand, up to max_connections, and reused
+    most recently released first (its page cache is warmest). A connection is
+    used by one thread at a time: take it with connection() (or acquire() /
+    release()) and do not keep it after giving it back.
+    """
+
+    def __init__(self, db_path: Optional[pathlib.Path] = None, read_only: bool = True,
+                 max_connections: int = DEFAULT_POOL_SIZE, engine: Optional[str] = None):
+        """
+        Parameters:
+            db_path (pathlib.Path, optional): Warehouse path; see warehouse_path().
+            read_only (bool): Pool read-only connections (reports) or read-write ones.
+            max_connections (int): Connections opened at most; acquire() waits beyond it.
+            engine (str, optional): "sqlite" or "duckdb"; see warehouse_engine().
+        """
+        if max_connections <= 0:
+            raise ValueError(f"max_connections must be a positive integer, got {max_connections}.")
+        self.engine = warehouse_engine(db_path, engine)
+        self.db_path = warehouse_path(db_path, self.engine)
+        self.read_only = read_only
+        self.max_connections = max_connections
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """
+        Take a connection: an idle one, a new one below max_connections, or wait for one.
+
+        Parameters:
+            timeout (float, optional): Seconds to wait when every connection is in use; forever by default.
+
+        Returns:
+            sqlite3.Connection: The connection; give it back with release().
+
+        Raises:
+            RuntimeError: If the pool is closed.
+            TimeoutError: If no connection was released within timeout.
+        """
+        if self._closed:
+            raise RuntimeError("The connection pool is closed.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            open_new = self._opened < self.max_connections
+            if open_new:
+                self._opened += 1
+        if open_new:
+            try:
+                return connect(self.db_path, read_only=self.read_only, engine=self.engine)
+            except BaseException:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No warehouse connection was released within {timeout} seconds.") from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """
+        Give a connection back, rolling back any transaction it left open.
+
+        Parameters:
+            conn (sqlite3.Connection): Connection from acquire().
+        """
+        rollback(conn)
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+            self._opened -= 1
+        conn.close()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """Take a connection for the duration of a with block (see acquire())."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close the idle connections; connections in use are closed when released."""
+        with self._lock:
+            self._closed = True
+            idle = []
+            while not self._idle.empty():
+                idle.append(self._idle.get_nowait())
+            self._opened -= len(idle)
+        for conn in idle:
+            conn.close()